@@ -4,21 +4,25 @@ API de Autenticación - Endpoints para login y autenticación
 
 from uuid import UUID
 
-from crud.usuario_crud import UsuarioCRUD
-from database.config import get_db
+from apis.transaccion import RutaTransaccional
+from auth.security import HasherOverloadedError, password_hasher
+from crud.usuario_crud_async import AsyncUsuarioCRUD
+from database.config import get_async_db
 from fastapi import APIRouter, Depends, HTTPException, status
 from schemas import RespuestaAPI, UsuarioLogin, UsuarioResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter(prefix="/auth", tags=["autenticación"])
+router = APIRouter(
+    prefix="/auth", tags=["autenticación"], route_class=RutaTransaccional
+)
 
 
 @router.post("/login", response_model=UsuarioResponse)
-async def login(login_data: UsuarioLogin, db: Session = Depends(get_db)):
+async def login(login_data: UsuarioLogin, db: AsyncSession = Depends(get_async_db)):
     """Autenticar un usuario con nombre de usuario/email y contraseña."""
     try:
-        usuario_crud = UsuarioCRUD(db)
-        usuario = usuario_crud.autenticar_usuario(
+        usuario_crud = AsyncUsuarioCRUD(db)
+        usuario = await usuario_crud.autenticar_usuario(
             login_data.nombre_usuario, login_data.contraseña
         )
 
@@ -31,6 +35,10 @@ async def login(login_data: UsuarioLogin, db: Session = Depends(get_db)):
         return usuario
     except HTTPException:
         raise
+    except HasherOverloadedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -39,13 +47,13 @@ async def login(login_data: UsuarioLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/crear-admin", response_model=RespuestaAPI)
-async def crear_usuario_admin(db: Session = Depends(get_db)):
+async def crear_usuario_admin(db: AsyncSession = Depends(get_async_db)):
     """Crear usuario administrador por defecto."""
     try:
-        usuario_crud = UsuarioCRUD(db)
+        usuario_crud = AsyncUsuarioCRUD(db)
 
         # Verificar si ya existe un admin por defecto
-        admin_existente = usuario_crud.obtener_admin_por_defecto()
+        admin_existente = await usuario_crud.obtener_admin_por_defecto()
         if admin_existente:
             return RespuestaAPI(
                 mensaje="Ya existe un usuario administrador por defecto",
@@ -58,7 +66,7 @@ async def crear_usuario_admin(db: Session = Depends(get_db)):
 
         contraseña_admin = PasswordManager.generate_secure_password(12)
 
-        admin = usuario_crud.crear_usuario(
+        admin = await usuario_crud.crear_usuario(
             nombre="Administrador del Sistema",
             nombre_usuario="admin",
             email="admin@system.com",
@@ -77,6 +85,10 @@ async def crear_usuario_admin(db: Session = Depends(get_db)):
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HasherOverloadedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -85,11 +97,11 @@ async def crear_usuario_admin(db: Session = Depends(get_db)):
 
 
 @router.get("/verificar/{usuario_id}", response_model=RespuestaAPI)
-async def verificar_usuario(usuario_id: UUID, db: Session = Depends(get_db)):
+async def verificar_usuario(usuario_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Verificar si un usuario existe y está activo."""
     try:
-        usuario_crud = UsuarioCRUD(db)
-        usuario = usuario_crud.obtener_usuario(usuario_id)
+        usuario_crud = AsyncUsuarioCRUD(db)
+        usuario = await usuario_crud.obtener_usuario(usuario_id)
 
         if not usuario:
             raise HTTPException(
@@ -128,3 +140,13 @@ async def estado_autenticacion():
             "autenticacion": "Activa",
         },
     )
+
+
+@router.get("/metricas-hash", response_model=RespuestaAPI)
+async def metricas_hash():
+    """Consultar las métricas del pool de hash de contraseñas."""
+    return RespuestaAPI(
+        mensaje="Métricas del servicio de hash de contraseñas",
+        exito=True,
+        datos=password_hasher.metricas(),
+    )
@@ -2,27 +2,92 @@
 API de Categorías - Endpoints para gestión de categorías
 """
 
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from crud.categoria_crud import CategoriaCRUD
-from database.config import get_db
-from fastapi import APIRouter, Depends, HTTPException, status
-from schemas import CategoriaCreate, CategoriaResponse, CategoriaUpdate, RespuestaAPI
-from sqlalchemy.orm import Session
+from apis.http_cache import (
+    CACHE_PUBLICA,
+    calcular_etag,
+    etag_version,
+    marca_tiempo,
+    respuesta_condicional,
+    versiones_if_match,
+)
+from apis.importacion import respuesta_importacion
+from apis.streaming import respuesta_streaming
+from apis.transaccion import RutaTransaccional
+from auth.actor import obtener_id_usuario_actual
+from crud.categoria_crud import CategoriaCRUD, cache_categorias
+from crud.categoria_crud_async import AsyncCategoriaCRUD
+from crud.paginacion import MAX_LIMITE, siguiente_cursor
+from crud.versiones import VersionObsoletaError
+from database.config import get_async_db
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from schemas import (
+    CambiosCategoriasResponse,
+    CategoriaCreate,
+    CategoriaResponse,
+    CategoriasPorIdsResponse,
+    CategoriaUpdate,
+    RespuestaAPI,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter(prefix="/categorias", tags=["categorias"])
+router = APIRouter(
+    prefix="/categorias", tags=["categorias"], route_class=RutaTransaccional
+)
 
 
 @router.get("/", response_model=List[CategoriaResponse])
 async def obtener_categorias(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Obtener todas las categorías con paginación."""
+    """
+    Obtener todas las categorías con paginación.
+
+    Sin `cursor` se usa paginación por offset (`skip`). Con `cursor` se usa
+    paginación keyset; el cursor de la página siguiente se devuelve en la
+    cabecera `X-Next-Cursor`.
+
+    Devuelve `ETag`; con `If-None-Match` y la página sin cambios responde 304.
+
+    `limit` admite como máximo 500 categorías. Con `stream=true` se devuelven
+    todas como un array JSON enviado por trozos, sin ETag.
+    """
     try:
-        categoria_crud = CategoriaCRUD(db)
-        categorias = categoria_crud.obtener_categorias(skip=skip, limit=limit)
-        return categorias
+        categoria_crud = AsyncCategoriaCRUD(db)
+        if stream:
+            return respuesta_streaming(
+                categoria_crud.consulta_categorias(), CategoriaResponse
+            )
+        categorias = await categoria_crud.obtener_categorias(
+            skip=skip, limit=limit, cursor=cursor
+        )
+        proximo_cursor = siguiente_cursor(categorias, limit, "id_categoria")
+        if proximo_cursor:
+            response.headers["X-Next-Cursor"] = proximo_cursor
+        no_modificado = respuesta_condicional(
+            request, response, calcular_etag(categorias, "id_categoria"), CACHE_PUBLICA
+        )
+        return no_modificado or categorias
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -30,17 +95,102 @@ async def obtener_categorias(
         )
 
 
+@router.get("/cache/metricas", response_model=RespuestaAPI)
+async def metricas_cache_categorias():
+    """Consultar las métricas de la caché de categorías."""
+    return RespuestaAPI(
+        mensaje="Métricas de la caché de categorías",
+        exito=True,
+        datos=cache_categorias.metricas(),
+    )
+
+
+@router.get("/lote", response_model=CategoriasPorIdsResponse)
+async def obtener_categorias_por_ids(
+    ids: List[UUID] = Query([]),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener varios categorías por id con una sola consulta.
+
+    Los ids se pasan repitiendo el parámetro (`?ids=...&ids=...`), como
+    máximo 500. `resultados` tiene un elemento por id pedido, en
+    el mismo orden, con `null` para los que no existen; esos ids se repiten
+    en `no_encontrados`.
+    """
+    try:
+        categoria_crud = AsyncCategoriaCRUD(db)
+        resultados, no_encontrados = await categoria_crud.obtener_categorias_por_ids(
+            ids
+        )
+        return CategoriasPorIdsResponse(
+            resultados=resultados, no_encontrados=no_encontrados
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener categorías: {str(e)}",
+        )
+
+
+@router.get("/cambios", response_model=CambiosCategoriasResponse)
+async def obtener_cambios_categorias(
+    desde: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener las categorías creadas, modificadas o eliminadas desde un cursor, para
+    sincronizar el cliente sin volver a descargar la lista completa.
+
+    Sin `desde` devuelve todas las categorías (sincronización inicial). `cambios`
+    contiene el estado actual de cada registro escrito y `eliminados` los ids
+    borrados; el `cursor` de la respuesta se envía como `desde` en la
+    siguiente petición. Con `hay_mas` quedan cambios: se pide otra página
+    enseguida.
+    """
+    try:
+        categoria_crud = AsyncCategoriaCRUD(db)
+        return await categoria_crud.obtener_cambios(desde, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener cambios de categorías: {str(e)}",
+        )
+
+
 @router.get("/{categoria_id}", response_model=CategoriaResponse)
-async def obtener_categoria(categoria_id: UUID, db: Session = Depends(get_db)):
-    """Obtener una categoría por ID."""
+async def obtener_categoria(
+    categoria_id: UUID,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener una categoría por ID.
+
+    Devuelve `ETag` (la versión de la categoría) y `Last-Modified`; responde
+    304 a `If-None-Match` o `If-Modified-Since` si no ha cambiado.
+    """
     try:
-        categoria_crud = CategoriaCRUD(db)
-        categoria = categoria_crud.obtener_categoria(categoria_id)
+        categoria_crud = AsyncCategoriaCRUD(db)
+        categoria = await categoria_crud.obtener_categoria(categoria_id)
         if not categoria:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada"
             )
-        return categoria
+        no_modificado = respuesta_condicional(
+            request,
+            response,
+            etag_version(categoria.version),
+            CACHE_PUBLICA,
+            marca_tiempo(categoria),
+        )
+        return no_modificado or categoria
     except HTTPException:
         raise
     except Exception as e:
@@ -51,11 +201,13 @@ async def obtener_categoria(categoria_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/nombre/{nombre}", response_model=CategoriaResponse)
-async def obtener_categoria_por_nombre(nombre: str, db: Session = Depends(get_db)):
+async def obtener_categoria_por_nombre(
+    nombre: str, db: AsyncSession = Depends(get_async_db)
+):
     """Obtener una categoría por nombre."""
     try:
-        categoria_crud = CategoriaCRUD(db)
-        categoria = categoria_crud.obtener_categoria_por_nombre(nombre)
+        categoria_crud = AsyncCategoriaCRUD(db)
+        categoria = await categoria_crud.obtener_categoria_por_nombre(nombre)
         if not categoria:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada"
@@ -72,14 +224,17 @@ async def obtener_categoria_por_nombre(nombre: str, db: Session = Depends(get_db
 
 @router.post("/", response_model=CategoriaResponse, status_code=status.HTTP_201_CREATED)
 async def crear_categoria(
-    categoria_data: CategoriaCreate, db: Session = Depends(get_db)
+    categoria_data: CategoriaCreate,
+    db: AsyncSession = Depends(get_async_db),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
 ):
     """Crear una nueva categoría."""
     try:
-        categoria_crud = CategoriaCRUD(db)
-        categoria = categoria_crud.crear_categoria(
+        categoria_crud = AsyncCategoriaCRUD(db)
+        categoria = await categoria_crud.crear_categoria(
             nombre=categoria_data.nombre,
             descripcion=categoria_data.descripcion,
+            id_usuario_crea=id_usuario_actual,
         )
         return categoria
     except ValueError as e:
@@ -91,35 +246,93 @@ async def crear_categoria(
         )
 
 
+@router.post("/importar")
+async def importar_categorias(
+    archivo: UploadFile = File(...),
+    formato: Optional[str] = Query(None, alias="format"),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
+):
+    """
+    Importar categorías desde un archivo CSV o NDJSON (opcionalmente `.gz`).
+
+    Columnas: `nombre` y `descripcion` (opcional). Los nombres que ya
+    existen se rechazan sin detener la importación. La respuesta es NDJSON:
+    una línea por lote con el progreso y las filas rechazadas, y una última
+    con los totales.
+    """
+    try:
+        return await respuesta_importacion(
+            archivo,
+            formato,
+            lambda db, filas: CategoriaCRUD(db).importar_archivo(
+                filas, id_usuario_actual
+            ),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al importar categorías: {str(e)}",
+        )
+
+
 @router.put("/{categoria_id}", response_model=CategoriaResponse)
 async def actualizar_categoria(
-    categoria_id: UUID, categoria_data: CategoriaUpdate, db: Session = Depends(get_db)
+    categoria_id: UUID,
+    categoria_data: CategoriaUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
 ):
-    """Actualizar una categoría existente."""
-    try:
-        categoria_crud = CategoriaCRUD(db)
+    """
+    Actualizar una categoría existente.
 
-        # Verificar que la categoría existe
-        categoria_existente = categoria_crud.obtener_categoria(categoria_id)
-        if not categoria_existente:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada"
-            )
+    Con `If-Match: "<versión>"` (el `ETag` de `GET /categorias/{id}`) solo se
+    actualiza si nadie la ha cambiado desde entonces; si no, responde 412
+    con el `ETag` actual. La respuesta lleva el `ETag` de la nueva versión.
+    """
+    try:
+        categoria_crud = AsyncCategoriaCRUD(db)
+        versiones = versiones_if_match(request)
 
         # Filtrar campos None para actualización
         campos_actualizacion = {
             k: v for k, v in categoria_data.dict().items() if v is not None
         }
 
-        if not campos_actualizacion:
-            return categoria_existente
+        if campos_actualizacion:
+            # Un único UPDATE ... RETURNING; None si la categoría no existe
+            categoria = await categoria_crud.actualizar_categoria(
+                categoria_id,
+                id_usuario_edita=id_usuario_actual,
+                versiones=versiones,
+                **campos_actualizacion,
+            )
+        else:
+            categoria = await categoria_crud.obtener_categoria(categoria_id)
+            if (
+                categoria
+                and versiones is not None
+                and categoria.version not in versiones
+            ):
+                raise VersionObsoletaError(categoria.version)
 
-        categoria_actualizada = categoria_crud.actualizar_categoria(
-            categoria_id, **campos_actualizacion
-        )
-        return categoria_actualizada
+        if not categoria:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada"
+            )
+        response.headers["ETag"] = etag_version(categoria.version)
+        return categoria
     except HTTPException:
         raise
+    except VersionObsoletaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e),
+            headers={"ETag": etag_version(e.version_actual)},
+        )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -130,19 +343,21 @@ async def actualizar_categoria(
 
 
 @router.delete("/{categoria_id}", response_model=RespuestaAPI)
-async def eliminar_categoria(categoria_id: UUID, db: Session = Depends(get_db)):
+async def eliminar_categoria(
+    categoria_id: UUID, db: AsyncSession = Depends(get_async_db)
+):
     """Eliminar una categoría."""
     try:
-        categoria_crud = CategoriaCRUD(db)
+        categoria_crud = AsyncCategoriaCRUD(db)
 
         # Verificar que la categoría existe
-        categoria_existente = categoria_crud.obtener_categoria(categoria_id)
+        categoria_existente = await categoria_crud.obtener_categoria(categoria_id)
         if not categoria_existente:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Categoría no encontrada"
             )
 
-        eliminada = categoria_crud.eliminar_categoria(categoria_id)
+        eliminada = await categoria_crud.eliminar_categoria(categoria_id)
         if eliminada:
             return RespuestaAPI(mensaje="Categoría eliminada exitosamente", exito=True)
         else:
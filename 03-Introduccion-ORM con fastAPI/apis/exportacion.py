@@ -0,0 +1,147 @@
+"""
+Exportación de consultas completas en CSV o NDJSON, en streaming
+"""
+
+import zlib
+
+from apis.streaming import TAMAÑO_LOTE
+from database.config import async_engine
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, String, Text, cast, func, literal_column, select
+
+# Formato (?format=) -> tipo de contenido
+FORMATOS_EXPORTACION = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Nivel de compresión gzip: velocidad antes que tamaño mínimo
+NIVEL_GZIP = 1
+
+
+def _celda_csv(columna):
+    """Texto CSV de una columna: cadenas entre comillas y NULL como celda vacía"""
+    texto = cast(columna, Text)
+    if isinstance(columna.type, String):
+        texto = '"' + func.replace(texto, '"', '""') + '"'
+    return func.coalesce(texto, "")
+
+
+def _consulta_csv(consulta: Select) -> Select:
+    """
+    Hacer que Postgres escriba cada fila de la consulta como una línea CSV
+
+    Así Python no crea un UUID, Decimal o datetime por celda solo para
+    volver a convertirlo en texto.
+    """
+    fila = consulta.subquery("fila")
+    return select(func.concat_ws(",", *(_celda_csv(columna) for columna in fila.c)))
+
+
+def _consulta_ndjson(consulta: Select) -> Select:
+    """
+    Convertir cada fila de la consulta en un objeto JSON dentro de Postgres
+
+    ``row_to_json`` usa los nombres de las columnas como claves. Se convierte
+    a ``text`` para que el driver no decodifique el JSON.
+    """
+    fila = consulta.subquery("fila")
+    return select(cast(func.row_to_json(literal_column("fila")), Text)).select_from(
+        fila
+    )
+
+
+CONSULTAS = {"csv": _consulta_csv, "ndjson": _consulta_ndjson}
+
+
+def _cabecera(formato: str, consulta: Select) -> str:
+    """Primera línea del archivo: nombres de columna en CSV, nada en NDJSON"""
+    if formato == "csv":
+        return ",".join(columna.name for columna in consulta.selected_columns) + "\n"
+    return ""
+
+
+def acepta_gzip(request: Request) -> bool:
+    """Comprobar si el cliente admite ``Content-Encoding: gzip``"""
+    for codificacion in request.headers.get("accept-encoding", "").split(","):
+        nombre, _, parametros = codificacion.strip().partition(";")
+        if nombre.strip().lower() in ("gzip", "*"):
+            calidad = parametros.replace(" ", "").lower()
+            return calidad not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def validar_formato(formato: str) -> str:
+    """
+    Comprobar el formato de exportación
+
+    Raises:
+        ValueError: Si el formato no está en FORMATOS_EXPORTACION
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(
+            f"Formato no válido. Opciones: {', '.join(FORMATOS_EXPORTACION)}"
+        )
+    return formato
+
+
+def respuesta_exportacion(
+    consulta: Select, formato: str, nombre_archivo: str, comprimir: bool = False
+) -> StreamingResponse:
+    """
+    Enviar todas las filas de una consulta de columnas como CSV o NDJSON
+
+    Postgres convierte cada fila en una línea de texto (CSV o JSON), que se
+    lee de un cursor del servidor (``yield_per``) en lotes de
+    ``TAMAÑO_LOTE``. Cada lote se une, se comprime si procede y se envía
+    antes de leer el siguiente, así que la memoria del worker es la de un
+    lote y Python no crea objetos por celda. Se usa una conexión propia que
+    vive lo mismo que la respuesta.
+
+    Args:
+        consulta: Sentencia SELECT de columnas, ya filtrada y ordenada; sus
+            etiquetas son los nombres de las columnas exportadas
+        formato: ``csv`` o ``ndjson``
+        nombre_archivo: Nombre sugerido del archivo (sin extensión)
+        comprimir: Comprimir con gzip (``Content-Encoding: gzip``)
+
+    Returns:
+        Respuesta enviada por trozos
+    """
+    cabecera = _cabecera(validar_formato(formato), consulta)
+    consulta_lineas = CONSULTAS[formato](consulta)
+
+    async def generar():
+        compresor = (
+            zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            if comprimir
+            else None
+        )
+        datos = cabecera.encode("utf-8")
+        async with async_engine.connect() as conexion:
+            resultado = await conexion.stream(
+                consulta_lineas.execution_options(yield_per=TAMAÑO_LOTE)
+            )
+            async for lote in resultado.scalars().partitions():
+                lineas = "".join(f"{linea}\n" for linea in lote).encode("utf-8")
+                datos = datos + lineas if datos else lineas
+                if compresor is not None:
+                    datos = compresor.compress(datos)
+                if datos:
+                    yield datos
+                datos = b""
+        if compresor is not None:
+            yield compresor.compress(datos) + compresor.flush()
+        elif datos:
+            yield datos
+
+    cabeceras = {
+        "Content-Disposition": f'attachment; filename="{nombre_archivo}.{formato}"',
+        "Vary": "Accept-Encoding",
+    }
+    if comprimir:
+        cabeceras["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        generar(), media_type=FORMATOS_EXPORTACION[formato], headers=cabeceras
+    )
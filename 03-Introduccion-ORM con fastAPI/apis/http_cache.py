@@ -0,0 +1,162 @@
+"""
+Caché HTTP: ETag, Last-Modified, GET condicional y escrituras con If-Match
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, List, Optional, Sequence
+
+from fastapi import Request, Response, status
+from sqlalchemy import inspect
+
+# Segundos que navegadores y proxies pueden reutilizar una respuesta pública
+# sin revalidarla. Con 0 siempre revalidan, pero un 304 no tiene cuerpo.
+MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+
+# Productos y categorías son iguales para todos los clientes
+CACHE_PUBLICA = f"public, max-age={MAX_AGE}, must-revalidate"
+# Los datos de usuarios solo puede guardarlos el navegador, y revalidándolos
+CACHE_PRIVADA = "private, no-cache"
+
+
+def marca_tiempo(registro) -> Optional[datetime]:
+    """Última modificación de un registro (fecha_edicion o fecha_creacion)"""
+    return registro.fecha_edicion or registro.fecha_creacion
+
+
+def calcular_etag(
+    registros: Iterable, atributo_id: str, relaciones: Sequence[str] = ()
+) -> str:
+    """
+    Calcular un ETag débil a partir del id y la fecha de edición de cada registro
+
+    Toda edición actualiza ``fecha_edicion`` (``onupdate`` de las entidades),
+    así que el ETag cambia si cambia, se añade o desaparece cualquier
+    registro de la respuesta, sin tener que serializarla.
+
+    Args:
+        registros: Registros que forman la respuesta
+        atributo_id: Nombre del atributo de clave primaria
+        relaciones: Relaciones ya cargadas que también forman parte de la
+            respuesta (?expand=)
+
+    Returns:
+        ETag débil (``W/"..."``)
+    """
+    resumen = hashlib.sha1()
+    for registro in registros:
+        fecha = marca_tiempo(registro)
+        marca = fecha.isoformat() if fecha else ""
+        resumen.update(f"{getattr(registro, atributo_id)}:{marca};".encode())
+        for relacion in relaciones:
+            relacionado = getattr(registro, relacion)
+            if relacionado is not None:
+                fecha = marca_tiempo(relacionado)
+                marca = fecha.isoformat() if fecha else ""
+                identidad = inspect(relacionado).identity
+                resumen.update(f"{relacion}:{identidad}:{marca};".encode())
+    return f'W/"{resumen.hexdigest()}"'
+
+
+def etag_version(version: int) -> str:
+    """
+    ETag fuerte de un registro con columna ``version``
+
+    Cada escritura incrementa la versión, así que sirve como validador de
+    la representación sin relaciones y como precondición de If-Match.
+    """
+    return f'"{version}"'
+
+
+def versiones_if_match(request: Request) -> Optional[List[int]]:
+    """
+    Versiones aceptadas por la cabecera If-Match de una escritura
+
+    If-Match usa comparación fuerte (RFC 9110, sección 13.1.1): los ETag
+    débiles y los que no son de versión no coinciden con ninguna.
+
+    Returns:
+        None si no hay If-Match o es ``*`` (escritura no condicional; ``*``
+        solo exige que el registro exista), o la lista de versiones
+        aceptadas, vacía si ninguna es válida
+    """
+    cabecera = request.headers.get("if-match")
+    if cabecera is None or cabecera.strip() == "*":
+        return None
+    versiones = []
+    for candidato in cabecera.split(","):
+        valor = candidato.strip()
+        if len(valor) > 2 and valor[0] == valor[-1] == '"' and valor[1:-1].isdigit():
+            versiones.append(int(valor[1:-1]))
+    return versiones
+
+
+def _coincide_etag(cabecera: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110, sección 13.1.2)"""
+    if cabecera.strip() == "*":
+        return True
+    valor = etag.removeprefix("W/")
+    return any(
+        candidato.strip().removeprefix("W/") == valor
+        for candidato in cabecera.split(",")
+    )
+
+
+def _no_modificado_desde(cabecera: str, ultima_modificacion: datetime) -> bool:
+    """Evaluar If-Modified-Since con precisión de segundos"""
+    try:
+        desde = parsedate_to_datetime(cabecera)
+    except (TypeError, ValueError):
+        return False
+    if desde.tzinfo is None:
+        desde = desde.replace(tzinfo=timezone.utc)
+    return ultima_modificacion.replace(microsecond=0) <= desde
+
+
+def respuesta_condicional(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str,
+    ultima_modificacion: datetime = None,
+) -> Optional[Response]:
+    """
+    Añadir las cabeceras de caché y resolver un GET condicional
+
+    Args:
+        request: Petición recibida
+        response: Respuesta del endpoint (recibe las cabeceras)
+        etag: ETag de la representación
+        cache_control: Valor de Cache-Control
+        ultima_modificacion: Fecha de la última modificación, si tiene sentido
+
+    Returns:
+        Respuesta 304 si el cliente ya tiene la representación actual, o None
+        para que el endpoint devuelva el cuerpo normalmente
+    """
+    cabeceras = {"ETag": etag, "Cache-Control": cache_control}
+    if ultima_modificacion is not None:
+        cabeceras["Last-Modified"] = format_datetime(
+            ultima_modificacion.astimezone(timezone.utc), usegmt=True
+        )
+    response.headers.update(cabeceras)
+
+    # If-None-Match tiene prioridad; If-Modified-Since solo se usa sin ETag
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        no_modificado = _coincide_etag(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        no_modificado = (
+            if_modified_since is not None
+            and ultima_modificacion is not None
+            and _no_modificado_desde(if_modified_since, ultima_modificacion)
+        )
+
+    if no_modificado:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers)
+        )
+    return None
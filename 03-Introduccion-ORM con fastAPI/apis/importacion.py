@@ -0,0 +1,67 @@
+"""
+Importación de archivos subidos, con el progreso enviado en streaming
+"""
+
+import json
+from typing import Callable, Iterator, Optional
+
+from crud.importacion import abrir_texto, detectar_formato, leer_filas
+from database.config import SessionLocal
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+
+async def respuesta_importacion(
+    archivo: UploadFile,
+    formato: Optional[str],
+    iniciar: Callable[[Session, Iterator], Iterator[dict]],
+) -> StreamingResponse:
+    """
+    Importar un archivo subido y enviar el progreso como NDJSON
+
+    FastAPI guarda el archivo en un temporal (en disco a partir de 1 MB) y
+    aquí se lee por lotes con una sesión síncrona propia, en el pool de
+    hilos: cada lote se inserta y se confirma antes de leer el siguiente.
+    La respuesta tiene una línea JSON por lote, con los totales y las filas
+    rechazadas, y una última línea con ``completado`` (False y ``error`` si
+    la importación se interrumpe).
+
+    Args:
+        archivo: Archivo CSV o NDJSON (``.gz`` si está comprimido)
+        formato: ``csv`` o ``ndjson``; si es None se deduce de la extensión
+        iniciar: Función que recibe la sesión y las filas, valida los datos
+            comunes y devuelve el iterador de progreso (``importar_archivo``
+            de la clase CRUD)
+
+    Returns:
+        Respuesta ``application/x-ndjson`` enviada por trozos
+
+    Raises:
+        ValueError: Si el formato no es válido o ``iniciar`` rechaza la
+            importación (antes de enviar nada)
+    """
+    formato = detectar_formato(formato, archivo.filename or "")
+    filas = leer_filas(abrir_texto(archivo.file, archivo.filename or ""), formato)
+    db = SessionLocal()
+    try:
+        progreso = await run_in_threadpool(iniciar, db, filas)
+    except BaseException:
+        db.close()
+        raise
+
+    def generar():
+        try:
+            for paso in progreso:
+                yield json.dumps(paso, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # El código de estado ya se envió: el error va en la última línea.
+            # Los lotes anteriores quedan confirmados
+            db.rollback()
+            error = {"completado": False, "error": f"Error al importar: {str(e)}"}
+            yield json.dumps(error, ensure_ascii=False) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
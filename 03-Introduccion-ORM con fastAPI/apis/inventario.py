@@ -0,0 +1,71 @@
+"""
+API de Inventario - Auditoría y mantenimiento del kardex
+"""
+
+import asyncio
+from typing import List
+
+from apis.transaccion import RutaTransaccional
+from crud.inventario_crud import INTERVALO_SNAPSHOT
+from crud.inventario_crud_async import AsyncInventarioCRUD
+from database.config import AsyncSessionLocal, get_async_db
+from fastapi import APIRouter, Depends, HTTPException, status
+from schemas import DescuadreInventario
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter(
+    prefix="/inventario", tags=["inventario"], route_class=RutaTransaccional
+)
+
+
+@router.get("/descuadres", response_model=List[DescuadreInventario])
+async def obtener_descuadres(db: AsyncSession = Depends(get_async_db)):
+    """
+    Productos cuyo stock no coincide con el del kardex (última foto más los
+    movimientos posteriores). Una lista vacía indica que no hay descuadres.
+    """
+    try:
+        inventario_crud = AsyncInventarioCRUD(db)
+        return await inventario_crud.descuadres()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al auditar inventario: {str(e)}",
+        )
+
+
+async def mantener_inventario():
+    """
+    Crear las particiones de los próximos meses y tomar una foto del stock
+
+    La foto se toma aunque falle la creación de particiones: los movimientos
+    de un mes sin partición quedan en la partición por defecto.
+
+    Returns:
+        Tupla con (fecha de la foto, productos incluidos) o None si no se tomó
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            await AsyncInventarioCRUD(db).crear_particiones()
+        except Exception as e:
+            print(f"Error al crear las particiones del inventario: {e}")
+    async with AsyncSessionLocal() as db:
+        return await AsyncInventarioCRUD(db).tomar_snapshot()
+
+
+async def tarea_mantenimiento_inventario():
+    """
+    Tarea de fondo que mantiene el kardex cada
+    ``INVENTARIO_INTERVALO_SNAPSHOT`` segundos
+
+    Con varios workers, un bloqueo consultivo hace que solo uno tome la foto.
+    """
+    while True:
+        await asyncio.sleep(INTERVALO_SNAPSHOT)
+        try:
+            snapshot = await mantener_inventario()
+        except Exception as e:
+            print(f"Error al mantener el inventario: {e}")
+            continue
+        if snapshot:
+            print(f"Foto del inventario a {snapshot[0]}: {snapshot[1]} productos")
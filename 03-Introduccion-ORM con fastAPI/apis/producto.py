@@ -2,27 +2,163 @@
 API de Productos - Endpoints para gestión de productos
 """
 
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from uuid import UUID
 
-from crud.producto_crud import ProductoCRUD
-from database.config import get_db
-from fastapi import APIRouter, Depends, HTTPException, status
-from schemas import ProductoCreate, ProductoResponse, ProductoUpdate, RespuestaAPI
-from sqlalchemy.orm import Session
+from apis.exportacion import acepta_gzip, respuesta_exportacion
+from apis.http_cache import (
+    CACHE_PUBLICA,
+    calcular_etag,
+    etag_version,
+    marca_tiempo,
+    respuesta_condicional,
+    versiones_if_match,
+)
+from apis.importacion import respuesta_importacion
+from apis.streaming import respuesta_streaming
+from apis.transaccion import RutaTransaccional
+from auth.actor import obtener_id_usuario_actual
+from crud.agrupador_stock import agrupador_stock
+from crud.inventario_crud_async import AsyncInventarioCRUD
+from crud.paginacion import MAX_LIMITE, siguiente_cursor
+from crud.producto_crud import ProductoCRUD, StockInsuficienteError
+from crud.producto_crud_async import AsyncProductoCRUD
+from crud.versiones import VersionObsoletaError
+from database.config import get_async_db
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from schemas import (
+    CambiosProductosResponse,
+    MovimientoInventarioResponse,
+    ProductoCreate,
+    ProductoExpandido,
+    ProductoLoteResponse,
+    ProductoResponse,
+    ProductosPorIdsResponse,
+    ProductoUpdate,
+    RespuestaAPI,
+    StockHistoricoResponse,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter(prefix="/productos", tags=["productos"])
+router = APIRouter(
+    prefix="/productos", tags=["productos"], route_class=RutaTransaccional
+)
 
+# Número máximo de productos aceptados por POST /productos/lote
+MAX_PRODUCTOS_LOTE = 5000
 
-@router.get("/", response_model=List[ProductoResponse])
+
+def _leer_expand(expand: Optional[str]) -> tuple:
+    """Relaciones pedidas en ``?expand=categoria,usuario_crea``"""
+    if not expand:
+        return ()
+    relaciones = (relacion.strip() for relacion in expand.split(","))
+    return tuple(dict.fromkeys(relacion for relacion in relaciones if relacion))
+
+
+@router.get(
+    "/", response_model=List[ProductoExpandido], response_model_exclude_unset=True
+)
 async def obtener_productos(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    cursor: Optional[str] = None,
+    nombre: Optional[str] = None,
+    categoria_id: Optional[UUID] = None,
+    usuario_id: Optional[UUID] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+    stock_min: Optional[int] = None,
+    stock_max: Optional[int] = None,
+    sort: str = "fecha_creacion",
+    order: str = "asc",
+    expand: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Obtener todos los productos con paginación."""
+    """
+    Obtener productos con filtros, orden y paginación.
+
+    Filtros opcionales: `nombre` (prefijo), `categoria_id`, `usuario_id`,
+    `precio_min`/`precio_max` y `stock_min`/`stock_max`. Orden con `sort`
+    (`fecha_creacion`, `nombre`, `precio` o `stock`) y `order` (`asc`/`desc`).
+
+    Sin `cursor` se usa paginación por offset (`skip`). Con `cursor` se usa
+    paginación keyset; el cursor de la página siguiente se devuelve en la
+    cabecera `X-Next-Cursor` y solo es válido con los mismos `sort` y `order`.
+
+    Con `expand=categoria,usuario_crea` cada producto incluye esas relaciones;
+    se cargan con una consulta por relación, sea cual sea el tamaño de página.
+
+    Devuelve `ETag`; con `If-None-Match` y la página sin cambios responde 304.
+
+    `limit` admite como máximo 500 productos. Con `stream=true` se devuelven
+    todos los productos que cumplan los filtros (se ignoran `skip`, `limit` y
+    `cursor`) como un array JSON enviado por trozos, sin ETag.
+    """
     try:
-        producto_crud = ProductoCRUD(db)
-        productos = producto_crud.obtener_productos(skip=skip, limit=limit)
-        return productos
+        expandir = _leer_expand(expand)
+        producto_crud = AsyncProductoCRUD(db)
+        if stream:
+            return respuesta_streaming(
+                producto_crud.consulta_productos(
+                    nombre=nombre,
+                    categoria_id=categoria_id,
+                    usuario_id=usuario_id,
+                    precio_min=precio_min,
+                    precio_max=precio_max,
+                    stock_min=stock_min,
+                    stock_max=stock_max,
+                    sort=sort,
+                    order=order,
+                    expandir=expandir,
+                ),
+                ProductoExpandido,
+                lambda producto: ProductoExpandido.desde_producto(producto, expandir),
+            )
+        productos = await producto_crud.obtener_productos(
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            nombre=nombre,
+            categoria_id=categoria_id,
+            usuario_id=usuario_id,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            stock_min=stock_min,
+            stock_max=stock_max,
+            sort=sort,
+            order=order,
+            expandir=expandir,
+        )
+        proximo_cursor = siguiente_cursor(productos, limit, "id_producto", sort)
+        if proximo_cursor:
+            response.headers["X-Next-Cursor"] = proximo_cursor
+        no_modificado = respuesta_condicional(
+            request,
+            response,
+            calcular_etag(productos, "id_producto", expandir),
+            CACHE_PUBLICA,
+        )
+        return no_modificado or [
+            ProductoExpandido.desde_producto(producto, expandir)
+            for producto in productos
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -30,19 +166,146 @@ async def obtener_productos(
         )
 
 
-@router.get("/{producto_id}", response_model=ProductoResponse)
-async def obtener_producto(producto_id: UUID, db: Session = Depends(get_db)):
-    """Obtener un producto por ID."""
+@router.get("/export")
+async def exportar_productos(
+    request: Request,
+    formato: str = Query("csv", alias="format"),
+    categoria_id: Optional[UUID] = None,
+    incluir_categoria: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Exportar el catálogo completo de productos.
+
+    `format=csv` (por defecto, con cabecera) o `format=ndjson` (un objeto
+    JSON por línea). Con `incluir_categoria=true` se añade la columna
+    `categoria_nombre`; con `categoria_id` se exporta solo esa categoría.
+
+    Las filas se leen de un cursor del servidor y se envían por lotes, así
+    que la memoria no depende del tamaño del catálogo. Si la petición
+    incluye `Accept-Encoding: gzip` la respuesta se comprime.
+    """
     try:
-        producto_crud = ProductoCRUD(db)
-        producto = producto_crud.obtener_producto(producto_id)
+        producto_crud = AsyncProductoCRUD(db)
+        return respuesta_exportacion(
+            producto_crud.consulta_exportacion(categoria_id, incluir_categoria),
+            formato,
+            "productos",
+            comprimir=acepta_gzip(request),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al exportar productos: {str(e)}",
+        )
+
+
+@router.get("/lote", response_model=ProductosPorIdsResponse)
+async def obtener_productos_por_ids(
+    ids: List[UUID] = Query([]),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener varios productos por id con una sola consulta.
+
+    Los ids se pasan repitiendo el parámetro (`?ids=...&ids=...`), como
+    máximo 500. `resultados` tiene un elemento por id pedido, en
+    el mismo orden, con `null` para los que no existen; esos ids se repiten
+    en `no_encontrados`.
+    """
+    try:
+        producto_crud = AsyncProductoCRUD(db)
+        resultados, no_encontrados = await producto_crud.obtener_productos_por_ids(ids)
+        return ProductosPorIdsResponse(
+            resultados=resultados, no_encontrados=no_encontrados
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener productos: {str(e)}",
+        )
+
+
+@router.get("/cambios", response_model=CambiosProductosResponse)
+async def obtener_cambios_productos(
+    desde: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener los productos creados, modificados o eliminados desde un cursor, para
+    sincronizar el cliente sin volver a descargar la lista completa.
+
+    Sin `desde` devuelve todos los productos (sincronización inicial). `cambios`
+    contiene el estado actual de cada registro escrito y `eliminados` los ids
+    borrados; el `cursor` de la respuesta se envía como `desde` en la
+    siguiente petición. Con `hay_mas` quedan cambios: se pide otra página
+    enseguida.
+    """
+    try:
+        producto_crud = AsyncProductoCRUD(db)
+        return await producto_crud.obtener_cambios(desde, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener cambios de productos: {str(e)}",
+        )
+
+
+@router.get(
+    "/{producto_id}",
+    response_model=ProductoExpandido,
+    response_model_exclude_unset=True,
+)
+async def obtener_producto(
+    producto_id: UUID,
+    request: Request,
+    response: Response,
+    expand: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener un producto por ID.
+
+    Con `expand=categoria,usuario_crea` incluye esas relaciones.
+
+    Devuelve `ETag` y `Last-Modified`; responde 304 a `If-None-Match` o
+    `If-Modified-Since` si el producto no ha cambiado. Sin `expand`, el
+    `ETag` es la versión del producto y sirve como `If-Match` de las
+    escrituras.
+    """
+    try:
+        expandir = _leer_expand(expand)
+        producto_crud = AsyncProductoCRUD(db)
+        producto = await producto_crud.obtener_producto(producto_id, expandir)
         if not producto:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado"
             )
-        return producto
+        # Con relaciones, la representación cambia aunque no cambie el producto
+        etag = (
+            calcular_etag([producto], "id_producto", expandir)
+            if expandir
+            else etag_version(producto.version)
+        )
+        no_modificado = respuesta_condicional(
+            request,
+            response,
+            etag,
+            CACHE_PUBLICA,
+            marca_tiempo(producto),
+        )
+        return no_modificado or ProductoExpandido.desde_producto(producto, expandir)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -50,15 +313,96 @@ async def obtener_producto(producto_id: UUID, db: Session = Depends(get_db)):
         )
 
 
+@router.get(
+    "/{producto_id}/movimientos", response_model=List[MovimientoInventarioResponse]
+)
+async def obtener_movimientos(
+    producto_id: UUID,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Movimientos de inventario (kardex) de un producto, del más reciente al
+    más antiguo.
+
+    Cada cambio de stock deja un movimiento con el delta, el stock resultante
+    y el motivo (`alta`, `ajuste`, `baja`, `reserva`, `devolucion`). El
+    historial se conserva aunque el producto se elimine.
+    """
+    try:
+        inventario_crud = AsyncInventarioCRUD(db)
+        return await inventario_crud.obtener_movimientos(
+            producto_id, desde, hasta, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener movimientos: {str(e)}",
+        )
+
+
+@router.get("/{producto_id}/stock/historico", response_model=StockHistoricoResponse)
+async def obtener_stock_historico(
+    producto_id: UUID, fecha: datetime, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stock que tenía un producto en una fecha (UTC si no lleva zona horaria).
+
+    Se calcula con la última foto del inventario anterior a la fecha y los
+    movimientos posteriores a ella.
+    """
+    try:
+        inventario_crud = AsyncInventarioCRUD(db)
+        stock = await inventario_crud.stock_en_fecha(producto_id, fecha)
+        if stock is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado"
+            )
+        return StockHistoricoResponse(producto_id=producto_id, fecha=fecha, stock=stock)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener stock histórico: {str(e)}",
+        )
+
+
 @router.get("/categoria/{categoria_id}", response_model=List[ProductoResponse])
 async def obtener_productos_por_categoria(
-    categoria_id: UUID, db: Session = Depends(get_db)
+    categoria_id: UUID,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Obtener productos por categoría."""
+    """
+    Obtener productos por categoría.
+
+    Paginación por cursor (`X-Next-Cursor`), como máximo 500 por página. Con
+    `stream=true` se devuelven todos como un array JSON enviado por trozos.
+    """
     try:
-        producto_crud = ProductoCRUD(db)
-        productos = producto_crud.obtener_productos_por_categoria(categoria_id)
+        producto_crud = AsyncProductoCRUD(db)
+        if stream:
+            return respuesta_streaming(
+                producto_crud.consulta_productos(categoria_id=categoria_id),
+                ProductoResponse,
+            )
+        productos = await producto_crud.obtener_productos_por_categoria(
+            categoria_id, limit=limit, cursor=cursor
+        )
+        proximo_cursor = siguiente_cursor(productos, limit, "id_producto")
+        if proximo_cursor:
+            response.headers["X-Next-Cursor"] = proximo_cursor
         return productos
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -68,13 +412,35 @@ async def obtener_productos_por_categoria(
 
 @router.get("/usuario/{usuario_id}", response_model=List[ProductoResponse])
 async def obtener_productos_por_usuario(
-    usuario_id: UUID, db: Session = Depends(get_db)
+    usuario_id: UUID,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Obtener productos por usuario."""
+    """
+    Obtener productos por usuario.
+
+    Paginación por cursor (`X-Next-Cursor`), como máximo 500 por página. Con
+    `stream=true` se devuelven todos como un array JSON enviado por trozos.
+    """
     try:
-        producto_crud = ProductoCRUD(db)
-        productos = producto_crud.obtener_productos_por_usuario(usuario_id)
+        producto_crud = AsyncProductoCRUD(db)
+        if stream:
+            return respuesta_streaming(
+                producto_crud.consulta_productos(usuario_id=usuario_id),
+                ProductoResponse,
+            )
+        productos = await producto_crud.obtener_productos_por_usuario(
+            usuario_id, limit=limit, cursor=cursor
+        )
+        proximo_cursor = siguiente_cursor(productos, limit, "id_producto")
+        if proximo_cursor:
+            response.headers["X-Next-Cursor"] = proximo_cursor
         return productos
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -83,12 +449,30 @@ async def obtener_productos_por_usuario(
 
 
 @router.get("/buscar/{nombre}", response_model=List[ProductoResponse])
-async def buscar_productos_por_nombre(nombre: str, db: Session = Depends(get_db)):
-    """Buscar productos por nombre (búsqueda parcial)."""
+async def buscar_productos_por_nombre(
+    nombre: str,
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_LIMITE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Buscar productos por nombre o descripción.
+
+    Búsqueda de texto completo que no distingue acentos; cada palabra se
+    busca como prefijo y los resultados se ordenan por relevancia. El cursor
+    de la página siguiente se devuelve en la cabecera `X-Next-Cursor`.
+    """
     try:
-        producto_crud = ProductoCRUD(db)
-        productos = producto_crud.buscar_productos_por_nombre(nombre)
+        producto_crud = AsyncProductoCRUD(db)
+        productos, siguiente = await producto_crud.buscar_productos(
+            nombre, limit=limit, cursor=cursor
+        )
+        if siguiente:
+            response.headers["X-Next-Cursor"] = siguiente
         return productos
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -97,17 +481,22 @@ async def buscar_productos_por_nombre(nombre: str, db: Session = Depends(get_db)
 
 
 @router.post("/", response_model=ProductoResponse, status_code=status.HTTP_201_CREATED)
-async def crear_producto(producto_data: ProductoCreate, db: Session = Depends(get_db)):
+async def crear_producto(
+    producto_data: ProductoCreate,
+    db: AsyncSession = Depends(get_async_db),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
+):
     """Crear un nuevo producto."""
     try:
-        producto_crud = ProductoCRUD(db)
-        producto = producto_crud.crear_producto(
+        producto_crud = AsyncProductoCRUD(db)
+        producto = await producto_crud.crear_producto(
             nombre=producto_data.nombre,
             descripcion=producto_data.descripcion,
             precio=producto_data.precio,
             stock=producto_data.stock,
             categoria_id=producto_data.categoria_id,
             usuario_id=producto_data.usuario_id,
+            id_usuario_crea=id_usuario_actual,
         )
         return producto
     except ValueError as e:
@@ -119,35 +508,127 @@ async def crear_producto(producto_data: ProductoCreate, db: Session = Depends(ge
         )
 
 
+@router.post("/lote", response_model=ProductoLoteResponse)
+async def crear_productos_lote(
+    productos_data: List[ProductoCreate],
+    db: AsyncSession = Depends(get_async_db),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
+):
+    """
+    Crear muchos productos en una sola transacción.
+
+    Devuelve los productos creados y los errores de validación por fila
+    (índice de la fila en la petición y mensaje).
+    """
+    if len(productos_data) > MAX_PRODUCTOS_LOTE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote no puede superar {MAX_PRODUCTOS_LOTE} productos",
+        )
+
+    try:
+        producto_crud = AsyncProductoCRUD(db)
+        creados, errores = await producto_crud.crear_productos_lote(
+            [producto.dict() for producto in productos_data], id_usuario_actual
+        )
+        return ProductoLoteResponse(creados=creados, errores=errores)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al crear productos en lote: {str(e)}",
+        )
+
+
+@router.post("/importar")
+async def importar_productos(
+    usuario_id: UUID,
+    archivo: UploadFile = File(...),
+    formato: Optional[str] = Query(None, alias="format"),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
+):
+    """
+    Importar productos desde un archivo CSV o NDJSON (opcionalmente `.gz`).
+
+    Columnas: `nombre`, `descripcion`, `precio`, `stock` (0 si falta) y
+    `categoria` (nombre de la categoría). Todos los productos pertenecen a
+    `usuario_id`. El formato se deduce de la extensión si no se indica
+    `format=csv|ndjson`.
+
+    El archivo se procesa por lotes de 5 000 filas, cada uno en su propia
+    transacción. La respuesta es NDJSON: una línea por lote con el progreso
+    y las filas rechazadas (`linea`, `error`), y una última con los totales.
+    """
+    try:
+        return await respuesta_importacion(
+            archivo,
+            formato,
+            lambda db, filas: ProductoCRUD(db).importar_archivo(
+                filas, usuario_id, id_usuario_actual
+            ),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al importar productos: {str(e)}",
+        )
+
+
 @router.put("/{producto_id}", response_model=ProductoResponse)
 async def actualizar_producto(
-    producto_id: UUID, producto_data: ProductoUpdate, db: Session = Depends(get_db)
+    producto_id: UUID,
+    producto_data: ProductoUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
 ):
-    """Actualizar un producto existente."""
-    try:
-        producto_crud = ProductoCRUD(db)
+    """
+    Actualizar un producto existente.
 
-        # Verificar que el producto existe
-        producto_existente = producto_crud.obtener_producto(producto_id)
-        if not producto_existente:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado"
-            )
+    Con `If-Match: "<versión>"` (el `ETag` de `GET /productos/{id}`) solo se
+    actualiza si nadie lo ha cambiado desde entonces; si no, responde 412
+    con el `ETag` actual. La respuesta lleva el `ETag` de la nueva versión.
+    """
+    try:
+        producto_crud = AsyncProductoCRUD(db)
+        versiones = versiones_if_match(request)
 
         # Filtrar campos None para actualización
         campos_actualizacion = {
             k: v for k, v in producto_data.dict().items() if v is not None
         }
 
-        if not campos_actualizacion:
-            return producto_existente
+        if campos_actualizacion:
+            # Un único UPDATE ... RETURNING; None si el producto no existe
+            producto = await producto_crud.actualizar_producto(
+                producto_id,
+                id_usuario_edita=id_usuario_actual,
+                versiones=versiones,
+                **campos_actualizacion,
+            )
+        else:
+            producto = await producto_crud.obtener_producto(producto_id)
+            if producto and versiones is not None and producto.version not in versiones:
+                raise VersionObsoletaError(producto.version)
 
-        producto_actualizado = producto_crud.actualizar_producto(
-            producto_id, **campos_actualizacion
-        )
-        return producto_actualizado
+        if not producto:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado"
+            )
+        response.headers["ETag"] = etag_version(producto.version)
+        return producto
     except HTTPException:
         raise
+    except VersionObsoletaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e),
+            headers={"ETag": etag_version(e.version_actual)},
+        )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -159,29 +640,56 @@ async def actualizar_producto(
 
 @router.patch("/{producto_id}/stock", response_model=ProductoResponse)
 async def actualizar_stock(
-    producto_id: UUID, nuevo_stock: int, db: Session = Depends(get_db)
+    producto_id: UUID,
+    nuevo_stock: int,
+    request: Request,
+    response: Response,
+    agrupar: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
 ):
-    """Actualizar el stock de un producto."""
-    try:
-        producto_crud = ProductoCRUD(db)
+    """
+    Actualizar el stock de un producto.
 
-        # Verificar que el producto existe
-        producto_existente = producto_crud.obtener_producto(producto_id)
-        if not producto_existente:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado"
-            )
+    Admite `If-Match` como `PUT /productos/{id}` (412 si la versión no
+    coincide).
 
+    Con `agrupar=true` (y sin `If-Match`) el cambio se aplica junto con los
+    demás cambios de stock recibidos en los próximos milisegundos, en una
+    sola transacción. La respuesta llega tras el commit del grupo y muestra
+    el producto con el grupo entero aplicado.
+    """
+    try:
         if nuevo_stock < 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="El stock no puede ser negativo",
             )
 
-        producto_actualizado = producto_crud.actualizar_stock(producto_id, nuevo_stock)
-        return producto_actualizado
+        versiones = versiones_if_match(request)
+        if agrupar and versiones is None:
+            producto = await agrupador_stock.fijar(
+                producto_id, nuevo_stock, id_usuario_actual
+            )
+        else:
+            producto_crud = AsyncProductoCRUD(db)
+            producto = await producto_crud.actualizar_stock(
+                producto_id, nuevo_stock, versiones, id_usuario_actual
+            )
+        if not producto:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado"
+            )
+        response.headers["ETag"] = etag_version(producto.version)
+        return producto
     except HTTPException:
         raise
+    except VersionObsoletaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e),
+            headers={"ETag": etag_version(e.version_actual)},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -189,20 +697,78 @@ async def actualizar_stock(
         )
 
 
+@router.patch("/{producto_id}/stock/ajuste", response_model=ProductoResponse)
+async def ajustar_stock(
+    producto_id: UUID,
+    delta: int,
+    request: Request,
+    response: Response,
+    agrupar: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    id_usuario_actual: Optional[UUID] = Depends(obtener_id_usuario_actual),
+):
+    """
+    Sumar (delta positivo) o restar (delta negativo) unidades al stock.
+
+    El ajuste es atómico: si el stock quedaría en negativo se responde 409
+    y el producto no cambia. No necesita `If-Match`, pero lo admite (412 si
+    la versión no coincide).
+
+    Con `agrupar=true` (y sin `If-Match`) los ajustes recibidos en los
+    próximos milisegundos se suman por producto y se aplican con un único
+    UPDATE. La respuesta llega tras el commit del grupo y muestra el
+    producto con el grupo entero aplicado.
+    """
+    try:
+        versiones = versiones_if_match(request)
+        if agrupar and versiones is None:
+            producto = await agrupador_stock.ajustar(
+                producto_id, delta, id_usuario_actual
+            )
+        else:
+            producto_crud = AsyncProductoCRUD(db)
+            producto = await producto_crud.ajustar_stock(
+                producto_id, delta, versiones, id_usuario_actual
+            )
+        if not producto:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado"
+            )
+        response.headers["ETag"] = etag_version(producto.version)
+        return producto
+    except HTTPException:
+        raise
+    except VersionObsoletaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e),
+            headers={"ETag": etag_version(e.version_actual)},
+        )
+    except StockInsuficienteError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al ajustar stock: {str(e)}",
+        )
+
+
 @router.delete("/{producto_id}", response_model=RespuestaAPI)
-async def eliminar_producto(producto_id: UUID, db: Session = Depends(get_db)):
+async def eliminar_producto(
+    producto_id: UUID, db: AsyncSession = Depends(get_async_db)
+):
     """Eliminar un producto."""
     try:
-        producto_crud = ProductoCRUD(db)
+        producto_crud = AsyncProductoCRUD(db)
 
         # Verificar que el producto existe
-        producto_existente = producto_crud.obtener_producto(producto_id)
+        producto_existente = await producto_crud.obtener_producto(producto_id)
         if not producto_existente:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado"
             )
 
-        eliminado = producto_crud.eliminar_producto(producto_id)
+        eliminado = await producto_crud.eliminar_producto(producto_id)
         if eliminado:
             return RespuestaAPI(mensaje="Producto eliminado exitosamente", exito=True)
         else:
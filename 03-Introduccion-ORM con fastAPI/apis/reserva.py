@@ -0,0 +1,159 @@
+"""
+API de Reservas - Reserva de stock de cestas para el checkout
+"""
+
+import asyncio
+import os
+from uuid import UUID
+
+from apis.transaccion import RutaTransaccional
+from crud.producto_crud import StockInsuficienteError
+from crud.reserva_crud import LOTE_EXPIRACION, EstadoReservaError
+from crud.reserva_crud_async import AsyncReservaCRUD
+from database.config import AsyncSessionLocal, get_async_db
+from fastapi import APIRouter, Depends, HTTPException, status
+from schemas import ReservaCreate, ReservaResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Segundos entre dos barridos de reservas caducadas
+INTERVALO_BARRIDO = float(os.getenv("RESERVAS_INTERVALO_BARRIDO", "30"))
+
+router = APIRouter(prefix="/reservas", tags=["reservas"], route_class=RutaTransaccional)
+
+
+@router.post("/", response_model=ReservaResponse, status_code=status.HTTP_201_CREATED)
+async def crear_reserva(
+    reserva_data: ReservaCreate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Reservar el stock de una cesta de productos.
+
+    Todas las líneas se reservan a la vez o ninguna: si algún producto no
+    tiene stock suficiente se responde 409 y el stock no cambia. Las
+    unidades reservadas se descuentan del stock hasta que la reserva se
+    confirma, se cancela o caduca (`ttl_segundos`, 900 s por defecto).
+    """
+    try:
+        reserva_crud = AsyncReservaCRUD(db)
+        return await reserva_crud.crear_reserva(
+            [linea.model_dump() for linea in reserva_data.lineas],
+            reserva_data.usuario_id,
+            reserva_data.ttl_segundos,
+        )
+    except StockInsuficienteError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al crear reserva: {str(e)}",
+        )
+
+
+@router.get("/{reserva_id}", response_model=ReservaResponse)
+async def obtener_reserva(reserva_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    """Obtener una reserva con sus líneas."""
+    try:
+        reserva_crud = AsyncReservaCRUD(db)
+        reserva = await reserva_crud.obtener_reserva(reserva_id)
+        if not reserva:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Reserva no encontrada"
+            )
+        return reserva
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener reserva: {str(e)}",
+        )
+
+
+@router.post("/{reserva_id}/confirmar", response_model=ReservaResponse)
+async def confirmar_reserva(reserva_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    """
+    Confirmar una reserva pendiente (las unidades quedan vendidas).
+
+    Responde 409 si la reserva ya no está pendiente o ha caducado.
+    """
+    try:
+        reserva_crud = AsyncReservaCRUD(db)
+        reserva = await reserva_crud.confirmar_reserva(reserva_id)
+        if not reserva:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Reserva no encontrada"
+            )
+        return reserva
+    except HTTPException:
+        raise
+    except EstadoReservaError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al confirmar reserva: {str(e)}",
+        )
+
+
+@router.post("/{reserva_id}/cancelar", response_model=ReservaResponse)
+async def cancelar_reserva(reserva_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cancelar una reserva pendiente y devolver sus unidades al stock.
+
+    Responde 409 si la reserva ya no está pendiente o ha caducado.
+    """
+    try:
+        reserva_crud = AsyncReservaCRUD(db)
+        reserva = await reserva_crud.cancelar_reserva(reserva_id)
+        if not reserva:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Reserva no encontrada"
+            )
+        return reserva
+    except HTTPException:
+        raise
+    except EstadoReservaError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al cancelar reserva: {str(e)}",
+        )
+
+
+async def liberar_reservas_expiradas() -> int:
+    """
+    Liberar todas las reservas caducadas, en transacciones de
+    ``RESERVAS_LOTE_EXPIRACION`` reservas
+
+    Returns:
+        Número de reservas liberadas
+    """
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            liberadas = await AsyncReservaCRUD(db).liberar_expiradas()
+        total += liberadas
+        if liberadas < LOTE_EXPIRACION:
+            return total
+
+
+async def barrer_reservas_expiradas():
+    """
+    Tarea de fondo que libera las reservas caducadas cada
+    ``RESERVAS_INTERVALO_BARRIDO`` segundos
+
+    Varios workers pueden ejecutarla a la vez: ``SKIP LOCKED`` reparte las
+    reservas entre ellos sin que se esperen.
+    """
+    while True:
+        await asyncio.sleep(INTERVALO_BARRIDO)
+        try:
+            liberadas = await liberar_reservas_expiradas()
+        except Exception as e:
+            print(f"Error al liberar reservas expiradas: {e}")
+            continue
+        if liberadas:
+            print(f"Reservas expiradas liberadas: {liberadas}")
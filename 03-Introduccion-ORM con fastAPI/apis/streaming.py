@@ -0,0 +1,60 @@
+"""
+Respuestas JSON en streaming para recorrer listados completos
+"""
+
+import os
+from typing import Callable, List, Optional
+
+from database.config import AsyncSessionLocal
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Select
+
+# Filas que se leen del cursor del servidor y se serializan de cada vez
+TAMAÑO_LOTE = int(os.getenv("STREAMING_TAMAÑO_LOTE", "500"))
+
+
+def respuesta_streaming(
+    consulta: Select, esquema, convertir: Optional[Callable] = None
+) -> StreamingResponse:
+    """
+    Devolver todas las filas de una consulta como un array JSON en streaming
+
+    La consulta se ejecuta con un cursor del servidor (``yield_per``): se
+    leen ``TAMAÑO_LOTE`` filas, se serializan, se envían y se descartan
+    antes de leer las siguientes. La memoria del worker no depende del
+    número de filas. Se usa una sesión propia que vive lo mismo que la
+    respuesta.
+
+    Args:
+        consulta: Sentencia SELECT de entidades, ya filtrada y ordenada
+        esquema: Modelo Pydantic de cada elemento
+        convertir: Función que crea el modelo de cada entidad; los campos que
+            no asigne no se incluyen (por defecto se leen todos)
+
+    Returns:
+        Respuesta ``application/json`` enviada por trozos
+    """
+    adaptador = TypeAdapter(List[esquema])
+
+    async def generar():
+        async with AsyncSessionLocal() as db:
+            resultado = await db.stream_scalars(
+                consulta.execution_options(yield_per=TAMAÑO_LOTE)
+            )
+            separador = b"["
+            async for lote in resultado.partitions():
+                if convertir is None:
+                    modelos = adaptador.validate_python(lote, from_attributes=True)
+                else:
+                    modelos = [convertir(entidad) for entidad in lote]
+                elementos = adaptador.dump_json(modelos, exclude_unset=True)
+                # Se quitan los corchetes del array del lote para unirlo al
+                # array de la respuesta
+                # El mapa de identidad de la sesión guarda referencias débiles:
+                # las entidades del lote se liberan al pasar al siguiente
+                yield separador + elementos[1:-1]
+                separador = b","
+            yield b"[]" if separador == b"[" else b"]"
+
+    return StreamingResponse(generar(), media_type="application/json")
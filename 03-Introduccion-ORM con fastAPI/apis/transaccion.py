@@ -0,0 +1,53 @@
+"""
+Rutas que confirman la unidad de trabajo de la petición antes de responder
+"""
+
+from typing import Callable
+
+from database.unidad_trabajo import tiene_cambios_pendientes
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+
+
+class RutaTransaccional(APIRoute):
+    """
+    Ruta que hace un único commit por petición
+
+    Las clases CRUD solo hacen flush sobre la sesión de ``get_async_db``.
+    Cuando el endpoint termina bien (código < 400) y hubo escrituras, se
+    confirma la transacción antes de enviar la respuesta, así que el cliente
+    nunca recibe un 2xx de algo que no se guardó. Si el endpoint falla, se
+    deshacen todas las escrituras de la petición. Las peticiones de solo
+    lectura no hacen commit.
+    """
+
+    def get_route_handler(self) -> Callable:
+        manejador = super().get_route_handler()
+
+        async def manejador_transaccional(request: Request) -> Response:
+            try:
+                respuesta = await manejador(request)
+            except BaseException:
+                # Se deshace ya para liberar los bloqueos sin esperar a que
+                # se cierre la sesión, que ocurre después de responder
+                db = getattr(request.state, "db", None)
+                if db is not None and db.in_transaction():
+                    await db.rollback()
+                raise
+            db = getattr(request.state, "db", None)
+            if db is None or not tiene_cambios_pendientes(db.sync_session):
+                return respuesta
+            if respuesta.status_code >= 400:
+                await db.rollback()
+                return respuesta
+            try:
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error al confirmar la transacción: {str(e)}",
+                )
+            return respuesta
+
+        return manejador_transaccional
@@ -2,33 +2,147 @@
 API de Usuarios - Endpoints para gestión de usuarios
 """
 
-from typing import List
+import asyncio
+from typing import List, Optional
 from uuid import UUID
 
-from crud.usuario_crud import UsuarioCRUD
-from database.config import get_db
-from fastapi import APIRouter, Depends, HTTPException, status
+from apis.http_cache import (
+    CACHE_PRIVADA,
+    calcular_etag,
+    marca_tiempo,
+    respuesta_condicional,
+)
+from apis.streaming import respuesta_streaming
+from apis.transaccion import RutaTransaccional
+from auth.security import HasherOverloadedError
+from crud.paginacion import MAX_LIMITE, siguiente_cursor
+from crud.producto_crud_async import AsyncProductoCRUD
+from crud.usuario_crud import INTERVALO_REFRESCO_FILTRO
+from crud.usuario_crud_async import AsyncUsuarioCRUD
+from database.config import AsyncSessionLocal, get_async_db
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from schemas import (
     CambioContraseña,
+    CambiosUsuariosResponse,
     RespuestaAPI,
     UsuarioCreate,
     UsuarioResponse,
+    UsuariosPorIdsResponse,
     UsuarioUpdate,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter(prefix="/usuarios", tags=["usuarios"])
+router = APIRouter(prefix="/usuarios", tags=["usuarios"], route_class=RutaTransaccional)
 
 
 @router.get("/", response_model=List[UsuarioResponse])
 async def obtener_usuarios(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener todos los usuarios con paginación.
+
+    Sin `cursor` se usa paginación por offset (`skip`). Con `cursor` se usa
+    paginación keyset; el cursor de la página siguiente se devuelve en la
+    cabecera `X-Next-Cursor`.
+
+    Devuelve `ETag`; con `If-None-Match` y la página sin cambios responde 304.
+
+    `limit` admite como máximo 500 usuarios. Con `stream=true` se devuelven
+    todos como un array JSON enviado por trozos, sin ETag.
+    """
+    try:
+        usuario_crud = AsyncUsuarioCRUD(db)
+        if stream:
+            return respuesta_streaming(
+                usuario_crud.consulta_usuarios(), UsuarioResponse
+            )
+        usuarios = await usuario_crud.obtener_usuarios(
+            skip=skip, limit=limit, cursor=cursor
+        )
+        proximo_cursor = siguiente_cursor(usuarios, limit, "id")
+        if proximo_cursor:
+            response.headers["X-Next-Cursor"] = proximo_cursor
+        no_modificado = respuesta_condicional(
+            request, response, calcular_etag(usuarios, "id"), CACHE_PRIVADA
+        )
+        return no_modificado or usuarios
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener usuarios: {str(e)}",
+        )
+
+
+@router.get("/disponibilidad", response_model=RespuestaAPI)
+async def comprobar_disponibilidad(
+    nombre_usuario: Optional[str] = None,
+    email: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Comprobar si un nombre de usuario y/o un email están libres.
+
+    La mayoría de valores libres se resuelven con un filtro de Bloom en
+    memoria sin consultar la BD. El filtro se sincroniza con las altas de
+    todos los workers cada `BLOOM_USUARIOS_REFRESCO` segundos; si lleva más
+    de tres intervalos sin sincronizarse se consulta la BD. El resultado es
+    orientativo: el alta valida de nuevo la unicidad.
+    """
+    try:
+        usuario_crud = AsyncUsuarioCRUD(db)
+        disponibilidad = await usuario_crud.comprobar_disponibilidad(
+            nombre_usuario=nombre_usuario, email=email
+        )
+        return RespuestaAPI(
+            mensaje="Disponibilidad comprobada", exito=True, datos=disponibilidad
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al comprobar disponibilidad: {str(e)}",
+        )
+
+
+@router.get("/lote", response_model=UsuariosPorIdsResponse)
+async def obtener_usuarios_por_ids(
+    ids: List[UUID] = Query([]),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Obtener todos los usuarios con paginación."""
+    """
+    Obtener varios usuarios por id con una sola consulta.
+
+    Los ids se pasan repitiendo el parámetro (`?ids=...&ids=...`), como
+    máximo 500. `resultados` tiene un elemento por id pedido, en
+    el mismo orden, con `null` para los que no existen; esos ids se repiten
+    en `no_encontrados`.
+    """
     try:
-        usuario_crud = UsuarioCRUD(db)
-        usuarios = usuario_crud.obtener_usuarios(skip=skip, limit=limit)
-        return usuarios
+        usuario_crud = AsyncUsuarioCRUD(db)
+        resultados, no_encontrados = await usuario_crud.obtener_usuarios_por_ids(ids)
+        return UsuariosPorIdsResponse(
+            resultados=resultados, no_encontrados=no_encontrados
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -36,17 +150,62 @@ async def obtener_usuarios(
         )
 
 
+@router.get("/cambios", response_model=CambiosUsuariosResponse)
+async def obtener_cambios_usuarios(
+    desde: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener los usuarios creados, modificados o eliminados desde un cursor, para
+    sincronizar el cliente sin volver a descargar la lista completa.
+
+    Sin `desde` devuelve todos los usuarios (sincronización inicial). `cambios`
+    contiene el estado actual de cada registro escrito y `eliminados` los ids
+    borrados; el `cursor` de la respuesta se envía como `desde` en la
+    siguiente petición. Con `hay_mas` quedan cambios: se pide otra página
+    enseguida.
+    """
+    try:
+        usuario_crud = AsyncUsuarioCRUD(db)
+        return await usuario_crud.obtener_cambios(desde, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener cambios de usuarios: {str(e)}",
+        )
+
+
 @router.get("/{usuario_id}", response_model=UsuarioResponse)
-async def obtener_usuario(usuario_id: UUID, db: Session = Depends(get_db)):
-    """Obtener un usuario por ID."""
+async def obtener_usuario(
+    usuario_id: UUID,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener un usuario por ID.
+
+    Devuelve `ETag` y `Last-Modified`; responde 304 a `If-None-Match` o
+    `If-Modified-Since` si no ha cambiado.
+    """
     try:
-        usuario_crud = UsuarioCRUD(db)
-        usuario = usuario_crud.obtener_usuario(usuario_id)
+        usuario_crud = AsyncUsuarioCRUD(db)
+        usuario = await usuario_crud.obtener_usuario(usuario_id)
         if not usuario:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
             )
-        return usuario
+        no_modificado = respuesta_condicional(
+            request,
+            response,
+            calcular_etag([usuario], "id"),
+            CACHE_PRIVADA,
+            marca_tiempo(usuario),
+        )
+        return no_modificado or usuario
     except HTTPException:
         raise
     except Exception as e:
@@ -57,11 +216,13 @@ async def obtener_usuario(usuario_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/email/{email}", response_model=UsuarioResponse)
-async def obtener_usuario_por_email(email: str, db: Session = Depends(get_db)):
+async def obtener_usuario_por_email(
+    email: str, db: AsyncSession = Depends(get_async_db)
+):
     """Obtener un usuario por email."""
     try:
-        usuario_crud = UsuarioCRUD(db)
-        usuario = usuario_crud.obtener_usuario_por_email(email)
+        usuario_crud = AsyncUsuarioCRUD(db)
+        usuario = await usuario_crud.obtener_usuario_por_email(email)
         if not usuario:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
@@ -78,12 +239,12 @@ async def obtener_usuario_por_email(email: str, db: Session = Depends(get_db)):
 
 @router.get("/username/{nombre_usuario}", response_model=UsuarioResponse)
 async def obtener_usuario_por_nombre_usuario(
-    nombre_usuario: str, db: Session = Depends(get_db)
+    nombre_usuario: str, db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener un usuario por nombre de usuario."""
     try:
-        usuario_crud = UsuarioCRUD(db)
-        usuario = usuario_crud.obtener_usuario_por_nombre_usuario(nombre_usuario)
+        usuario_crud = AsyncUsuarioCRUD(db)
+        usuario = await usuario_crud.obtener_usuario_por_nombre_usuario(nombre_usuario)
         if not usuario:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
@@ -99,11 +260,13 @@ async def obtener_usuario_por_nombre_usuario(
 
 
 @router.post("/", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED)
-async def crear_usuario(usuario_data: UsuarioCreate, db: Session = Depends(get_db)):
+async def crear_usuario(
+    usuario_data: UsuarioCreate, db: AsyncSession = Depends(get_async_db)
+):
     """Crear un nuevo usuario."""
     try:
-        usuario_crud = UsuarioCRUD(db)
-        usuario = usuario_crud.crear_usuario(
+        usuario_crud = AsyncUsuarioCRUD(db)
+        usuario = await usuario_crud.crear_usuario(
             nombre=usuario_data.nombre,
             nombre_usuario=usuario_data.nombre_usuario,
             email=usuario_data.email,
@@ -114,6 +277,10 @@ async def crear_usuario(usuario_data: UsuarioCreate, db: Session = Depends(get_d
         return usuario
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HasherOverloadedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -123,31 +290,32 @@ async def crear_usuario(usuario_data: UsuarioCreate, db: Session = Depends(get_d
 
 @router.put("/{usuario_id}", response_model=UsuarioResponse)
 async def actualizar_usuario(
-    usuario_id: UUID, usuario_data: UsuarioUpdate, db: Session = Depends(get_db)
+    usuario_id: UUID,
+    usuario_data: UsuarioUpdate,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Actualizar un usuario existente."""
     try:
-        usuario_crud = UsuarioCRUD(db)
-
-        # Verificar que el usuario existe
-        usuario_existente = usuario_crud.obtener_usuario(usuario_id)
-        if not usuario_existente:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
-            )
+        usuario_crud = AsyncUsuarioCRUD(db)
 
         # Filtrar campos None para actualización
         campos_actualizacion = {
             k: v for k, v in usuario_data.dict().items() if v is not None
         }
 
-        if not campos_actualizacion:
-            return usuario_existente
+        if campos_actualizacion:
+            # Un único UPDATE ... RETURNING; None si el usuario no existe
+            usuario = await usuario_crud.actualizar_usuario(
+                usuario_id, **campos_actualizacion
+            )
+        else:
+            usuario = await usuario_crud.obtener_usuario(usuario_id)
 
-        usuario_actualizado = usuario_crud.actualizar_usuario(
-            usuario_id, **campos_actualizacion
-        )
-        return usuario_actualizado
+        if not usuario:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
+            )
+        return usuario
     except HTTPException:
         raise
     except ValueError as e:
@@ -160,19 +328,19 @@ async def actualizar_usuario(
 
 
 @router.delete("/{usuario_id}", response_model=RespuestaAPI)
-async def eliminar_usuario(usuario_id: UUID, db: Session = Depends(get_db)):
+async def eliminar_usuario(usuario_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Eliminar un usuario."""
     try:
-        usuario_crud = UsuarioCRUD(db)
+        usuario_crud = AsyncUsuarioCRUD(db)
 
         # Verificar que el usuario existe
-        usuario_existente = usuario_crud.obtener_usuario(usuario_id)
+        usuario_existente = await usuario_crud.obtener_usuario(usuario_id)
         if not usuario_existente:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
             )
 
-        eliminado = usuario_crud.eliminar_usuario(usuario_id)
+        eliminado = await usuario_crud.eliminar_usuario(usuario_id)
         if eliminado:
             return RespuestaAPI(mensaje="Usuario eliminado exitosamente", exito=True)
         else:
@@ -190,18 +358,36 @@ async def eliminar_usuario(usuario_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.patch("/{usuario_id}/desactivar", response_model=UsuarioResponse)
-async def desactivar_usuario(usuario_id: UUID, db: Session = Depends(get_db)):
-    """Desactivar un usuario (soft delete)."""
+async def desactivar_usuario(
+    usuario_id: UUID,
+    response: Response,
+    reasignar_a: Optional[UUID] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Desactivar un usuario (soft delete).
+
+    Con `reasignar_a`, sus productos pasan a ese usuario en la misma
+    transacción: o se hacen los dos cambios o ninguno. El número de productos
+    reasignados se devuelve en la cabecera `X-Productos-Reasignados`.
+    """
     try:
-        usuario_crud = UsuarioCRUD(db)
-        usuario = usuario_crud.desactivar_usuario(usuario_id)
+        usuario_crud = AsyncUsuarioCRUD(db)
+        usuario = await usuario_crud.desactivar_usuario(usuario_id)
         if not usuario:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
             )
+        if reasignar_a is not None:
+            reasignados = await AsyncProductoCRUD(db).reasignar_productos(
+                usuario_id, reasignar_a
+            )
+            response.headers["X-Productos-Reasignados"] = str(reasignados)
         return usuario
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -211,20 +397,22 @@ async def desactivar_usuario(usuario_id: UUID, db: Session = Depends(get_db)):
 
 @router.post("/{usuario_id}/cambiar-contraseña", response_model=RespuestaAPI)
 async def cambiar_contraseña(
-    usuario_id: UUID, cambio_data: CambioContraseña, db: Session = Depends(get_db)
+    usuario_id: UUID,
+    cambio_data: CambioContraseña,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Cambiar la contraseña de un usuario."""
     try:
-        usuario_crud = UsuarioCRUD(db)
+        usuario_crud = AsyncUsuarioCRUD(db)
 
         # Verificar que el usuario existe
-        usuario_existente = usuario_crud.obtener_usuario(usuario_id)
+        usuario_existente = await usuario_crud.obtener_usuario(usuario_id)
         if not usuario_existente:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
             )
 
-        cambio_exitoso = usuario_crud.cambiar_contraseña(
+        cambio_exitoso = await usuario_crud.cambiar_contraseña(
             usuario_id, cambio_data.contraseña_actual, cambio_data.nueva_contraseña
         )
 
@@ -239,6 +427,10 @@ async def cambiar_contraseña(
         raise
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HasherOverloadedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -247,12 +439,32 @@ async def cambiar_contraseña(
 
 
 @router.get("/admin/lista", response_model=List[UsuarioResponse])
-async def obtener_usuarios_admin(db: Session = Depends(get_db)):
-    """Obtener todos los usuarios administradores."""
+async def obtener_usuarios_admin(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_LIMITE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Obtener los usuarios administradores.
+
+    Paginación por cursor (`X-Next-Cursor`), como máximo 500 por página. Con
+    `stream=true` se devuelven todos como un array JSON enviado por trozos.
+    """
     try:
-        usuario_crud = UsuarioCRUD(db)
-        admins = usuario_crud.obtener_usuarios_admin()
+        usuario_crud = AsyncUsuarioCRUD(db)
+        if stream:
+            return respuesta_streaming(
+                usuario_crud.consulta_usuarios(solo_admin=True), UsuarioResponse
+            )
+        admins = await usuario_crud.obtener_usuarios_admin(limit=limit, cursor=cursor)
+        proximo_cursor = siguiente_cursor(admins, limit, "id")
+        if proximo_cursor:
+            response.headers["X-Next-Cursor"] = proximo_cursor
         return admins
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -261,11 +473,13 @@ async def obtener_usuarios_admin(db: Session = Depends(get_db)):
 
 
 @router.get("/{usuario_id}/es-admin", response_model=RespuestaAPI)
-async def verificar_es_admin(usuario_id: UUID, db: Session = Depends(get_db)):
+async def verificar_es_admin(
+    usuario_id: UUID, db: AsyncSession = Depends(get_async_db)
+):
     """Verificar si un usuario es administrador."""
     try:
-        usuario_crud = UsuarioCRUD(db)
-        es_admin = usuario_crud.es_admin(usuario_id)
+        usuario_crud = AsyncUsuarioCRUD(db)
+        es_admin = await usuario_crud.es_admin(usuario_id)
         return RespuestaAPI(
             mensaje=f"El usuario {'es' if es_admin else 'no es'} administrador",
             exito=True,
@@ -276,4 +490,20 @@ async def verificar_es_admin(usuario_id: UUID, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al verificar administrador: {str(e)}",
         )
-# body, string_parameter, path parameter
\ No newline at end of file
+
+
+# body, string_parameter, path parameter
+
+
+async def sincronizar_filtro_usuarios():
+    """
+    Tarea de fondo que añade al filtro de identificadores los usuarios
+    escritos por cualquier worker cada ``BLOOM_USUARIOS_REFRESCO`` segundos
+    """
+    while True:
+        await asyncio.sleep(INTERVALO_REFRESCO_FILTRO)
+        try:
+            async with AsyncSessionLocal() as db:
+                await AsyncUsuarioCRUD(db).refrescar_filtro()
+        except Exception as e:
+            print(f"Error al sincronizar el filtro de usuarios: {e}")
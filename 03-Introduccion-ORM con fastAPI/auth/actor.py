@@ -0,0 +1,165 @@
+"""
+Resolución del usuario que realiza una operación (columnas de auditoría)
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+from uuid import UUID
+
+from cache.lru import CacheLRU
+from database.config import get_async_db
+from entities.usuario import Usuario
+from fastapi import Depends, Header, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+class ResolutorActorSistema:
+    """
+    Caché de proceso, con TTL, del administrador usado por defecto en
+    ``id_usuario_crea``/``id_usuario_edita`` cuando la petición no identifica
+    a quien la hace, y de los usuarios ya comprobados como activos cuando sí
+    lo hace. Evita una consulta extra a ``tbl_usuarios`` en cada escritura;
+    ``UsuarioCRUD`` la invalida al cambiar ``es_admin``/``activo`` o al
+    eliminar un usuario. Los cambios hechos en otro worker se ven al caducar
+    las entradas.
+    """
+
+    def __init__(self, ttl_segundos: float = None, max_usuarios: int = None):
+        self.ttl_segundos = (
+            ttl_segundos
+            if ttl_segundos is not None
+            else float(os.getenv("ACTOR_SISTEMA_TTL", "300"))
+        )
+        self._lock = threading.Lock()
+        self._admin_id: Optional[UUID] = None
+        self._expira = 0.0
+        self._activos = CacheLRU(
+            max_entradas=(
+                max_usuarios
+                if max_usuarios is not None
+                else int(os.getenv("ACTOR_USUARIOS_MAX", "10000"))
+            ),
+            ttl_segundos=self.ttl_segundos,
+        )
+
+    def resolver(self, db: Session, id_usuario: UUID = None) -> Optional[UUID]:
+        """
+        Obtener el UUID del usuario al que atribuir una escritura
+
+        Args:
+            db: Sesión de base de datos
+            id_usuario: UUID del usuario que hace la petición, si se conoce
+                (ya comprobado por ``obtener_id_usuario_actual``)
+
+        Returns:
+            ``id_usuario`` si se indicó; si no, el administrador por defecto
+            (desde la caché mientras no expire) o None si no hay ninguno
+        """
+        if id_usuario is not None:
+            return id_usuario
+
+        with self._lock:
+            if self._admin_id is not None and time.monotonic() < self._expira:
+                return self._admin_id
+
+        admin_id = db.scalar(
+            select(Usuario.id)
+            .where(Usuario.es_admin == True, Usuario.activo == True)
+            .order_by(Usuario.fecha_creacion, Usuario.id)
+            .limit(1)
+        )
+        if admin_id is not None:
+            with self._lock:
+                self._admin_id = admin_id
+                self._expira = time.monotonic() + self.ttl_segundos
+        return admin_id
+
+    async def usuario_activo(self, db: AsyncSession, id_usuario: UUID) -> bool:
+        """
+        Comprobar que un usuario exista y esté activo
+
+        Solo se consulta la BD si el usuario no está en caché; los usuarios
+        inexistentes o inactivos no se guardan.
+
+        Args:
+            db: Sesión asíncrona de la petición
+            id_usuario: UUID del usuario
+
+        Returns:
+            True si el usuario existe y está activo
+        """
+        if self._activos.obtener(id_usuario, False):
+            return True
+        existe = await db.scalar(
+            select(Usuario.id).where(Usuario.id == id_usuario, Usuario.activo == True)
+        )
+        if existe is None:
+            return False
+        self._activos.guardar(id_usuario, True)
+        return True
+
+    def invalidar(self, id_usuario: UUID = None):
+        """
+        Olvidar el administrador en caché y un usuario comprobado
+
+        Args:
+            id_usuario: UUID del usuario modificado; sin él se olvidan todos
+        """
+        with self._lock:
+            self._admin_id = None
+            self._expira = 0.0
+        if id_usuario is None:
+            self._activos.limpiar()
+        else:
+            self._activos.invalidar(id_usuario)
+
+    def metricas(self) -> dict:
+        """Estado de la caché de usuarios comprobados"""
+        return self._activos.metricas()
+
+
+# Instancia compartida por todas las clases CRUD del proceso
+actor_sistema = ResolutorActorSistema()
+
+# /auth/login no emite tokens, así que la petición no trae un contexto de
+# autenticación del que tomar el usuario. X-Usuario-Id solo se acepta si la
+# API está detrás de un proxy de confianza que fija la cabecera tras
+# autenticar al usuario y descarta la que envía el cliente.
+CONFIAR_CABECERA_USUARIO = os.getenv(
+    "CONFIAR_CABECERA_USUARIO", "false"
+).strip().lower() in ("1", "true", "si", "sí")
+
+
+async def obtener_id_usuario_actual(
+    x_usuario_id: Optional[UUID] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+) -> Optional[UUID]:
+    """
+    Dependencia de FastAPI con el usuario que hace la petición
+
+    El usuario llega en la cabecera ``X-Usuario-Id``, que solo se tiene en
+    cuenta con ``CONFIAR_CABECERA_USUARIO`` activada: debe fijarla un proxy
+    de confianza tras autenticar al usuario. La cabecera no es una
+    credencial; sin esa configuración se ignora, porque cualquier cliente
+    podría atribuir sus escrituras a otro usuario.
+
+    Se comprueba que el usuario exista y esté activo, con la misma sesión de
+    la petición la primera vez y después desde la caché de ``actor_sistema``
+    mientras no caduque. Sin cabecera (o sin confiar en ella) se devuelve None y las
+    clases CRUD atribuyen la operación al administrador por defecto.
+
+    Raises:
+        HTTPException: 401 si el usuario no existe o está inactivo
+    """
+    if x_usuario_id is None or not CONFIAR_CABECERA_USUARIO:
+        return None
+    if not await actor_sistema.usuario_activo(db, x_usuario_id):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="El usuario de la cabecera X-Usuario-Id no existe o está inactivo",
+        )
+    return x_usuario_id
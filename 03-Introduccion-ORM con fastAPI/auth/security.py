@@ -2,8 +2,13 @@
 Módulo de seguridad para manejo de contraseñas
 """
 
+import asyncio
 import hashlib
+import os
 import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 
 
@@ -95,3 +100,145 @@ class PasswordManager:
         characters = string.ascii_letters + string.digits + "!@#$%^&*()_+-=[]{}|;:,.<>?"
         password = "".join(secrets.choice(characters) for _ in range(length))
         return password
+
+
+class HasherOverloadedError(Exception):
+    """El servicio de hash tiene su cola llena y rechaza nuevas peticiones"""
+
+
+class AsyncPasswordHasher:
+    """
+    Servicio asíncrono de hash de contraseñas sobre un pool de hilos acotado
+
+    PBKDF2 con 100 000 iteraciones tarda decenas de milisegundos; ejecutarlo en
+    un handler ``async def`` congela el event loop. Este servicio lo delega a un
+    ``ThreadPoolExecutor`` dedicado (``hashlib.pbkdf2_hmac`` libera el GIL) y
+    limita cuántas peticiones pueden esperar turno: al superar el límite se
+    lanza ``HasherOverloadedError`` en lugar de acumular latencia.
+    """
+
+    def __init__(self, max_workers: int = None, max_cola: int = None):
+        self.max_workers = max_workers or int(
+            os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        self.max_cola = max_cola or int(os.getenv("HASH_MAX_COLA", "64"))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._en_ejecucion = 0
+        self._completadas = 0
+        self._rechazadas = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+        self._ejecucion_total = 0.0
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    async def _ejecutar(self, funcion, *args):
+        with self._lock:
+            if self._pendientes >= self.max_workers + self.max_cola:
+                self._rechazadas += 1
+                raise HasherOverloadedError(
+                    "El servicio de autenticación está saturado, intente de nuevo"
+                )
+            self._pendientes += 1
+        encolado = time.perf_counter()
+
+        def tarea():
+            inicio = time.perf_counter()
+            with self._lock:
+                self._en_ejecucion += 1
+                espera = inicio - encolado
+                self._espera_total += espera
+                self._espera_maxima = max(self._espera_maxima, espera)
+            try:
+                return funcion(*args)
+            finally:
+                with self._lock:
+                    self._en_ejecucion -= 1
+                    self._completadas += 1
+                    self._ejecucion_total += time.perf_counter() - inicio
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._obtener_executor(), tarea)
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+
+    async def hash_password(self, password: str) -> str:
+        """
+        Generar el hash de una contraseña sin bloquear el event loop
+
+        Args:
+            password: Contraseña en texto plano
+
+        Returns:
+            Hash de la contraseña con salt
+
+        Raises:
+            HasherOverloadedError: Si la cola del servicio está llena
+        """
+        return await self._ejecutar(PasswordManager.hash_password, password)
+
+    async def verify_password(self, password: str, password_hash: str) -> bool:
+        """
+        Verificar una contraseña contra su hash sin bloquear el event loop
+
+        Args:
+            password: Contraseña en texto plano
+            password_hash: Hash almacenado
+
+        Returns:
+            True si la contraseña es correcta, False en caso contrario
+
+        Raises:
+            HasherOverloadedError: Si la cola del servicio está llena
+        """
+        return await self._ejecutar(
+            PasswordManager.verify_password, password, password_hash
+        )
+
+    def metricas(self) -> dict:
+        """
+        Obtener las métricas del servicio
+
+        Returns:
+            Diccionario con el estado del pool y los tiempos medios en ms
+        """
+        with self._lock:
+            completadas = self._completadas
+            return {
+                "workers": self.max_workers,
+                "max_cola": self.max_cola,
+                "en_ejecucion": self._en_ejecucion,
+                "en_cola": self._pendientes - self._en_ejecucion,
+                "completadas": completadas,
+                "rechazadas": self._rechazadas,
+                "espera_media_ms": (
+                    round(self._espera_total / completadas * 1000, 2)
+                    if completadas
+                    else 0.0
+                ),
+                "espera_maxima_ms": round(self._espera_maxima * 1000, 2),
+                "ejecucion_media_ms": (
+                    round(self._ejecucion_total / completadas * 1000, 2)
+                    if completadas
+                    else 0.0
+                ),
+            }
+
+    def cerrar(self):
+        """Liberar los hilos del pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Instancia compartida por todos los endpoints del proceso
+password_hasher = AsyncPasswordHasher()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Comparación de throughput: ruta síncrona (Session) vs ruta asíncrona (AsyncSession)
+
+Simula lo que hace uvicorn con un único worker: lanza N peticiones concurrentes
+dentro del mismo event loop. En la ruta síncrona cada consulta bloquea el loop,
+por lo que las peticiones se atienden de una en una; en la ruta asíncrona las
+consultas quedan en vuelo a la vez.
+
+Uso:
+    python benchmarks/benchmark_async.py --peticiones 200 --latencia 0.05
+
+``--latencia`` añade un ``pg_sleep`` por petición para emular el round-trip
+a una base de datos remota como Neon.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crud.usuario_crud import UsuarioCRUD
+from crud.usuario_crud_async import AsyncUsuarioCRUD
+from database.config import AsyncSessionLocal, SessionLocal, async_engine, engine
+from sqlalchemy import text
+
+
+async def peticion_sincrona(latencia: float):
+    """Handler ``async def`` que usa la sesión síncrona (comportamiento anterior)"""
+    db = SessionLocal()
+    try:
+        if latencia:
+            db.execute(text("SELECT pg_sleep(:s)"), {"s": latencia})
+        UsuarioCRUD(db).obtener_usuarios(limit=10)
+    finally:
+        db.close()
+
+
+async def peticion_asincrona(latencia: float):
+    """Handler ``async def`` que usa la sesión asíncrona"""
+    async with AsyncSessionLocal() as db:
+        if latencia:
+            await db.execute(text("SELECT pg_sleep(:s)"), {"s": latencia})
+        await AsyncUsuarioCRUD(db).obtener_usuarios(limit=10)
+
+
+async def medir(nombre: str, peticion, total: int, concurrencia: int, latencia: float):
+    """Ejecutar ``total`` peticiones con ``concurrencia`` en vuelo y mostrar el resultado"""
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def una():
+        async with semaforo:
+            await peticion(latencia)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(total)))
+    duracion = time.perf_counter() - inicio
+    print(
+        f"{nombre:<10} {total} peticiones en {duracion:.2f}s "
+        f"-> {total / duracion:.1f} peticiones/s"
+    )
+    return total / duracion
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    args = parser.parse_args()
+
+    # Calentar ambos pools para no medir el establecimiento de conexiones
+    await medir("warmup", peticion_sincrona, 5, 1, 0)
+    await medir("warmup", peticion_asincrona, 5, 5, 0)
+
+    sincrono = await medir(
+        "sync", peticion_sincrona, args.peticiones, args.concurrencia, args.latencia
+    )
+    asincrono = await medir(
+        "async", peticion_asincrona, args.peticiones, args.concurrencia, args.latencia
+    )
+    print(f"Mejora: x{asincrono / sincrono:.1f}")
+
+    engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
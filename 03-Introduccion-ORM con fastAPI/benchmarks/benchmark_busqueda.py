@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Latencia de la búsqueda LIKE '%texto%' vs búsqueda de texto completo (GIN)
+
+Compara la consulta anterior de GET /productos/buscar/{nombre}, un
+``nombre LIKE '%texto%'`` sin límite que recorre la tabla entera, con
+ProductoCRUD.buscar_productos, que usa el índice GIN de ``productos.busqueda``
+y devuelve la primera página ordenada por relevancia.
+
+Uso:
+    python benchmarks/benchmark_busqueda.py --sembrar 1000000
+    python benchmarks/benchmark_busqueda.py --limit 20 cafe "mesa roble"
+
+``--sembrar N`` inserta N productos de prueba con generate_series antes de medir.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crud.producto_crud import ProductoCRUD
+from database.config import SessionLocal
+from entities.categoria import Categoria
+from entities.producto import Producto
+from entities.usuario import Usuario
+from sqlalchemy import text
+
+TERMINOS = ["cafe", "mesa roble", "Café 4242", "lampara 777", "inexistente"]
+
+# Vocabulario con acentos para que los nombres sembrados se parezcan a un catálogo
+PALABRAS = [
+    "Café",
+    "Camión",
+    "Mesa",
+    "Silla",
+    "Zapatilla",
+    "Lámpara",
+    "Cojín",
+    "Teléfono",
+    "Balón",
+    "Cuaderno",
+]
+ADJETIVOS = ["de roble", "azul", "ecológico", "clásica", "pequeño", "de montaña"]
+
+
+def sembrar(db, cantidad: int):
+    """Insertar ``cantidad`` productos de prueba en una sola sentencia"""
+    usuario = db.query(Usuario).first()
+    categoria = db.query(Categoria).first()
+    if not usuario or not categoria:
+        raise SystemExit("Se necesita al menos un usuario y una categoría")
+
+    db.execute(
+        text("""
+            INSERT INTO productos (id_producto, nombre, descripcion, precio, stock,
+                                   categoria_id, usuario_id, id_usuario_crea)
+            SELECT gen_random_uuid(),
+                   (:palabras)[1 + n % cardinality(:palabras)] || ' '
+                       || (:adjetivos)[1 + (n / 7) % cardinality(:adjetivos)]
+                       || ' ' || n,
+                   'Producto de prueba número ' || n,
+                   10, 1, :categoria, :usuario, :usuario
+            FROM generate_series(1, :cantidad) AS n
+            """),
+        {
+            "palabras": PALABRAS,
+            "adjetivos": ADJETIVOS,
+            "categoria": categoria.id_categoria,
+            "usuario": usuario.id,
+            "cantidad": cantidad,
+        },
+    )
+    db.commit()
+    db.execute(text("ANALYZE productos"))
+
+
+def cronometrar(funcion, repeticiones: int) -> float:
+    """Mediana en milisegundos de ``repeticiones`` ejecuciones"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("terminos", nargs="*", default=TERMINOS)
+    parser.add_argument("--sembrar", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.sembrar:
+            sembrar(db, args.sembrar)
+
+        total = db.query(Producto).count()
+        crud = ProductoCRUD(db)
+        print(f"{total} productos, {args.limit} resultados por página")
+        print(
+            f"{'término':>14} {'LIKE (ms)':>10} {'filas':>8} "
+            f"{'GIN (ms)':>10} {'filas':>6}"
+        )
+
+        for termino in args.terminos:
+            # Consulta anterior: sin índice utilizable y sin límite
+            like = lambda: (
+                db.query(Producto).filter(Producto.nombre.contains(termino)).all()
+            )
+            gin = lambda: crud.buscar_productos(termino, limit=args.limit)
+
+            like_ms = cronometrar(like, args.repeticiones)
+            filas_like = len(like())
+            gin_ms = cronometrar(gin, args.repeticiones)
+            filas_gin = len(gin()[0])
+            db.expunge_all()
+            print(
+                f"{termino:>14} {like_ms:>10.2f} {filas_like:>8} "
+                f"{gin_ms:>10.2f} {filas_gin:>6}"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Sincronización del catálogo: descarga completa vs feed de cambios
+
+Simula un cliente que mantiene su copia de los productos al día. Sin feed,
+cada refresco vuelve a leer todas las páginas de ``GET /productos``; con
+``GET /productos/cambios`` lee solo los productos escritos o eliminados
+desde su cursor, con un recorrido por rango del índice
+``(xid_cambio, id_producto)``.
+
+Uso:
+    python benchmarks/benchmark_feed_cambios.py --productos 20000 --cambios 50
+    python benchmarks/benchmark_feed_cambios.py --refrescos 20
+
+Entre refresco y refresco se modifican ``--cambios`` productos y se elimina
+uno, y se comprueba que la copia del cliente coincide con la tabla.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crud.paginacion import MAX_LIMITE, siguiente_cursor
+from crud.producto_crud_async import AsyncProductoCRUD
+from database.config import AsyncSessionLocal, async_engine
+from entities.categoria import Categoria
+from entities.producto import Producto
+from entities.usuario import Usuario
+from sqlalchemy import delete, insert, select, update
+
+PREFIJO = "Benchmark feed"
+
+
+async def sembrar(cantidad: int) -> list:
+    """Crear ``cantidad`` productos de prueba con un INSERT multi-fila"""
+    async with AsyncSessionLocal() as db:
+        usuario = await db.scalar(select(Usuario).limit(1))
+        categoria = await db.scalar(select(Categoria).limit(1))
+        if not usuario or not categoria:
+            raise SystemExit("Se necesita al menos un usuario y una categoría")
+        ids = await db.scalars(
+            insert(Producto).returning(Producto.id_producto),
+            [
+                {
+                    "nombre": f"{PREFIJO} {n}",
+                    "descripcion": "Producto de prueba",
+                    "precio": 10,
+                    "stock": 100,
+                    "categoria_id": categoria.id_categoria,
+                    "usuario_id": usuario.id,
+                    "id_usuario_crea": usuario.id,
+                }
+                for n in range(cantidad)
+            ],
+        )
+        ids = list(ids)
+        await db.commit()
+        return ids
+
+
+async def descarga_completa() -> dict:
+    """Leer todas las páginas del listado, como hace hoy el cliente"""
+    copia, cursor = {}, None
+    async with AsyncSessionLocal() as db:
+        producto_crud = AsyncProductoCRUD(db)
+        while True:
+            pagina = await producto_crud.obtener_productos(
+                limit=MAX_LIMITE, cursor=cursor
+            )
+            copia.update((p.id_producto, p.stock) for p in pagina)
+            cursor = siguiente_cursor(pagina, MAX_LIMITE, "id_producto")
+            if cursor is None:
+                return copia
+
+
+async def sincronizar(copia: dict, cursor: str) -> tuple:
+    """Aplicar a ``copia`` los cambios desde ``cursor``"""
+    leidos = 0
+    async with AsyncSessionLocal() as db:
+        producto_crud = AsyncProductoCRUD(db)
+        while True:
+            respuesta = await producto_crud.obtener_cambios(cursor, MAX_LIMITE)
+            for producto in respuesta["cambios"]:
+                copia[producto.id_producto] = producto.stock
+            for producto_id in respuesta["eliminados"]:
+                copia.pop(producto_id, None)
+            leidos += len(respuesta["cambios"]) + len(respuesta["eliminados"])
+            cursor = respuesta["cursor"]
+            if not respuesta["hay_mas"]:
+                return cursor, leidos
+
+
+async def modificar(ids: list, cantidad: int, azar: random.Random):
+    """Cambiar el stock de ``cantidad`` productos y eliminar uno"""
+    async with AsyncSessionLocal() as db:
+        for producto_id in azar.sample(ids, cantidad):
+            await db.execute(
+                update(Producto)
+                .where(Producto.id_producto == producto_id)
+                .values(stock=azar.randint(0, 1000), version=Producto.version + 1)
+            )
+        eliminado = ids.pop(azar.randrange(len(ids)))
+        await db.execute(delete(Producto).where(Producto.id_producto == eliminado))
+        await db.commit()
+
+
+async def estado_actual() -> dict:
+    async with AsyncSessionLocal() as db:
+        return dict(
+            (await db.execute(select(Producto.id_producto, Producto.stock))).all()
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--productos", type=int, default=10000)
+    parser.add_argument("--cambios", type=int, default=20)
+    parser.add_argument("--refrescos", type=int, default=10)
+    args = parser.parse_args()
+
+    ids = await sembrar(args.productos)
+    try:
+        azar = random.Random(42)
+        copia, leidos_feed = {}, 0
+        cursor, _ = await sincronizar(copia, None)
+        completa_s = feed_s = 0.0
+        leidos_completa = 0
+        for _ in range(args.refrescos):
+            await modificar(ids, args.cambios, azar)
+
+            inicio = time.perf_counter()
+            completa = await descarga_completa()
+            completa_s += time.perf_counter() - inicio
+            leidos_completa += len(completa)
+
+            inicio = time.perf_counter()
+            cursor, leidos = await sincronizar(copia, cursor)
+            feed_s += time.perf_counter() - inicio
+            leidos_feed += leidos
+
+        for nombre, segundos, filas in (
+            ("completa", completa_s, leidos_completa),
+            ("feed", feed_s, leidos_feed),
+        ):
+            print(
+                f"{nombre:<9} {args.refrescos} refrescos en {segundos:.2f}s "
+                f"-> {segundos / args.refrescos * 1000:.1f} ms por refresco, "
+                f"{filas // args.refrescos} filas leídas por refresco"
+            )
+        print(f"Mejora: x{completa_s / feed_s:.1f}")
+        correcta = copia == await estado_actual()
+        print(f"Copia del cliente igual a la tabla: {'sí' if correcta else 'NO'}")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Producto).where(Producto.id_producto.in_(ids)))
+            await db.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
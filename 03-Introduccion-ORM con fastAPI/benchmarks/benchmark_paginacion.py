@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Latencia de paginación por offset vs paginación keyset (cursor)
+
+Mide cuánto tarda ProductoCRUD.obtener_productos en servir las páginas 1, 100,
+1 000 y 10 000. Con offset Postgres recorre y descarta ``skip`` filas, así que
+la latencia crece con la página; con cursor se mantiene plana.
+
+Uso:
+    python benchmarks/benchmark_paginacion.py --sembrar 250000
+    python benchmarks/benchmark_paginacion.py --limit 20
+
+``--sembrar N`` inserta N productos de prueba con generate_series antes de medir.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crud.paginacion import codificar_cursor
+from crud.producto_crud import ProductoCRUD
+from database.config import SessionLocal
+from entities.categoria import Categoria
+from entities.producto import Producto
+from entities.usuario import Usuario
+from sqlalchemy import text
+
+PAGINAS = [1, 100, 1000, 10000]
+
+
+def sembrar(db, cantidad: int):
+    """Insertar ``cantidad`` productos de prueba en una sola sentencia"""
+    usuario = db.query(Usuario).first()
+    categoria = db.query(Categoria).first()
+    if not usuario or not categoria:
+        raise SystemExit("Se necesita al menos un usuario y una categoría")
+
+    db.execute(
+        text("""
+            INSERT INTO productos (id_producto, nombre, descripcion, precio, stock,
+                                   categoria_id, usuario_id, id_usuario_crea,
+                                   fecha_creacion)
+            SELECT gen_random_uuid(), 'Producto ' || n, 'Benchmark', 10, 1,
+                   :categoria, :usuario, :usuario,
+                   now() - (n || ' seconds')::interval
+            FROM generate_series(1, :cantidad) AS n
+            """),
+        {
+            "categoria": categoria.id_categoria,
+            "usuario": usuario.id,
+            "cantidad": cantidad,
+        },
+    )
+    db.commit()
+    db.execute(text("ANALYZE productos"))
+
+
+def cronometrar(funcion, repeticiones: int) -> float:
+    """Mediana en milisegundos de ``repeticiones`` ejecuciones"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sembrar", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.sembrar:
+            sembrar(db, args.sembrar)
+
+        total = db.query(Producto).count()
+        crud = ProductoCRUD(db)
+        print(f"{total} productos, {args.limit} por página")
+        print(f"{'página':>8} {'offset (ms)':>12} {'cursor (ms)':>12}")
+
+        for pagina in PAGINAS:
+            skip = (pagina - 1) * args.limit
+            if skip >= total:
+                break
+
+            # Cursor que apunta al último registro de la página anterior
+            cursor = None
+            if skip:
+                anterior = (
+                    db.query(Producto.fecha_creacion, Producto.id_producto)
+                    .order_by(Producto.fecha_creacion, Producto.id_producto)
+                    .offset(skip - 1)
+                    .first()
+                )
+                cursor = codificar_cursor(*anterior)
+
+            offset_ms = cronometrar(
+                lambda: crud.obtener_productos(skip=skip, limit=args.limit),
+                args.repeticiones,
+            )
+            cursor_ms = cronometrar(
+                lambda: crud.obtener_productos(limit=args.limit, cursor=cursor),
+                args.repeticiones,
+            )
+            db.expunge_all()
+            print(f"{pagina:>8} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Throughput de reservas de cestas concurrentes sobre productos compartidos
+
+Compara ReservaCRUD.crear_reserva (bloqueo de los productos de la cesta en
+orden de id y un único UPDATE del stock) con la reserva ingenua: un
+``UPDATE ... WHERE stock >= cantidad`` por línea en el orden de la cesta, que
+con cestas que comparten productos produce interbloqueos (40P01) que
+PostgreSQL resuelve abortando una de las transacciones.
+
+Después caduca todas las reservas creadas y mide el barrido de expiración
+(``FOR UPDATE SKIP LOCKED``), comprobando que el stock vuelve a su valor
+inicial.
+
+Uso:
+    python benchmarks/benchmark_reservas.py --cestas 2000 --concurrencia 300
+    python benchmarks/benchmark_reservas.py --productos 5 --stock 500
+
+Las cestas en vuelo esperan conexión en el pool del motor asíncrono
+(DB_POOL_SIZE + DB_MAX_OVERFLOW), como lo harían las peticiones de un worker.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apis.reserva import liberar_reservas_expiradas
+from crud.producto_crud import StockInsuficienteError
+from crud.reserva_crud_async import AsyncReservaCRUD
+from database.config import AsyncSessionLocal, async_engine
+from entities.categoria import Categoria
+from entities.producto import Producto
+from entities.reserva import LineaReserva, Reserva
+from entities.usuario import Usuario
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.exc import DBAPIError, TimeoutError
+
+PREFIJO = "Benchmark reservas"
+
+
+async def sembrar(cantidad: int, stock: int) -> list:
+    """Crear ``cantidad`` productos de prueba con ``stock`` unidades"""
+    async with AsyncSessionLocal() as db:
+        usuario = await db.scalar(select(Usuario).limit(1))
+        categoria = await db.scalar(select(Categoria).limit(1))
+        if not usuario or not categoria:
+            raise SystemExit("Se necesita al menos un usuario y una categoría")
+        productos = [
+            Producto(
+                nombre=f"{PREFIJO} {n}",
+                descripcion="Producto de prueba",
+                precio=10,
+                stock=stock,
+                categoria_id=categoria.id_categoria,
+                usuario_id=usuario.id,
+                id_usuario_crea=usuario.id,
+            )
+            for n in range(cantidad)
+        ]
+        db.add_all(productos)
+        await db.commit()
+        return [producto.id_producto for producto in productos]
+
+
+async def stock_actual(ids: list) -> dict:
+    async with AsyncSessionLocal() as db:
+        filas = await db.execute(
+            select(Producto.id_producto, Producto.stock).where(
+                Producto.id_producto.in_(ids)
+            )
+        )
+        return dict(filas.all())
+
+
+def generar_cestas(ids: list, total: int, max_lineas: int) -> list:
+    """Cestas aleatorias (misma semilla para los dos modos)"""
+    azar = random.Random(42)
+    return [
+        [
+            {"producto_id": producto_id, "cantidad": azar.randint(1, 3)}
+            for producto_id in azar.sample(ids, azar.randint(1, max_lineas))
+        ]
+        for _ in range(total)
+    ]
+
+
+def es_interbloqueo(error: DBAPIError) -> bool:
+    return getattr(error.orig, "sqlstate", None) == "40P01" or "deadlock" in str(error)
+
+
+async def reserva_ordenada(cesta: list, resultado: dict):
+    """Cesta reservada con ReservaCRUD (bloqueo ordenado, un UPDATE)"""
+    async with AsyncSessionLocal() as db:
+        try:
+            reserva = await AsyncReservaCRUD(db).crear_reserva(cesta)
+            resultado["reservas"].append(reserva.id_reserva)
+        except StockInsuficienteError:
+            resultado["sin_stock"] += 1
+        except DBAPIError as e:
+            await db.rollback()
+            if not es_interbloqueo(e):
+                raise
+            resultado["interbloqueos"] += 1
+
+
+async def reserva_ingenua(cesta: list, resultado: dict):
+    """Un UPDATE condicionado por línea, en el orden de la cesta"""
+    async with AsyncSessionLocal() as db:
+        try:
+            for linea in cesta:
+                fila = await db.execute(
+                    text(
+                        "UPDATE productos SET stock = stock - :cantidad, "
+                        "version = version + 1 "
+                        "WHERE id_producto = :producto_id AND stock >= :cantidad"
+                    ),
+                    linea,
+                )
+                if fila.rowcount == 0:
+                    await db.rollback()
+                    resultado["sin_stock"] += 1
+                    return
+            await db.commit()
+            resultado["correctas"] += 1
+        except DBAPIError as e:
+            await db.rollback()
+            if not es_interbloqueo(e):
+                raise
+            resultado["interbloqueos"] += 1
+
+
+async def medir(nombre: str, reservar, cestas: list, concurrencia: int) -> dict:
+    """Ejecutar todas las cestas con ``concurrencia`` en vuelo y mostrar el resultado"""
+    semaforo = asyncio.Semaphore(concurrencia)
+    resultado = {
+        "reservas": [],
+        "correctas": 0,
+        "sin_stock": 0,
+        "interbloqueos": 0,
+        "sin_conexion": 0,
+    }
+
+    async def una(cesta):
+        async with semaforo:
+            try:
+                await reservar(cesta, resultado)
+            except TimeoutError:
+                # Sin conexión libre en pool_timeout: la petición daría 500
+                resultado["sin_conexion"] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(cesta) for cesta in cestas))
+    duracion = time.perf_counter() - inicio
+    correctas = resultado["correctas"] or len(resultado["reservas"])
+    print(
+        f"{nombre:<9} {len(cestas)} cestas en {duracion:.2f}s "
+        f"-> {len(cestas) / duracion:.1f} cestas/s | reservadas {correctas}, "
+        f"sin stock {resultado['sin_stock']}, "
+        f"interbloqueos {resultado['interbloqueos']}, "
+        f"sin conexión {resultado['sin_conexion']}"
+    )
+    return resultado
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cestas", type=int, default=1000)
+    parser.add_argument("--concurrencia", type=int, default=200)
+    parser.add_argument("--productos", type=int, default=20)
+    parser.add_argument("--lineas", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    ids = await sembrar(args.productos, args.stock)
+    try:
+        cestas = generar_cestas(ids, args.cestas, min(args.lineas, len(ids)))
+        print(
+            f"{args.productos} productos compartidos, hasta {args.lineas} líneas "
+            f"por cesta, {args.concurrencia} cestas en vuelo"
+        )
+        inicial = await stock_actual(ids)
+
+        # Ingenua primero y con el stock restaurado después: ambas parten de
+        # las mismas existencias
+        await medir("ingenua", reserva_ingenua, cestas, args.concurrencia)
+        async with AsyncSessionLocal() as db:
+            for producto_id, stock in inicial.items():
+                await db.execute(
+                    update(Producto)
+                    .where(Producto.id_producto == producto_id)
+                    .values(stock=stock)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+        resultado = await medir("ordenada", reserva_ordenada, cestas, args.concurrencia)
+
+        # Caducar todas las reservas y medir el barrido
+        reservas = resultado["reservas"]
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Reserva)
+                .where(Reserva.id_reserva.in_(reservas))
+                .values(expira_en=text("now()"))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        inicio = time.perf_counter()
+        liberadas = await liberar_reservas_expiradas()
+        duracion = time.perf_counter() - inicio
+        print(
+            f"barrido   {liberadas} reservas expiradas en {duracion:.2f}s "
+            f"-> {liberadas / max(duracion, 1e-9):.1f} reservas/s"
+        )
+        restaurado = await stock_actual(ids) == inicial
+        print(f"Stock restaurado tras el barrido: {'sí' if restaurado else 'NO'}")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(Reserva).where(
+                    Reserva.id_reserva.in_(
+                        select(LineaReserva.id_reserva).where(
+                            LineaReserva.producto_id.in_(ids)
+                        )
+                    )
+                )
+            )
+            await db.execute(delete(Producto).where(Producto.id_producto.in_(ids)))
+            await db.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
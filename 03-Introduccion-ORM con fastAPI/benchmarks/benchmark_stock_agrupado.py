@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Throughput de ajustes de stock concurrentes: una transacción por ajuste vs
+ajustes agrupados por ventana
+
+Simula ráfagas de ``PATCH /productos/{id}/stock/ajuste`` de un TPV sobre
+unos pocos productos muy vendidos. Sin agrupar, cada ajuste es un
+``UPDATE ... RETURNING`` con su propio commit y los ajustes de un mismo
+producto esperan el bloqueo de la fila uno tras otro. Con AgrupadorStock
+los ajustes de cada ventana se suman por producto y se aplican con un único
+UPDATE y un único commit.
+
+Uso:
+    python benchmarks/benchmark_stock_agrupado.py --ajustes 5000 --productos 5
+    python benchmarks/benchmark_stock_agrupado.py --ventana-ms 2 --ritmo 2000
+
+Por defecto todos los ajustes llegan a la vez (una ráfaga); con ``--ritmo``
+llegan repartidos a ese número de ajustes por segundo.
+
+Se muestra también el número de commits: contra una base de datos remota
+como Neon cada commit añade al menos un round-trip.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crud.agrupador_stock import AgrupadorStock
+from crud.producto_crud_async import AsyncProductoCRUD
+from database.config import AsyncSessionLocal, async_engine
+from entities.categoria import Categoria
+from entities.producto import Producto
+from entities.usuario import Usuario
+from sqlalchemy import delete, event, select
+
+STOCK_INICIAL = 1_000_000
+
+
+async def sembrar(cantidad: int) -> list:
+    """Crear ``cantidad`` productos de prueba"""
+    async with AsyncSessionLocal() as db:
+        usuario = await db.scalar(select(Usuario).limit(1))
+        categoria = await db.scalar(select(Categoria).limit(1))
+        if not usuario or not categoria:
+            raise SystemExit("Se necesita al menos un usuario y una categoría")
+        productos = [
+            Producto(
+                nombre=f"Benchmark stock {n}",
+                descripcion="Producto de prueba",
+                precio=10,
+                stock=STOCK_INICIAL,
+                categoria_id=categoria.id_categoria,
+                usuario_id=usuario.id,
+                id_usuario_crea=usuario.id,
+            )
+            for n in range(cantidad)
+        ]
+        db.add_all(productos)
+        await db.commit()
+        return [producto.id_producto for producto in productos]
+
+
+def contar_commits() -> dict:
+    """Contador de commits del motor asíncrono"""
+    contador = {"commits": 0}
+
+    @event.listens_for(async_engine.sync_engine, "commit")
+    def _commit(conn):
+        contador["commits"] += 1
+
+    return contador
+
+
+async def medir(
+    nombre: str, ajustar, ajustes: list, ritmo: float, contador: dict
+) -> float:
+    """Lanzar los ajustes (a la vez o a ``ritmo`` por segundo) y mostrar el resultado"""
+    latencias = []
+
+    async def uno(indice, producto_id, delta):
+        if ritmo:
+            await asyncio.sleep(indice / ritmo)
+        inicio = time.perf_counter()
+        await ajustar(producto_id, delta)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    commits = contador["commits"]
+    inicio = time.perf_counter()
+    await asyncio.gather(
+        *(uno(indice, *ajuste) for indice, ajuste in enumerate(ajustes))
+    )
+    duracion = time.perf_counter() - inicio
+    percentiles = statistics.quantiles(latencias, n=100)
+    print(
+        f"{nombre:<10} {len(ajustes)} ajustes en {duracion:.2f}s "
+        f"-> {len(ajustes) / duracion:.0f} ajustes/s, "
+        f"{contador['commits'] - commits} commits, "
+        f"latencia p50 {percentiles[49]:.1f} ms / p99 {percentiles[98]:.1f} ms"
+    )
+    return len(ajustes) / duracion
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ajustes", type=int, default=2000)
+    parser.add_argument("--productos", type=int, default=5)
+    parser.add_argument("--ventana-ms", type=float, default=5)
+    parser.add_argument("--ritmo", type=float, default=0)
+    args = parser.parse_args()
+
+    ids = await sembrar(args.productos)
+    contador = contar_commits()
+    try:
+        azar = random.Random(42)
+        ajustes = [
+            (azar.choice(ids), azar.choice([-3, -2, -1, 1, 2]))
+            for _ in range(args.ajustes)
+        ]
+        esperado = {producto_id: 0 for producto_id in ids}
+        for producto_id, delta in ajustes:
+            esperado[producto_id] += delta
+
+        async def individual(producto_id, delta):
+            async with AsyncSessionLocal() as db:
+                await AsyncProductoCRUD(db).ajustar_stock(producto_id, delta)
+
+        agrupador = AgrupadorStock(args.ventana_ms)
+        individual_s = await medir(
+            "individual", individual, ajustes, args.ritmo, contador
+        )
+        agrupado_s = await medir(
+            "agrupado", agrupador.ajustar, ajustes, args.ritmo, contador
+        )
+        metricas = agrupador.metricas()
+        print(
+            f"{metricas['grupos']} grupos de {metricas['operaciones']} ajustes "
+            f"(ventana {args.ventana_ms} ms). Mejora: x{agrupado_s / individual_s:.1f}"
+        )
+
+        async with AsyncSessionLocal() as db:
+            stock = dict(
+                (
+                    await db.execute(
+                        select(Producto.id_producto, Producto.stock).where(
+                            Producto.id_producto.in_(ids)
+                        )
+                    )
+                ).all()
+            )
+        correcto = all(
+            stock[producto_id] == STOCK_INICIAL + 2 * esperado[producto_id]
+            for producto_id in ids
+        )
+        print(f"Stock final correcto: {'sí' if correcto else 'NO'}")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Producto).where(Producto.id_producto.in_(ids)))
+            await db.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
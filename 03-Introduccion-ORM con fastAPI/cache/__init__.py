@@ -0,0 +1 @@
+# Módulo de caché de entidades
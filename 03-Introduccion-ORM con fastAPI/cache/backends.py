@@ -0,0 +1,141 @@
+"""
+Backends de almacenamiento para la caché de entidades
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from cache.lru import CacheLRU
+
+
+class BackendCache(ABC):
+    """
+    Interfaz mínima de almacenamiento clave/valor con caducidad
+
+    Los valores son cadenas (JSON), de modo que cualquier implementación puede
+    compartirlos entre procesos. Un backend que no implemente todos los
+    métodos no se puede instanciar.
+    """
+
+    nombre = "base"
+
+    @abstractmethod
+    def obtener(self, clave: str) -> Optional[str]:
+        """Obtener un valor o None si no existe o ha caducado"""
+
+    @abstractmethod
+    def guardar(self, clave: str, valor: str, ttl_segundos: float):
+        """Guardar un valor con caducidad"""
+
+    @abstractmethod
+    def eliminar(self, clave: str):
+        """Eliminar una clave"""
+
+    @abstractmethod
+    def contador(self, clave: str) -> int:
+        """Valor actual de un contador (0 si no existe)"""
+
+    @abstractmethod
+    def incrementar(self, clave: str, ttl_segundos: float) -> int:
+        """Incrementar de forma atómica un contador y devolver su nuevo valor"""
+
+
+class BackendMemoria(BackendCache):
+    """
+    Backend local del proceso sobre CacheLRU
+
+    Los contadores no se guardan en la CacheLRU sino en un diccionario
+    aparte sin expulsión ni caducidad: si un contador se expulsara y volviera
+    a empezar, las entradas guardadas con sus versiones anteriores (que
+    pueden seguir en la caché) volverían a leerse. Ocupan un entero por
+    entidad invalidada.
+    """
+
+    nombre = "memoria"
+
+    def __init__(self, max_entradas: int = 10000):
+        self._cache = CacheLRU(max_entradas=max_entradas)
+        self._contadores: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Optional[str]:
+        return self._cache.obtener(clave)
+
+    def guardar(self, clave: str, valor: str, ttl_segundos: float):
+        self._cache.guardar(clave, valor, ttl_segundos)
+
+    def eliminar(self, clave: str):
+        self._cache.invalidar(clave)
+
+    def contador(self, clave: str) -> int:
+        return self._contadores.get(clave, 0)
+
+    def incrementar(self, clave: str, ttl_segundos: float) -> int:
+        # ttl_segundos no se usa: los contadores del proceso no caducan
+        with self._lock:
+            valor = self._contadores.get(clave, 0) + 1
+            self._contadores[clave] = valor
+            return valor
+
+
+class BackendRedis(BackendCache):
+    """
+    Backend compartido entre procesos sobre un servidor Redis
+
+    Recibe un cliente ya creado con la interfaz de ``redis.Redis``
+    (get/set/delete/incr/expire/pipeline), lo que permite usar un cliente
+    falso en local.
+    """
+
+    nombre = "redis"
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def obtener(self, clave: str) -> Optional[str]:
+        valor = self.cliente.get(clave)
+        if isinstance(valor, bytes):
+            valor = valor.decode("utf-8")
+        return valor
+
+    def guardar(self, clave: str, valor: str, ttl_segundos: float):
+        self.cliente.set(clave, valor, ex=max(1, int(ttl_segundos)))
+
+    def eliminar(self, clave: str):
+        self.cliente.delete(clave)
+
+    def contador(self, clave: str) -> int:
+        return int(self.obtener(clave) or 0)
+
+    def incrementar(self, clave: str, ttl_segundos: float) -> int:
+        # INCR y EXPIRE en un MULTI/EXEC: el contador nunca queda sin
+        # caducidad y se envían en un solo viaje de red
+        with self.cliente.pipeline(transaction=True) as pipeline:
+            pipeline.incr(clave)
+            pipeline.expire(clave, max(1, int(ttl_segundos)))
+            valor, _ = pipeline.execute()
+        return int(valor)
+
+
+def crear_backend() -> BackendCache:
+    """
+    Crear el backend configurado por entorno
+
+    Con ``REDIS_URL`` se usa Redis (requiere el paquete ``redis``), que
+    comparten todos los workers; sin ella, una caché en memoria por proceso
+    de ``CACHE_ENTIDADES_MAX`` entradas.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "REDIS_URL está configurada pero el paquete 'redis' no está "
+                "instalado (pip install redis)"
+            ) from e
+        return BackendRedis(redis.Redis.from_url(redis_url))
+
+    return BackendMemoria(max_entradas=int(os.getenv("CACHE_ENTIDADES_MAX", "10000")))
@@ -0,0 +1,102 @@
+"""
+Filtro de Bloom en memoria para descartar búsquedas negativas
+"""
+
+import hashlib
+import math
+import threading
+
+
+class FiltroBloom:
+    """
+    Conjunto probabilístico sin falsos negativos
+
+    ``puede_contener`` devuelve False solo si el valor nunca se añadió; si
+    devuelve True el valor puede estar (con probabilidad de error cercana a
+    ``tasa_falsos_positivos`` mientras no se superen ``capacidad`` valores).
+    Los valores no se pueden quitar: tras borrar o renombrar un registro el
+    filtro sigue respondiendo True, lo que solo cuesta una consulta de más.
+    """
+
+    def __init__(self, capacidad: int = 100000, tasa_falsos_positivos: float = 0.01):
+        if capacidad <= 0:
+            raise ValueError("La capacidad debe ser mayor que 0")
+        if not 0 < tasa_falsos_positivos < 1:
+            raise ValueError("La tasa de falsos positivos debe estar entre 0 y 1")
+
+        self.capacidad = capacidad
+        self.tasa_falsos_positivos = tasa_falsos_positivos
+        # Tamaño y número de funciones hash óptimos para esa capacidad y tasa
+        self.num_bits = math.ceil(
+            -capacidad * math.log(tasa_falsos_positivos) / math.log(2) ** 2
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacidad * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+        self._elementos = 0
+        self._negativos = 0
+        self._positivos = 0
+        self._falsos_positivos = 0
+
+    def _posiciones(self, valor: str):
+        """Posiciones de bits de un valor (doble hashing de Kirsch-Mitzenmacher)"""
+        resumen = hashlib.blake2b(valor.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(resumen[:8], "little")
+        h2 = int.from_bytes(resumen[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def añadir(self, valor: str):
+        """Añadir un valor al filtro"""
+        posiciones = self._posiciones(valor)
+        with self._lock:
+            for posicion in posiciones:
+                self._bits[posicion >> 3] |= 1 << (posicion & 7)
+            self._elementos += 1
+
+    def puede_contener(self, valor: str) -> bool:
+        """False si el valor seguro que no se ha añadido, True si puede estar"""
+        bits = self._bits
+        presente = all(
+            bits[posicion >> 3] & (1 << (posicion & 7))
+            for posicion in self._posiciones(valor)
+        )
+        with self._lock:
+            if presente:
+                self._positivos += 1
+            else:
+                self._negativos += 1
+        return presente
+
+    __contains__ = puede_contener
+
+    def registrar_falso_positivo(self):
+        """Anotar que un valor con respuesta True no estaba en la BD"""
+        with self._lock:
+            self._falsos_positivos += 1
+
+    def limpiar(self):
+        """Vaciar el filtro (los contadores se conservan)"""
+        with self._lock:
+            self._bits = bytearray(len(self._bits))
+            self._elementos = 0
+
+    def metricas(self) -> dict:
+        """Tamaño del filtro, consultas y tasa de falsos positivos estimada"""
+        with self._lock:
+            elementos = self._elementos
+            negativos = self._negativos
+            positivos = self._positivos
+            falsos_positivos = self._falsos_positivos
+        tasa_estimada = (
+            1 - math.exp(-self.num_hashes * elementos / self.num_bits)
+        ) ** self.num_hashes
+        return {
+            "elementos": elementos,
+            "capacidad": self.capacidad,
+            "bits": self.num_bits,
+            "funciones_hash": self.num_hashes,
+            "tasa_falsos_positivos_estimada": round(tasa_estimada, 6),
+            "negativos": negativos,
+            "positivos": positivos,
+            "falsos_positivos": falsos_positivos,
+        }
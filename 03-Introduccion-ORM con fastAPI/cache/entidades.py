@@ -0,0 +1,208 @@
+"""
+Conversión entre entidades del ORM y los valores guardados en caché
+"""
+
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import Callable, Optional
+
+from cache.backends import BackendCache, crear_backend
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+# Se incrementa si cambia el formato de las instantáneas, para que los valores
+# guardados por una versión anterior de la aplicación no se lean
+VERSION_FORMATO = 1
+
+# Caducidad de los contadores de versión en Redis: mucho mayor que la de los
+# datos, así que si uno caduca y vuelve a empezar en 0 los datos de esa
+# versión ya han caducado antes. Requiere que Redis no expulse claves con
+# caducidad lejana antes que los datos (maxmemory-policy noeviction o
+# volatile-ttl). BackendMemoria guarda los contadores sin caducidad.
+TTL_VERSIONES = 86400
+
+
+def instantanea(entidad, excluir: frozenset = frozenset()) -> dict:
+    """
+    Copiar las columnas cargadas de una entidad a un diccionario
+
+    En caché se guardan diccionarios y no la entidad, que pertenece a la
+    sesión que la cargó y no debe compartirse entre peticiones ni hilos.
+
+    Args:
+        entidad: Instancia cargada de un modelo
+        excluir: Atributos que no se copian (se cargarán de la BD si se usan)
+
+    Returns:
+        Diccionario {atributo: valor} con las columnas cargadas
+    """
+    estado = inspect(entidad)
+    return {
+        atributo.key: estado.dict[atributo.key]
+        for atributo in estado.mapper.column_attrs
+        if atributo.key in estado.dict and atributo.key not in excluir
+    }
+
+
+def restaurar(db: Session, modelo, datos: dict):
+    """
+    Reconstruir una entidad a partir de su instantánea sin consultar la BD
+
+    La entidad se incorpora a la sesión con ``merge(load=False)``, así que se
+    comporta como si se hubiera cargado con una consulta (se puede editar o
+    eliminar) y las columnas no guardadas se cargarán al accederlas.
+
+    Args:
+        db: Sesión en la que se usará la entidad
+        modelo: Clase del modelo
+        datos: Diccionario generado por instantanea
+
+    Returns:
+        Entidad asociada a la sesión
+    """
+    entidad = modelo(**datos)
+    make_transient_to_detached(entidad)
+    return db.merge(entidad, load=False)
+
+
+def a_json(datos: dict) -> str:
+    """Serializar una instantánea (UUID, fechas y Decimal como texto)"""
+
+    def convertir(valor):
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        return str(valor)
+
+    return json.dumps(datos, default=convertir)
+
+
+def desde_json(modelo, texto: str) -> dict:
+    """
+    Reconstruir una instantánea con los tipos Python de cada columna
+
+    Args:
+        modelo: Clase del modelo
+        texto: JSON generado por a_json
+
+    Returns:
+        Diccionario {atributo: valor}
+    """
+    columnas = inspect(modelo).column_attrs
+    datos = json.loads(texto)
+    for clave, valor in datos.items():
+        if valor is None or isinstance(valor, bool):
+            continue
+        tipo = columnas[clave].columns[0].type.python_type
+        if tipo is datetime:
+            datos[clave] = datetime.fromisoformat(valor)
+        elif tipo is date:
+            datos[clave] = date.fromisoformat(valor)
+        elif not isinstance(valor, tipo):
+            datos[clave] = tipo(valor)
+    return datos
+
+
+class CacheEntidades:
+    """
+    Caché de entidades por clave primaria con claves versionadas
+
+    Cada entidad tiene un contador de versión y sus datos se guardan bajo
+    ``{prefijo}:{tabla}:{id}:{version}``. Invalidar incrementa el contador: una
+    lectura que cargó datos antiguos de la BD mientras otro proceso escribía
+    los guarda bajo una versión que ya nadie va a leer. Con un backend Redis
+    la invalidación se ve en todos los workers a la vez.
+    """
+
+    def __init__(
+        self, backend: BackendCache, prefijo: str = "tienda", ttl_segundos: float = 300
+    ):
+        self.backend = backend
+        self.prefijo = f"{prefijo}:v{VERSION_FORMATO}"
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._contadores = {}
+
+    def _clave(self, modelo, id_entidad) -> str:
+        return f"{self.prefijo}:{modelo.__tablename__}:{id_entidad}"
+
+    def _contar(self, modelo, acierto: bool):
+        with self._lock:
+            contador = self._contadores.setdefault(
+                modelo.__tablename__, {"aciertos": 0, "fallos": 0}
+            )
+            contador["aciertos" if acierto else "fallos"] += 1
+
+    def obtener(
+        self,
+        db: Session,
+        modelo,
+        id_entidad,
+        cargar: Callable[[], Optional[object]],
+        excluir: frozenset = frozenset(),
+    ):
+        """
+        Obtener una entidad por id desde la caché o, si falla, con ``cargar``
+
+        Args:
+            db: Sesión en la que se usará la entidad
+            modelo: Clase del modelo
+            id_entidad: Clave primaria
+            cargar: Función que consulta la entidad en la BD
+            excluir: Atributos que no se guardan en caché
+
+        Returns:
+            Entidad asociada a la sesión o None si no existe
+        """
+        clave = self._clave(modelo, id_entidad)
+        version = self.backend.contador(f"{clave}:version")
+        texto = self.backend.obtener(f"{clave}:{version}")
+        if texto is not None:
+            self._contar(modelo, True)
+            return restaurar(db, modelo, desde_json(modelo, texto))
+
+        self._contar(modelo, False)
+        entidad = cargar()
+        # Las ausencias no se guardan: otro proceso puede crear la entidad
+        if entidad is not None:
+            self.backend.guardar(
+                f"{clave}:{version}",
+                a_json(instantanea(entidad, excluir)),
+                self.ttl_segundos,
+            )
+        return entidad
+
+    def invalidar(self, modelo, id_entidad):
+        """Invalidar la entidad tras editarla o eliminarla"""
+        clave = self._clave(modelo, id_entidad)
+        version = self.backend.incrementar(f"{clave}:version", TTL_VERSIONES)
+        self.backend.eliminar(f"{clave}:{version - 1}")
+
+    def metricas(self) -> dict:
+        """Aciertos y fallos por tabla"""
+        with self._lock:
+            tablas = {
+                tabla: {
+                    **contador,
+                    "tasa_aciertos": round(
+                        contador["aciertos"]
+                        / (contador["aciertos"] + contador["fallos"]),
+                        4,
+                    ),
+                }
+                for tabla, contador in self._contadores.items()
+            }
+        return {
+            "backend": self.backend.nombre,
+            "ttl_segundos": self.ttl_segundos,
+            "tablas": tablas,
+        }
+
+
+# Instancia compartida por ProductoCRUD y UsuarioCRUD
+cache_entidades = CacheEntidades(
+    crear_backend(),
+    prefijo=os.getenv("CACHE_PREFIJO", "tienda"),
+    ttl_segundos=float(os.getenv("CACHE_ENTIDADES_TTL", "300")),
+)
@@ -0,0 +1,99 @@
+"""
+Caché en memoria acotada con expulsión LRU y caducidad por TTL
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class CacheLRU:
+    """
+    Caché de proceso segura entre hilos
+
+    Guarda como máximo ``max_entradas`` valores; al superarlo se expulsa el
+    usado hace más tiempo. Cada entrada caduca ``ttl_segundos`` después de
+    guardarse, lo que acota cuánto puede tardar un proceso en ver los cambios
+    hechos por otro. Lleva contadores de aciertos y fallos.
+    """
+
+    def __init__(self, max_entradas: int = 1000, ttl_segundos: float = 300.0):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._aciertos = 0
+        self._fallos = 0
+        self._expulsiones = 0
+
+    def obtener(self, clave: Hashable, por_defecto: Any = None) -> Any:
+        """
+        Obtener un valor de la caché
+
+        Args:
+            clave: Clave del valor
+            por_defecto: Valor devuelto si la clave no está o ha caducado
+
+        Returns:
+            Valor guardado o ``por_defecto``
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self._fallos += 1
+                return por_defecto
+
+            valor, expira = entrada
+            if time.monotonic() >= expira:
+                del self._entradas[clave]
+                self._fallos += 1
+                return por_defecto
+
+            self._entradas.move_to_end(clave)
+            self._aciertos += 1
+            return valor
+
+    def guardar(self, clave: Hashable, valor: Any, ttl_segundos: float = None):
+        """
+        Guardar un valor, expulsando el menos usado si la caché está llena
+
+        Args:
+            clave: Clave del valor
+            valor: Valor a guardar
+            ttl_segundos: Caducidad de esta entrada (por defecto la de la caché)
+        """
+        if ttl_segundos is None:
+            ttl_segundos = self.ttl_segundos
+        with self._lock:
+            self._entradas[clave] = (valor, time.monotonic() + ttl_segundos)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self._expulsiones += 1
+
+    def invalidar(self, clave: Hashable):
+        """Eliminar una clave de la caché"""
+        with self._lock:
+            self._entradas.pop(clave, None)
+
+    def limpiar(self):
+        """Vaciar la caché (los contadores se conservan)"""
+        with self._lock:
+            self._entradas.clear()
+
+    def metricas(self) -> dict:
+        """Estado actual de la caché"""
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "expulsiones": self._expulsiones,
+                "tasa_aciertos": (
+                    round(self._aciertos / consultas, 4) if consultas else 0.0
+                ),
+            }
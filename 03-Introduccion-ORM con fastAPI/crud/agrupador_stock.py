@@ -0,0 +1,183 @@
+"""
+Agrupación de escrituras de stock (write-coalescing)
+
+Las llamadas con ``agrupar=true`` a ``PATCH /productos/{id}/stock`` y
+``/stock/ajuste`` no abren su propia transacción: se acumulan por producto
+durante ``STOCK_VENTANA_AGRUPACION_MS`` milisegundos y se aplican juntas con
+un único ``UPDATE ... FROM unnest(...)`` y un único commit.
+
+Durabilidad: cada llamada responde después del commit de su grupo, así que
+una respuesta correcta implica que el cambio está guardado, igual que sin
+agrupar. Lo que cambia es que el cambio se guarda junto con los demás
+del grupo:
+
+- Si el proceso se detiene durante la ventana, los cambios pendientes se
+  pierden y sus llamadas no reciben respuesta (el cliente debe reintentar).
+- Si falla el commit del grupo, fallan todas sus llamadas.
+- Todas las llamadas de un grupo sobre un producto reciben el mismo
+  resultado: el stock y la versión tras aplicar el grupo entero, y el
+  kardex registra un único movimiento con el delta neto.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from crud.producto_crud_async import AsyncProductoCRUD
+from database.config import AsyncSessionLocal
+from entities.producto import Producto
+
+VENTANA_AGRUPACION_MS = float(os.getenv("STOCK_VENTANA_AGRUPACION_MS", "5"))
+
+# (stock fijado o None, delta, usuario que edita o None, futuro de la llamada)
+Operacion = Tuple[Optional[int], int, Optional[UUID], asyncio.Future]
+
+
+class AgrupadorStock:
+    """
+    Acumula los cambios de stock de una ventana y los aplica en una
+    transacción
+
+    Dentro de un grupo las operaciones de cada producto se aplican en orden
+    de llegada: fijar el stock descarta los deltas anteriores y los deltas
+    posteriores se suman al valor fijado. La edición se atribuye al usuario
+    de la última operación del producto. Si el stock de un producto
+    quedaría negativo, sus operaciones se repiten una a una con
+    ajustar_stock/actualizar_stock para que solo fallen (409) las que
+    realmente no caben.
+    """
+
+    def __init__(self, ventana_ms: float = VENTANA_AGRUPACION_MS):
+        self.ventana = ventana_ms / 1000
+        self._pendientes: Dict[UUID, List[Operacion]] = {}
+        self._vaciado: Optional[asyncio.Task] = None
+        self.grupos = 0
+        self.operaciones = 0
+
+    async def ajustar(
+        self, producto_id: UUID, delta: int, id_usuario_edita: UUID = None
+    ) -> Optional[Producto]:
+        """
+        Sumar o restar unidades al stock en el siguiente grupo
+
+        Returns:
+            Producto tras aplicar el grupo o None si no existe
+
+        Raises:
+            StockInsuficienteError: Si el stock quedaría en negativo
+        """
+        return await self._encolar(producto_id, None, delta, id_usuario_edita)
+
+    async def fijar(
+        self, producto_id: UUID, stock: int, id_usuario_edita: UUID = None
+    ) -> Optional[Producto]:
+        """
+        Fijar el stock en el siguiente grupo
+
+        Returns:
+            Producto tras aplicar el grupo o None si no existe
+        """
+        return await self._encolar(producto_id, stock, 0, id_usuario_edita)
+
+    def metricas(self) -> dict:
+        """Grupos aplicados y operaciones que contenían"""
+        return {
+            "ventana_ms": self.ventana * 1000,
+            "grupos": self.grupos,
+            "operaciones": self.operaciones,
+            "pendientes": sum(len(ops) for ops in self._pendientes.values()),
+        }
+
+    async def vaciar(self):
+        """Aplicar ya los cambios pendientes (al cerrar la aplicación)"""
+        if self._vaciado is not None:
+            # La tarea sigue en la espera de la ventana: aún no ha tomado el grupo
+            self._vaciado.cancel()
+            self._vaciado = None
+        await self._aplicar_pendientes()
+
+    async def _encolar(
+        self,
+        producto_id: UUID,
+        fijado: Optional[int],
+        delta: int,
+        id_usuario_edita: Optional[UUID],
+    ):
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes.setdefault(producto_id, []).append(
+            (fijado, delta, id_usuario_edita, futuro)
+        )
+        if self._vaciado is None:
+            self._vaciado = asyncio.create_task(self._vaciar_tras_ventana())
+        # El cambio ya forma parte del grupo: si el cliente se desconecta se
+        # aplica igualmente, y shield evita cancelar el futuro compartido
+        return await asyncio.shield(futuro)
+
+    async def _vaciar_tras_ventana(self):
+        await asyncio.sleep(self.ventana)
+        self._vaciado = None
+        await self._aplicar_pendientes()
+
+    async def _aplicar_pendientes(self):
+        """Aplicar el grupo acumulado y responder a sus llamadas"""
+        grupo, self._pendientes = self._pendientes, {}
+        if not grupo:
+            return
+        self.grupos += 1
+        self.operaciones += sum(len(ops) for ops in grupo.values())
+
+        cambios = {}
+        for producto_id, ops in grupo.items():
+            fijado, total = None, 0
+            for stock, delta, _, _ in ops:
+                if stock is not None:
+                    fijado, total = stock, 0
+                total += delta
+            cambios[producto_id] = (fijado, total, ops[-1][2])
+
+        try:
+            async with AsyncSessionLocal() as db:
+                productos = await AsyncProductoCRUD(db).aplicar_cambios_stock(cambios)
+        except Exception as e:
+            for ops in grupo.values():
+                for *_, futuro in ops:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+            return
+
+        for producto_id, ops in grupo.items():
+            if producto_id in productos:
+                for *_, futuro in ops:
+                    if not futuro.done():
+                        futuro.set_result(productos[producto_id])
+            else:
+                await self._aplicar_una_a_una(producto_id, ops)
+
+    async def _aplicar_una_a_una(self, producto_id: UUID, ops: List[Operacion]):
+        """
+        Aplicar cada operación en su propia transacción, con su resultado
+        exacto (producto que no existe o que quedaría en negativo)
+        """
+        for stock, delta, id_usuario_edita, futuro in ops:
+            try:
+                async with AsyncSessionLocal() as db:
+                    producto_crud = AsyncProductoCRUD(db)
+                    if stock is not None:
+                        producto = await producto_crud.actualizar_stock(
+                            producto_id, stock, id_usuario_edita=id_usuario_edita
+                        )
+                    else:
+                        producto = await producto_crud.ajustar_stock(
+                            producto_id, delta, id_usuario_edita=id_usuario_edita
+                        )
+            except Exception as e:
+                if not futuro.done():
+                    futuro.set_exception(e)
+                continue
+            if not futuro.done():
+                futuro.set_result(producto)
+
+
+# Agrupador compartido por todas las peticiones del proceso
+agrupador_stock = AgrupadorStock()
@@ -0,0 +1,57 @@
+"""
+Base para las variantes asíncronas de las clases CRUD
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncCRUDBase:
+    """
+    Adaptador asíncrono sobre una clase CRUD síncrona.
+
+    Las validaciones y consultas viven una sola vez en la clase CRUD síncrona;
+    aquí se ejecutan mediante ``AsyncSession.run_sync``, de modo que cada
+    consulta se envía por asyncpg sin bloquear el event loop de uvicorn.
+    """
+
+    crud_class = None
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _ejecutar(self, metodo: str, *args, **kwargs):
+        """
+        Ejecutar un método de la clase CRUD síncrona sobre la sesión asíncrona
+
+        Args:
+            metodo: Nombre del método de la clase CRUD síncrona
+            *args, **kwargs: Argumentos del método
+
+        Returns:
+            El resultado del método
+        """
+
+        def _llamar(session):
+            return getattr(self.crud_class(session), metodo)(*args, **kwargs)
+
+        return await self.db.run_sync(_llamar)
+
+    def _consulta(self, metodo: str, *args, **kwargs):
+        """
+        Construir, sin ejecutarla, la consulta de un método de la clase CRUD
+
+        El método síncrono devuelve una ``Query``; aquí se obtiene su sentencia
+        ``SELECT`` para ejecutarla en streaming (``AsyncSession.stream``).
+        Construir la consulta no accede a la BD, así que no hace falta
+        ``run_sync``.
+
+        Args:
+            metodo: Nombre del método de la clase CRUD síncrona
+            *args, **kwargs: Argumentos del método
+
+        Returns:
+            Sentencia ``Select`` lista para ejecutar
+        """
+        return getattr(self.crud_class(self.db.sync_session), metodo)(
+            *args, **kwargs
+        ).statement
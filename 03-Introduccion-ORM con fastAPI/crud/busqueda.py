@@ -0,0 +1,68 @@
+"""
+Utilidades de búsqueda de texto completo
+"""
+
+import re
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import Numeric, cast, func
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+# Configuración de texto de Postgres (diccionario y stemmer en español)
+CONFIGURACION_TEXTO = "spanish"
+
+# Decimales con los que se compara la relevancia: ts_rank es un real y el
+# cursor lo guardaría como float, así que se redondea a numeric para que el
+# orden y la comparación con el cursor usen el mismo valor exacto
+DECIMALES_RELEVANCIA = 6
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Quitar acentos y diacríticos de un texto
+
+    Aplica la misma normalización que la columna ``productos.busqueda`` para
+    que "cafe" encuentre "Café" y viceversa.
+
+    Args:
+        texto: Texto introducido por el usuario
+
+    Returns:
+        Texto sin acentos
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def construir_consulta(texto: str) -> Optional[str]:
+    """
+    Convertir el texto de búsqueda en una expresión para to_tsquery
+
+    Cada palabra se busca como prefijo (``palabra:*``) y deben aparecer todas,
+    de modo que la búsqueda funciona mientras el usuario escribe. Solo se
+    conservan caracteres de palabra, así que el texto nunca puede romper la
+    sintaxis de to_tsquery.
+
+    Args:
+        texto: Texto introducido por el usuario
+
+    Returns:
+        Expresión tsquery o None si el texto no contiene palabras
+    """
+    palabras = re.findall(r"[^\W_]+", normalizar_texto(texto).lower())
+    if not palabras:
+        return None
+    return " & ".join(f"{palabra}:*" for palabra in palabras)
+
+
+def tsquery(expresion: str):
+    """Expresión SQL ``to_tsquery('spanish', :expresion)``"""
+    return func.to_tsquery(cast(CONFIGURACION_TEXTO, REGCONFIG), expresion)
+
+
+def relevancia(columna, consulta):
+    """Expresión SQL ``round(ts_rank(columna, consulta)::numeric, 6)``"""
+    return func.round(
+        cast(func.ts_rank(columna, consulta), Numeric), DECIMALES_RELEVANCIA
+    )
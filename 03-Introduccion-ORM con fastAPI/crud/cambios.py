@@ -0,0 +1,112 @@
+"""
+Feed de cambios para la sincronización incremental de clientes
+
+Cada fila de productos, categorías y usuarios guarda en ``xid_cambio`` la
+transacción que la escribió por última vez, y cada eliminación deja una
+lápida en ``eliminaciones``. Un cliente guarda el cursor de la última
+respuesta y pide solo lo escrito o eliminado después, con un recorrido por
+rango de los índices ``(xid_cambio, id)``.
+
+Solo se devuelven cambios de transacciones anteriores al xmin de la foto
+actual, es decir, de transacciones ya terminadas: una transacción que sigue
+abierta (con un xid menor que otros cambios ya confirmados) no puede
+confirmar después por detrás del cursor. Mientras haya una transacción
+larga abierta, el feed espera a que termine en lugar de saltarse sus cambios.
+"""
+
+from typing import Optional
+from uuid import UUID
+
+from crud.paginacion import (
+    codificar_cursor_cambios,
+    decodificar_cursor_cambios,
+    validar_limite,
+)
+from entities.cambios import SQL_XMIN_SNAPSHOT, Eliminacion
+from sqlalchemy import literal_column, select, tuple_
+from sqlalchemy.orm import Session
+
+
+def _desde_cursor(columna_xid, columna_id, xid: int, id_registro: Optional[UUID]):
+    """Condición de los cambios posteriores a la posición ``(xid, id)``"""
+    if id_registro is None:
+        return columna_xid >= xid
+    return tuple_(columna_xid, columna_id) > (xid, id_registro)
+
+
+def obtener_cambios(
+    db: Session, modelo, columna_id, desde: str = None, limit: int = 100
+) -> dict:
+    """
+    Registros creados, modificados o eliminados desde un cursor
+
+    Las filas y las lápidas se leen en orden ``(xid_cambio, id)`` con una
+    consulta por tabla y se mezclan en Python; cada página contiene los
+    ``limit`` primeros cambios de ambas.
+
+    Args:
+        db: Sesión de base de datos
+        modelo: Clase del modelo (con columna ``xid_cambio``)
+        columna_id: Columna de clave primaria del modelo
+        desde: Cursor de la respuesta anterior o None para empezar desde el
+            principio (sincronización completa)
+        limit: Número máximo de cambios (como máximo MAX_LIMITE)
+
+    Returns:
+        Diccionario con ``cambios`` (registros actuales), ``eliminados``
+        (ids), ``cursor`` (para la siguiente petición) y ``hay_mas``
+
+    Raises:
+        ValueError: Si el límite o el cursor no son válidos
+    """
+    validar_limite(limit)
+    xid, id_registro = decodificar_cursor_cambios(desde) if desde else (0, None)
+    # Todo lo escrito por transacciones anteriores a xmin ya es visible
+    xmin = db.scalar(select(literal_column(SQL_XMIN_SNAPSHOT)))
+
+    # xid_cambio se lee como columna aparte: una entidad que ya estuviera en
+    # la sesión conservaría el valor con el que se cargó
+    filas = db.execute(
+        select(modelo, modelo.xid_cambio)
+        .where(
+            _desde_cursor(modelo.xid_cambio, columna_id, xid, id_registro),
+            modelo.xid_cambio < xmin,
+        )
+        .order_by(modelo.xid_cambio, columna_id)
+        .limit(limit + 1)
+    ).all()
+    lapidas = db.execute(
+        select(Eliminacion.xid_cambio, Eliminacion.id_registro)
+        .where(
+            Eliminacion.tabla == modelo.__tablename__,
+            _desde_cursor(
+                Eliminacion.xid_cambio, Eliminacion.id_registro, xid, id_registro
+            ),
+            Eliminacion.xid_cambio < xmin,
+        )
+        .order_by(Eliminacion.xid_cambio, Eliminacion.id_registro)
+        .limit(limit + 1)
+    ).all()
+
+    # (xid, id, registro o None si es una lápida) en el orden del feed
+    claves = [
+        (xid_fila, getattr(registro, columna_id.key), registro)
+        for registro, xid_fila in filas
+    ]
+    claves += [(xid_lapida, id_lapida, None) for xid_lapida, id_lapida in lapidas]
+    claves.sort(key=lambda clave: clave[:2])
+    hay_mas = len(claves) > limit
+    pagina = claves[:limit]
+
+    if hay_mas:
+        cursor = codificar_cursor_cambios(*pagina[-1][:2])
+    elif xmin > xid:
+        cursor = codificar_cursor_cambios(xmin)
+    else:
+        cursor = desde
+    return {
+        "cambios": [registro for _, _, registro in pagina if registro is not None],
+        "eliminados": [id_fila for _, id_fila, registro in pagina if registro is None],
+        "cursor": cursor,
+        "hay_mas": hay_mas,
+    }
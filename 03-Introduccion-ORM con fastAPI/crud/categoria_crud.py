@@ -2,17 +2,75 @@
 Operaciones CRUD para Categoría
 """
 
-from typing import List, Optional
+import os
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 from uuid import UUID
 
+from auth.actor import actor_sistema
+from cache.entidades import instantanea, restaurar
+from cache.lru import CacheLRU
+from crud.cambios import obtener_cambios
+from crud.importacion import TAMAÑO_LOTE_IMPORTACION, importar_archivo, texto
+from crud.lotes import filtro_ids, ordenar_por_ids, validar_ids
+from crud.paginacion import ordenar, paginar
+from crud.versiones import comprobar_conflicto, condiciones_version
+from database.unidad_trabajo import al_terminar, confirmar
 from entities.categoria import Categoria
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+# Caché de lectura de categorías, compartida por todas las sesiones del
+# proceso. Se vacía en cada escritura; el TTL acota cuánto tarda un proceso en
+# ver las escrituras hechas por otro.
+cache_categorias = CacheLRU(
+    max_entradas=int(os.getenv("CACHE_CATEGORIAS_MAX", "1000")),
+    ttl_segundos=float(os.getenv("CACHE_CATEGORIAS_TTL", "300")),
+)
+
 
 class CategoriaCRUD:
     def __init__(self, db: Session):
         self.db = db
 
+    def _desde_cache(self, clave: tuple, consulta) -> Optional[Categoria]:
+        """Resolver una categoría por la caché o, si falla, con ``consulta``"""
+        datos = cache_categorias.obtener(clave)
+        if datos is not None:
+            return restaurar(self.db, Categoria, datos)
+
+        categoria = consulta.first()
+        # Las ausencias no se guardan: otro proceso puede crear la categoría
+        if categoria is not None:
+            cache_categorias.guardar(clave, instantanea(categoria))
+        return categoria
+
+    def precargar_cache(self) -> int:
+        """
+        Cargar en la caché todas las categorías por id y por nombre
+
+        Returns:
+            Número de categorías cargadas
+        """
+        categorias = (
+            self.db.query(Categoria).limit(cache_categorias.max_entradas // 2).all()
+        )
+        for categoria in categorias:
+            datos = instantanea(categoria)
+            cache_categorias.guardar(("id", categoria.id_categoria), datos)
+            cache_categorias.guardar(("nombre", categoria.nombre), datos)
+        return len(categorias)
+
+    def _mensaje_integridad(self, error: IntegrityError) -> str:
+        """Traducir una violación de integridad a un mensaje de validación"""
+        detalle = str(error.orig)
+        if "(nombre)" in detalle:
+            return "Ya existe una categoría con ese nombre"
+        if "(id_usuario_edita)" in detalle or "(id_usuario_crea)" in detalle:
+            return "El usuario que realiza la operación no existe"
+        return "Los datos de la categoría no son válidos"
+
     def crear_categoria(
         self, nombre: str, descripcion: str = None, id_usuario_crea: UUID = None
     ) -> Categoria:
@@ -36,29 +94,126 @@ class CategoriaCRUD:
         if len(nombre) > 100:
             raise ValueError("El nombre no puede exceder 100 caracteres")
 
-        if self.obtener_categoria_por_nombre(nombre):
-            raise ValueError("Ya existe una categoría con ese nombre")
-
+        id_usuario_crea = actor_sistema.resolver(self.db, id_usuario_crea)
         if id_usuario_crea is None:
-            from entities.usuario import Usuario
-
-            admin = self.db.query(Usuario).filter(Usuario.es_admin == True).first()
-            if not admin:
-                raise ValueError(
-                    "No se encontró un usuario administrador para crear la categoría"
-                )
-            id_usuario_crea = admin.id_usuario
+            raise ValueError(
+                "No se encontró un usuario administrador para crear la categoría"
+            )
 
         categoria = Categoria(
             nombre=nombre.strip(),
             descripcion=descripcion.strip() if descripcion else None,
             id_usuario_crea=id_usuario_crea,
         )
-        self.db.add(categoria)
-        self.db.commit()
-        self.db.refresh(categoria)
+        # La unicidad del nombre la garantiza la restricción UNIQUE; no se
+        # comprueba antes para no depender de una caché que puede estar
+        # atrasada. El punto de guardado limita el rollback a este INSERT
+        try:
+            with self.db.begin_nested():
+                self.db.add(categoria)
+                self.db.flush()
+        except IntegrityError as e:
+            raise ValueError(self._mensaje_integridad(e)) from e
+        confirmar(self.db, categoria)
+        al_terminar(self.db, cache_categorias.limpiar)
         return categoria
 
+    def importar_archivo(
+        self,
+        filas: Iterable[Tuple[int, Optional[dict]]],
+        id_usuario_crea: UUID = None,
+        tamaño_lote: int = TAMAÑO_LOTE_IMPORTACION,
+    ) -> Iterator[dict]:
+        """
+        Importar categorías desde las filas de un archivo CSV o NDJSON
+
+        Campos de cada fila: ``nombre`` y ``descripcion`` (opcional). El
+        usuario se resuelve aquí, antes de leer ninguna fila; la importación
+        empieza al recorrer el iterador devuelto.
+
+        Args:
+            filas: Filas leídas con leer_filas
+            id_usuario_crea: UUID del usuario que importa las categorías
+            tamaño_lote: Filas por lote y transacción
+
+        Returns:
+            Iterador con el progreso de cada lote (ver importar_archivo)
+
+        Raises:
+            ValueError: Si no hay usuario al que atribuir las categorías
+        """
+        id_usuario_crea = actor_sistema.resolver(self.db, id_usuario_crea)
+        if id_usuario_crea is None:
+            raise ValueError(
+                "No se encontró un usuario administrador para crear las categorías"
+            )
+        return importar_archivo(
+            filas,
+            lambda lote: self.importar_categorias(lote, id_usuario_crea),
+            tamaño_lote,
+        )
+
+    def importar_categorias(
+        self, filas: List[Tuple[int, dict]], id_usuario_crea: UUID
+    ) -> Tuple[int, List[dict]]:
+        """
+        Insertar un lote de filas de un archivo de importación
+
+        Las filas válidas se insertan con un único ``INSERT ... ON CONFLICT
+        (nombre) DO NOTHING RETURNING``: los nombres que ya existían se
+        rechazan sin abortar el lote. El lote se confirma en su propia
+        transacción.
+
+        Args:
+            filas: Lista de (número de línea, campos ``nombre`` y
+                ``descripcion``)
+            id_usuario_crea: UUID del usuario que importa las categorías
+
+        Returns:
+            Tupla con (categorías insertadas, errores). Cada error es un
+            diccionario con la ``linea`` del archivo y el mensaje ``error``.
+        """
+        errores = []
+        por_nombre = {}
+        for linea, datos in filas:
+            nombre = texto(datos, "nombre")
+            if not nombre:
+                mensaje = "El nombre de la categoría es obligatorio"
+            elif len(nombre) > 100:
+                mensaje = "El nombre no puede exceder 100 caracteres"
+            elif nombre in por_nombre:
+                mensaje = "Nombre repetido en el archivo"
+            else:
+                por_nombre[nombre] = (
+                    linea,
+                    {
+                        "nombre": nombre,
+                        "descripcion": texto(datos, "descripcion") or None,
+                        "id_usuario_crea": id_usuario_crea,
+                    },
+                )
+                continue
+            errores.append({"linea": linea, "error": mensaje})
+
+        if not por_nombre:
+            return 0, errores
+        insertados = set(
+            self.db.scalars(
+                insert(Categoria)
+                .values([categoria for _, categoria in por_nombre.values()])
+                .on_conflict_do_nothing(index_elements=[Categoria.nombre])
+                .returning(Categoria.nombre)
+            )
+        )
+        confirmar(self.db)
+        al_terminar(self.db, cache_categorias.limpiar)
+        errores.extend(
+            {"linea": linea, "error": "Ya existe una categoría con ese nombre"}
+            for nombre, (linea, _) in por_nombre.items()
+            if nombre not in insertados
+        )
+        return len(insertados), errores
+
     def obtener_categoria(self, categoria_id: UUID) -> Optional[Categoria]:
         """
         Obtener una categoría por ID
@@ -69,12 +224,50 @@ class CategoriaCRUD:
         Returns:
             Categoría encontrada o None
         """
-        return (
-            self.db.query(Categoria)
-            .filter(Categoria.id_categoria == categoria_id)
-            .first()
+        return self._desde_cache(
+            ("id", categoria_id),
+            self.db.query(Categoria).filter(Categoria.id_categoria == categoria_id),
         )
 
+    def obtener_categorias_por_ids(
+        self, ids: List[UUID]
+    ) -> Tuple[List[Optional[Categoria]], List[UUID]]:
+        """
+        Obtener varias categorías por id con una sola consulta
+
+        Args:
+            ids: UUIDs de categorías (como máximo MAX_IDS_LOTE)
+
+        Returns:
+            Tupla con (categoría o None por cada id, en el orden pedido, e
+            ids no encontrados)
+
+        Raises:
+            ValueError: Si no hay ids o hay demasiados
+        """
+        categorias = self.db.scalars(
+            select(Categoria).where(
+                filtro_ids(Categoria.id_categoria, validar_ids(ids))
+            )
+        ).all()
+        return ordenar_por_ids(categorias, ids, "id_categoria")
+
+    def obtener_cambios(self, desde: str = None, limit: int = 100) -> dict:
+        """
+        Categorías creadas, modificadas o eliminadas desde un cursor
+
+        Args:
+            desde: Cursor de la respuesta anterior (None: desde el principio)
+            limit: Número máximo de cambios (como máximo MAX_LIMITE)
+
+        Returns:
+            Diccionario con ``cambios``, ``eliminados``, ``cursor`` y ``hay_mas``
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
+        """
+        return obtener_cambios(self.db, Categoria, Categoria.id_categoria, desde, limit)
+
     def obtener_categoria_por_nombre(self, nombre: str) -> Optional[Categoria]:
         """
         Obtener una categoría por nombre
@@ -85,25 +278,66 @@ class CategoriaCRUD:
         Returns:
             Categoría encontrada o None
         """
-        return (
-            self.db.query(Categoria).filter(Categoria.nombre == nombre.strip()).first()
+        nombre = nombre.strip()
+        return self._desde_cache(
+            ("nombre", nombre),
+            self.db.query(Categoria).filter(Categoria.nombre == nombre),
         )
 
-    def obtener_categorias(self, skip: int = 0, limit: int = 100) -> List[Categoria]:
+    def obtener_categorias(
+        self, skip: int = 0, limit: int = 100, cursor: str = None
+    ) -> List[Categoria]:
         """
         Obtener lista de categorías con paginación
 
         Args:
             skip: Número de registros a omitir
-            limit: Límite de registros a retornar
+            limit: Límite de registros a retornar (como máximo MAX_LIMITE)
+            cursor: Cursor de la página anterior (paginación keyset)
+
+        Returns:
+            Lista de categorías ordenada por (fecha_creacion, id_categoria)
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
+        """
+        clave = ("lista", skip, limit, cursor)
+        pagina = cache_categorias.obtener(clave)
+        if pagina is not None:
+            return [restaurar(self.db, Categoria, datos) for datos in pagina]
+
+        categorias = paginar(
+            self.db.query(Categoria),
+            Categoria.fecha_creacion,
+            Categoria.id_categoria,
+            skip,
+            limit,
+            cursor,
+        ).all()
+        cache_categorias.guardar(
+            clave, [instantanea(categoria) for categoria in categorias]
+        )
+        return categorias
+
+    def consulta_categorias(self):
+        """
+        Consulta completa (sin paginar) de categorías, sin pasar por la caché
+
+        No se ejecuta: la API la recorre en streaming por lotes.
 
         Returns:
-            Lista de categorías
+            Consulta ordenada por (fecha_creacion, id_categoria)
         """
-        return self.db.query(Categoria).offset(skip).limit(limit).all()
+        return ordenar(
+            self.db.query(Categoria), Categoria.fecha_creacion, Categoria.id_categoria
+        )
 
     def actualizar_categoria(
-        self, categoria_id: UUID, id_usuario_edita: UUID = None, **kwargs
+        self,
+        categoria_id: UUID,
+        id_usuario_edita: UUID = None,
+        versiones: Sequence[int] = None,
+        **kwargs,
     ) -> Optional[Categoria]:
         """
         Actualizar una categoría con validaciones
@@ -111,52 +345,64 @@ class CategoriaCRUD:
         Args:
             categoria_id: UUID de la categoría
             id_usuario_edita: UUID del usuario que edita
+            versiones: Versiones sobre las que se permite editar (If-Match);
+                None para editar cualquier versión
             **kwargs: Campos a actualizar
 
         Returns:
-            Categoría actualizada o None
+            Categoría actualizada o None si no existe
 
         Raises:
             ValueError: Si los datos no son válidos
+            VersionObsoletaError: Si la categoría tiene otra versión
         """
-        categoria = self.obtener_categoria(categoria_id)
-        if not categoria:
-            return None
-
         if "nombre" in kwargs:
             nombre = kwargs["nombre"]
             if not nombre or len(nombre.strip()) == 0:
                 raise ValueError("El nombre de la categoría es obligatorio")
             if len(nombre) > 100:
                 raise ValueError("El nombre no puede exceder 100 caracteres")
-            if (
-                self.obtener_categoria_por_nombre(nombre)
-                and self.obtener_categoria_por_nombre(nombre).id_categoria
-                != categoria_id
-            ):
-                raise ValueError("Ya existe una categoría con ese nombre")
             kwargs["nombre"] = nombre.strip()
 
         if "descripcion" in kwargs and kwargs["descripcion"]:
             kwargs["descripcion"] = kwargs["descripcion"].strip()
 
+        id_usuario_edita = actor_sistema.resolver(self.db, id_usuario_edita)
         if id_usuario_edita is None:
-            from entities.usuario import Usuario
-
-            admin = self.db.query(Usuario).filter(Usuario.es_admin == True).first()
-            if not admin:
-                raise ValueError(
-                    "No se encontró un usuario administrador para editar la categoría"
-                )
-            id_usuario_edita = admin.id_usuario
-
-        categoria.id_usuario_edita = id_usuario_edita
+            raise ValueError(
+                "No se encontró un usuario administrador para editar la categoría"
+            )
+
+        valores = {
+            key: value for key, value in kwargs.items() if key in Categoria.__table__.c
+        }
+        valores["id_usuario_edita"] = id_usuario_edita
+        valores["version"] = Categoria.version + 1
+
+        # La unicidad del nombre la garantiza la restricción UNIQUE: un único
+        # UPDATE ... RETURNING sustituye a las búsquedas previas y al refresh.
+        try:
+            with self.db.begin_nested():
+                categoria = self.db.scalars(
+                    update(Categoria)
+                    .where(
+                        Categoria.id_categoria == categoria_id,
+                        *condiciones_version(Categoria, versiones),
+                    )
+                    .values(**valores)
+                    .returning(Categoria)
+                ).first()
+        except IntegrityError as e:
+            raise ValueError(self._mensaje_integridad(e)) from e
+
+        if categoria is None:
+            comprobar_conflicto(
+                self.db, Categoria.id_categoria, categoria_id, versiones
+            )
+            return None
 
-        for key, value in kwargs.items():
-            if hasattr(categoria, key):
-                setattr(categoria, key, value)
-        self.db.commit()
-        self.db.refresh(categoria)
+        confirmar(self.db)
+        al_terminar(self.db, cache_categorias.limpiar)
         return categoria
 
     def eliminar_categoria(self, categoria_id: UUID) -> bool:
@@ -169,9 +415,16 @@ class CategoriaCRUD:
         Returns:
             True si se eliminó, False si no existe
         """
-        categoria = self.obtener_categoria(categoria_id)
+        # Se consulta la BD y no la caché: la categoría puede haberse
+        # eliminado desde otro proceso
+        categoria = (
+            self.db.query(Categoria)
+            .filter(Categoria.id_categoria == categoria_id)
+            .first()
+        )
         if categoria:
             self.db.delete(categoria)
-            self.db.commit()
+            confirmar(self.db)
+            al_terminar(self.db, cache_categorias.limpiar)
             return True
         return False
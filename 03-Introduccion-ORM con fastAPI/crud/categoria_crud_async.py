@@ -0,0 +1,69 @@
+"""
+Operaciones CRUD asíncronas para Categoría
+"""
+
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from crud.base_async import AsyncCRUDBase
+from crud.categoria_crud import CategoriaCRUD
+from entities.categoria import Categoria
+from sqlalchemy import Select
+
+
+class AsyncCategoriaCRUD(AsyncCRUDBase):
+    crud_class = CategoriaCRUD
+
+    async def crear_categoria(
+        self, nombre: str, descripcion: str = None, id_usuario_crea: UUID = None
+    ) -> Categoria:
+        """Crear una nueva categoría con validaciones"""
+        return await self._ejecutar(
+            "crear_categoria", nombre, descripcion, id_usuario_crea
+        )
+
+    async def precargar_cache(self) -> int:
+        """Cargar en la caché todas las categorías por id y por nombre"""
+        return await self._ejecutar("precargar_cache")
+
+    async def obtener_categoria(self, categoria_id: UUID) -> Optional[Categoria]:
+        """Obtener una categoría por ID"""
+        return await self._ejecutar("obtener_categoria", categoria_id)
+
+    async def obtener_categorias_por_ids(
+        self, ids: List[UUID]
+    ) -> Tuple[List[Optional[Categoria]], List[UUID]]:
+        """Obtener varias categorías por id con una sola consulta"""
+        return await self._ejecutar("obtener_categorias_por_ids", ids)
+
+    async def obtener_cambios(self, desde: str = None, limit: int = 100) -> dict:
+        """Categorías creadas, modificadas o eliminadas desde un cursor"""
+        return await self._ejecutar("obtener_cambios", desde, limit)
+
+    async def obtener_categoria_por_nombre(self, nombre: str) -> Optional[Categoria]:
+        """Obtener una categoría por nombre"""
+        return await self._ejecutar("obtener_categoria_por_nombre", nombre)
+
+    async def obtener_categorias(
+        self, skip: int = 0, limit: int = 100, cursor: str = None
+    ) -> List[Categoria]:
+        """Obtener lista de categorías con paginación"""
+        return await self._ejecutar(
+            "obtener_categorias", skip=skip, limit=limit, cursor=cursor
+        )
+
+    def consulta_categorias(self) -> Select:
+        """Consulta completa (sin paginar) de categorías, sin ejecutar"""
+        return self._consulta("consulta_categorias")
+
+    async def actualizar_categoria(
+        self, categoria_id: UUID, id_usuario_edita: UUID = None, **kwargs
+    ) -> Optional[Categoria]:
+        """Actualizar una categoría con validaciones"""
+        return await self._ejecutar(
+            "actualizar_categoria", categoria_id, id_usuario_edita, **kwargs
+        )
+
+    async def eliminar_categoria(self, categoria_id: UUID) -> bool:
+        """Eliminar una categoría"""
+        return await self._ejecutar("eliminar_categoria", categoria_id)
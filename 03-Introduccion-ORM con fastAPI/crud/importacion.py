@@ -0,0 +1,165 @@
+"""
+Importación masiva de archivos CSV o NDJSON por lotes de tamaño fijo
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import (
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+# Filas que se validan e insertan en cada transacción
+TAMAÑO_LOTE_IMPORTACION = int(os.getenv("IMPORTACION_TAMAÑO_LOTE", "5000"))
+
+# Formatos admitidos y extensiones de archivo con las que se reconocen
+FORMATOS_IMPORTACION = {
+    "csv": (".csv",),
+    "ndjson": (".ndjson", ".jsonl"),
+}
+
+
+def detectar_formato(formato: Optional[str], nombre_archivo: str = "") -> str:
+    """
+    Formato indicado o, si no se indica, el de la extensión del archivo
+
+    Raises:
+        ValueError: Si el formato no es válido o no se puede deducir
+    """
+    if formato is None:
+        nombre = nombre_archivo.lower().removesuffix(".gz")
+        for candidato, extensiones in FORMATOS_IMPORTACION.items():
+            if nombre.endswith(extensiones):
+                return candidato
+    if formato not in FORMATOS_IMPORTACION:
+        raise ValueError(
+            f"Formato no válido. Opciones: {', '.join(FORMATOS_IMPORTACION)}"
+        )
+    return formato
+
+
+def abrir_texto(archivo: BinaryIO, nombre_archivo: str = "") -> TextIO:
+    """
+    Leer un archivo binario como texto UTF-8, descomprimiéndolo si es ``.gz``
+
+    La lectura es perezosa: nunca se carga el archivo entero en memoria.
+    """
+    if nombre_archivo.lower().endswith(".gz"):
+        archivo = gzip.GzipFile(fileobj=archivo, mode="rb")
+    return io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+
+
+def leer_filas(archivo: TextIO, formato: str) -> Iterator[Tuple[int, Optional[dict]]]:
+    """
+    Recorrer las filas de un archivo sin cargarlo entero
+
+    Args:
+        archivo: Archivo de texto (en CSV, abierto con ``newline=""``)
+        formato: ``csv`` (con cabecera) o ``ndjson`` (un objeto por línea)
+
+    Returns:
+        Iterador de (número de línea, campos de la fila). Las líneas NDJSON
+        que no son un objeto JSON se devuelven con campos None
+    """
+    if formato == "csv":
+        lector = csv.DictReader(archivo)
+        for fila in lector:
+            yield lector.line_num, fila
+        return
+
+    for numero_linea, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError:
+            fila = None
+        yield numero_linea, fila if isinstance(fila, dict) else None
+
+
+def texto(fila: dict, campo: str) -> str:
+    """Valor de texto de un campo, sin espacios ("" si falta)"""
+    valor = fila.get(campo)
+    return "" if valor is None else str(valor).strip()
+
+
+def numero(fila: dict, campo: str, tipo: type = Decimal, defecto=None):
+    """
+    Valor numérico de un campo (``defecto`` si falta)
+
+    Raises:
+        ValueError: Si el valor no es un número del tipo pedido
+    """
+    valor = texto(fila, campo)
+    if not valor:
+        if defecto is None:
+            raise ValueError(f"El campo {campo} es obligatorio")
+        return defecto
+    try:
+        return tipo(valor)
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"El campo {campo} no es un número válido: {valor}")
+
+
+def importar_archivo(
+    filas: Iterable[Tuple[int, Optional[dict]]],
+    procesar_lote: Callable[[List[Tuple[int, dict]]], Tuple[int, List[dict]]],
+    tamaño_lote: int = TAMAÑO_LOTE_IMPORTACION,
+) -> Iterator[dict]:
+    """
+    Importar las filas por lotes e informar del progreso tras cada uno
+
+    Solo se tiene en memoria un lote: cada uno se valida, se inserta y se
+    confirma en su propia transacción antes de leer el siguiente, así que
+    un error en un lote no deshace los anteriores.
+
+    Args:
+        filas: Filas leídas con leer_filas
+        procesar_lote: Función que inserta una lista de (línea, campos) y
+            devuelve (filas insertadas, errores por línea)
+        tamaño_lote: Número de filas por lote
+
+    Returns:
+        Iterador de diccionarios de progreso, uno por lote, con los errores
+        (``linea`` y ``error``) de ese lote. El último lleva ``completado``
+        y los totales.
+    """
+    inicio = time.perf_counter()
+    filas = iter(filas)
+    totales = {"filas": 0, "insertadas": 0, "rechazadas": 0}
+    numero_lote = 0
+    while lote := list(islice(filas, tamaño_lote)):
+        numero_lote += 1
+        errores = [
+            {"linea": linea, "error": "La línea no es un objeto JSON válido"}
+            for linea, datos in lote
+            if datos is None
+        ]
+        validas = [(linea, datos) for linea, datos in lote if datos is not None]
+        insertadas, errores_lote = procesar_lote(validas) if validas else (0, [])
+        errores.extend(errores_lote)
+        errores.sort(key=lambda error: error["linea"])
+
+        totales["filas"] += len(lote)
+        totales["insertadas"] += insertadas
+        totales["rechazadas"] += len(errores)
+        yield {"lote": numero_lote, **totales, "errores": errores}
+
+    yield {
+        "completado": True,
+        "lotes": numero_lote,
+        **totales,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
@@ -0,0 +1,304 @@
+"""
+Operaciones del kardex: movimientos de inventario y fotos del stock
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from crud.paginacion import validar_limite
+from database.unidad_trabajo import confirmar
+from entities.inventario import (
+    PARTICION_DEFECTO,
+    MovimientoInventario,
+    SnapshotInventario,
+    limites_particion,
+    mes_siguiente,
+    nombre_particion,
+    sql_particion,
+)
+from entities.producto import Producto
+from sqlalchemy import DateTime, func, insert, literal, select, text, union_all
+from sqlalchemy.orm import Session
+
+# Cada cuánto se toma una foto del stock: una consulta histórica lee una foto
+# y como mucho este intervalo de movimientos
+INTERVALO_SNAPSHOT = int(os.getenv("INVENTARIO_INTERVALO_SNAPSHOT", "3600"))
+
+# La foto cubre hasta ``now() - margen``: los movimientos llevan la hora de
+# inicio de su transacción y las que siguen abiertas aún no son visibles
+MARGEN_SNAPSHOT = int(os.getenv("INVENTARIO_MARGEN_SNAPSHOT", "300"))
+
+# Meses futuros con partición creada de antemano
+MESES_PARTICIONES = int(os.getenv("INVENTARIO_MESES_PARTICIONES", "2"))
+
+# Bloqueo consultivo: con varios workers, solo uno toma cada foto
+BLOQUEO_SNAPSHOT = 23_000_001
+
+
+def fijar_motivo(db: Session, motivo: str):
+    """
+    Motivo de los movimientos que registren los triggers de productos hasta
+    el final de la transacción (``set_config(..., true)`` es local a ella)
+    """
+    db.execute(select(func.set_config("inventario.motivo", motivo, True)))
+
+
+class InventarioCRUD:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _ultimo_snapshot(self, hasta: datetime = None) -> Optional[datetime]:
+        """Fecha de la última foto (anterior o igual a ``hasta``)"""
+        consulta = select(func.max(SnapshotInventario.fecha))
+        if hasta is not None:
+            consulta = consulta.where(SnapshotInventario.fecha <= hasta)
+        return self.db.scalar(consulta)
+
+    def _saldos(
+        self,
+        snapshot: Optional[datetime],
+        hasta: datetime = None,
+        producto_id: UUID = None,
+    ):
+        """
+        Stock por producto: la foto ``snapshot`` más los movimientos
+        posteriores, hasta ``hasta`` (incluido) si se indica
+
+        El filtro por fecha de los movimientos descarta las particiones
+        anteriores a la foto y el índice BRIN acota las páginas leídas.
+
+        Returns:
+            Sentencia ``SELECT producto_id, stock``
+        """
+        tramo = select(
+            MovimientoInventario.producto_id,
+            MovimientoInventario.delta.label("cantidad"),
+        )
+        if snapshot is not None:
+            tramo = tramo.where(MovimientoInventario.fecha > snapshot)
+        if hasta is not None:
+            tramo = tramo.where(MovimientoInventario.fecha <= hasta)
+        if producto_id is not None:
+            tramo = tramo.where(MovimientoInventario.producto_id == producto_id)
+
+        partes = [tramo]
+        if snapshot is not None:
+            base = select(
+                SnapshotInventario.producto_id,
+                SnapshotInventario.stock.label("cantidad"),
+            ).where(SnapshotInventario.fecha == snapshot)
+            if producto_id is not None:
+                base = base.where(SnapshotInventario.producto_id == producto_id)
+            partes.append(base)
+
+        filas = union_all(*partes).subquery()
+        return select(
+            filas.c.producto_id, func.sum(filas.c.cantidad).label("stock")
+        ).group_by(filas.c.producto_id)
+
+    def obtener_movimientos(
+        self,
+        producto_id: UUID,
+        desde: datetime = None,
+        hasta: datetime = None,
+        limit: int = 100,
+    ) -> List[MovimientoInventario]:
+        """
+        Movimientos de un producto, del más reciente al más antiguo
+
+        Args:
+            producto_id: UUID del producto
+            desde: Fecha mínima (incluida)
+            hasta: Fecha máxima (incluida)
+            limit: Número máximo de movimientos
+
+        Returns:
+            Lista de movimientos
+
+        Raises:
+            ValueError: Si el rango de fechas o el límite no son válidos
+        """
+        validar_limite(limit)
+        if desde is not None and hasta is not None and desde > hasta:
+            raise ValueError("La fecha inicial no puede ser posterior a la final")
+
+        consulta = select(MovimientoInventario).where(
+            MovimientoInventario.producto_id == producto_id
+        )
+        if desde is not None:
+            consulta = consulta.where(MovimientoInventario.fecha >= desde)
+        if hasta is not None:
+            consulta = consulta.where(MovimientoInventario.fecha <= hasta)
+        return list(
+            self.db.scalars(
+                consulta.order_by(
+                    MovimientoInventario.fecha.desc(),
+                    MovimientoInventario.id_movimiento.desc(),
+                ).limit(limit)
+            )
+        )
+
+    def stock_en_fecha(self, producto_id: UUID, fecha: datetime) -> Optional[int]:
+        """
+        Stock que tenía un producto en una fecha
+
+        Se lee la última foto anterior a ``fecha`` y los movimientos del
+        producto entre la foto y ``fecha``, en lugar de todo el historial.
+
+        Args:
+            producto_id: UUID del producto
+            fecha: Fecha de la consulta (UTC si no lleva zona horaria)
+
+        Returns:
+            Stock en esa fecha o None si el producto no existe ni tiene
+            historial (un producto eliminado conserva el suyo)
+        """
+        if fecha.tzinfo is None:
+            fecha = fecha.replace(tzinfo=timezone.utc)
+        saldos = self._saldos(
+            self._ultimo_snapshot(fecha), hasta=fecha, producto_id=producto_id
+        ).subquery()
+        stock = self.db.scalar(select(saldos.c.stock))
+        if stock is not None:
+            return stock
+        # Sin foto ni movimientos hasta la fecha: stock 0 si el producto
+        # existe o tiene movimientos posteriores
+        if self.db.get(Producto, producto_id) is not None:
+            return 0
+        movimiento = self.db.scalar(
+            select(MovimientoInventario.id_movimiento)
+            .where(MovimientoInventario.producto_id == producto_id)
+            .limit(1)
+        )
+        return 0 if movimiento is not None else None
+
+    def descuadres(self) -> List[dict]:
+        """
+        Productos cuyo stock no coincide con el que resulta del kardex
+
+        Compara, en una sola consulta, ``productos.stock`` con la última foto
+        más los movimientos posteriores.
+
+        Returns:
+            Lista de diccionarios con producto_id, stock y stock_kardex
+        """
+        kardex = self._saldos(self._ultimo_snapshot()).subquery()
+        stock = func.coalesce(Producto.stock, 0)
+        stock_kardex = func.coalesce(kardex.c.stock, 0)
+        filas = self.db.execute(
+            select(
+                func.coalesce(Producto.id_producto, kardex.c.producto_id),
+                stock,
+                stock_kardex,
+            )
+            .select_from(Producto)
+            .join(
+                kardex,
+                Producto.id_producto == kardex.c.producto_id,
+                full=True,
+            )
+            .where(stock != stock_kardex)
+        )
+        return [
+            {"producto_id": producto_id, "stock": actual, "stock_kardex": calculado}
+            for producto_id, actual, calculado in filas
+        ]
+
+    def tomar_snapshot(self) -> Optional[Tuple[datetime, int]]:
+        """
+        Guardar una foto del stock de todos los productos
+
+        La foto se calcula desde el kardex (foto anterior más movimientos
+        hasta ``now() - INVENTARIO_MARGEN_SNAPSHOT``) con un único
+        ``INSERT ... SELECT``. Si otro worker está tomando una foto, o la
+        anterior es demasiado reciente, no se hace nada.
+
+        Returns:
+            Tupla con (fecha de la foto, productos incluidos) o None
+        """
+        if not self.db.scalar(select(func.pg_try_advisory_xact_lock(BLOQUEO_SNAPSHOT))):
+            return None
+        corte = self.db.scalar(select(func.now())) - timedelta(seconds=MARGEN_SNAPSHOT)
+        anterior = self._ultimo_snapshot()
+        if anterior is not None and anterior >= corte:
+            return None
+
+        saldos = self._saldos(anterior, hasta=corte).subquery()
+        resultado = self.db.execute(
+            insert(SnapshotInventario).from_select(
+                ["fecha", "producto_id", "stock"],
+                select(
+                    literal(corte, DateTime(timezone=True)),
+                    saldos.c.producto_id,
+                    saldos.c.stock,
+                ).where(saldos.c.stock != 0),
+            )
+        )
+        confirmar(self.db)
+        return corte, resultado.rowcount
+
+    def _crear_particion(self, mes):
+        """
+        Crear la partición del mes que contiene ``mes`` si no existe
+
+        Postgres no crea una partición si la partición por defecto ya tiene
+        filas de su rango (movimientos de un mes que llegaron antes que su
+        partición). En ese caso se separa la partición por defecto, se crea la
+        del mes, se mueven a ella esas filas y se vuelve a adjuntar. Al
+        separarla pierde el trigger de solo inserción, que se vuelve a clonar
+        al adjuntarla; el ``ALTER TABLE`` bloquea las inserciones en el kardex
+        hasta el final de la transacción.
+        """
+        nombre = nombre_particion(mes)
+        if self.db.scalar(select(func.to_regclass(nombre))) is not None:
+            return
+        inicio, fin = limites_particion(mes)
+        rango = {"inicio": inicio, "fin": fin}
+        condicion = "fecha >= :inicio AND fecha < :fin"
+        pendientes = self.db.scalar(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {PARTICION_DEFECTO} WHERE {condicion})"
+            ),
+            rango,
+        )
+        if not pendientes:
+            self.db.execute(text(sql_particion(mes)))
+            return
+
+        columnas = ", ".join(MovimientoInventario.__table__.columns.keys())
+        self.db.execute(
+            text(
+                f"ALTER TABLE movimientos_inventario DETACH PARTITION {PARTICION_DEFECTO}"
+            )
+        )
+        self.db.execute(text(sql_particion(mes)))
+        self.db.execute(
+            text(
+                f"INSERT INTO {nombre} ({columnas}) "
+                f"SELECT {columnas} FROM {PARTICION_DEFECTO} WHERE {condicion}"
+            ),
+            rango,
+        )
+        self.db.execute(
+            text(f"DELETE FROM {PARTICION_DEFECTO} WHERE {condicion}"), rango
+        )
+        self.db.execute(
+            text(
+                "ALTER TABLE movimientos_inventario "
+                f"ATTACH PARTITION {PARTICION_DEFECTO} DEFAULT"
+            )
+        )
+
+    def crear_particiones(self, meses: int = MESES_PARTICIONES):
+        """
+        Crear (si faltan) las particiones mensuales del kardex desde el mes
+        actual hasta ``meses`` meses después
+        """
+        # Los límites de las particiones están en UTC
+        mes = datetime.now(timezone.utc).date().replace(day=1)
+        for _ in range(meses + 1):
+            self._crear_particion(mes)
+            mes = mes_siguiente(mes)
+        confirmar(self.db)
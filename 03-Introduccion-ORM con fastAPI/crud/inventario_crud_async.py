@@ -0,0 +1,43 @@
+"""
+Operaciones asíncronas del kardex de inventario
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from crud.base_async import AsyncCRUDBase
+from crud.inventario_crud import MESES_PARTICIONES, InventarioCRUD
+from entities.inventario import MovimientoInventario
+
+
+class AsyncInventarioCRUD(AsyncCRUDBase):
+    crud_class = InventarioCRUD
+
+    async def obtener_movimientos(
+        self,
+        producto_id: UUID,
+        desde: datetime = None,
+        hasta: datetime = None,
+        limit: int = 100,
+    ) -> List[MovimientoInventario]:
+        """Movimientos de un producto, del más reciente al más antiguo"""
+        return await self._ejecutar(
+            "obtener_movimientos", producto_id, desde, hasta, limit
+        )
+
+    async def stock_en_fecha(self, producto_id: UUID, fecha: datetime) -> Optional[int]:
+        """Stock que tenía un producto en una fecha"""
+        return await self._ejecutar("stock_en_fecha", producto_id, fecha)
+
+    async def descuadres(self) -> List[dict]:
+        """Productos cuyo stock no coincide con el que resulta del kardex"""
+        return await self._ejecutar("descuadres")
+
+    async def tomar_snapshot(self) -> Optional[Tuple[datetime, int]]:
+        """Guardar una foto del stock de todos los productos"""
+        return await self._ejecutar("tomar_snapshot")
+
+    async def crear_particiones(self, meses: int = MESES_PARTICIONES):
+        """Crear (si faltan) las particiones mensuales del kardex"""
+        return await self._ejecutar("crear_particiones", meses)
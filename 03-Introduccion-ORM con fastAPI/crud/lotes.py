@@ -0,0 +1,65 @@
+"""
+Utilidades para obtener varios registros por id en una sola consulta
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+
+# Número máximo de ids aceptados por los endpoints GET /.../lote
+MAX_IDS_LOTE = 500
+
+
+def filtro_ids(columna, ids: Sequence[UUID]):
+    """
+    Condición ``columna = ANY(:ids)`` con todos los ids en un único parámetro
+
+    A diferencia de ``IN (:id_1, :id_2, ...)``, el SQL no cambia con el
+    número de ids, así que el driver reutiliza la misma sentencia preparada.
+
+    Args:
+        columna: Columna de clave primaria
+        ids: Ids a buscar
+
+    Returns:
+        Expresión para usar en ``where``/``filter``
+    """
+    return columna == any_(bindparam("ids", list(ids), type_=ARRAY(columna.type)))
+
+
+def validar_ids(ids: Sequence[UUID]) -> List[UUID]:
+    """
+    Comprobar el número de ids y quitar los repetidos conservando el orden
+
+    Raises:
+        ValueError: Si no hay ids o hay más de MAX_IDS_LOTE
+    """
+    if not ids:
+        raise ValueError("Debe indicar al menos un id")
+    if len(ids) > MAX_IDS_LOTE:
+        raise ValueError(f"Se permiten como máximo {MAX_IDS_LOTE} ids por consulta")
+    return list(dict.fromkeys(ids))
+
+
+def ordenar_por_ids(
+    registros: Iterable, ids: Sequence[UUID], atributo_id: str
+) -> Tuple[List[Optional[object]], List[UUID]]:
+    """
+    Colocar los registros en el orden de ``ids``
+
+    Args:
+        registros: Registros devueltos por la consulta (en cualquier orden)
+        ids: Ids en el orden en que se pidieron
+        atributo_id: Nombre del atributo de clave primaria
+
+    Returns:
+        Tupla con (registro o None por cada id pedido, ids no encontrados)
+    """
+    por_id = {getattr(registro, atributo_id): registro for registro in registros}
+    resultados = [por_id.get(id_registro) for id_registro in ids]
+    no_encontrados = [
+        id_registro for id_registro in dict.fromkeys(ids) if id_registro not in por_id
+    ]
+    return resultados, no_encontrados
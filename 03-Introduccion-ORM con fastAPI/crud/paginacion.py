@@ -0,0 +1,240 @@
+"""
+Utilidades de paginación por cursor (keyset)
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import tuple_
+
+# Tamaño máximo de página de los listados; para recorrer resultados mayores
+# se usan los cursores o el modo streaming de la API
+MAX_LIMITE = int(os.getenv("PAGINACION_MAX_LIMITE", "500"))
+
+
+def _codificar(valores: list) -> str:
+    """Serializar la clave de ordenación en base64 url-safe sin relleno"""
+    datos = json.dumps(valores)
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decodificar(cursor: str) -> list:
+    """Operación inversa de _codificar (puede lanzar ValueError o TypeError)"""
+    relleno = "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(cursor + relleno).decode("utf-8"))
+
+
+def codificar_cursor(valor: Any, id_registro: UUID) -> str:
+    """
+    Generar un cursor opaco a partir de la clave de ordenación
+
+    Args:
+        valor: Valor de la columna de orden del último registro de la página
+            (fecha_creacion por defecto)
+        id_registro: UUID del último registro de la página
+
+    Returns:
+        Cursor codificado en base64 url-safe
+    """
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    elif isinstance(valor, Decimal):
+        valor = str(valor)
+    return _codificar([valor, str(id_registro)])
+
+
+def decodificar_cursor(cursor: str, tipo: type = datetime) -> Tuple[Any, UUID]:
+    """
+    Obtener la clave de ordenación contenida en un cursor
+
+    Args:
+        cursor: Cursor generado por codificar_cursor
+        tipo: Tipo Python de la columna de orden
+
+    Returns:
+        Tupla con (valor, id)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        valor, id_registro = _decodificar(cursor)
+        if tipo is datetime:
+            valor = datetime.fromisoformat(valor)
+        else:
+            valor = tipo(valor)
+        return valor, UUID(id_registro)
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError("El cursor de paginación no es válido")
+
+
+def codificar_cursor_busqueda(rango: Decimal, id_registro: UUID) -> str:
+    """
+    Generar el cursor de una búsqueda ordenada por relevancia
+
+    Args:
+        rango: Relevancia (ts_rank redondeado a numeric) del último resultado
+            de la página; se guarda como texto para no perder precisión
+        id_registro: UUID del último resultado de la página
+
+    Returns:
+        Cursor codificado en base64 url-safe
+    """
+    return _codificar([str(rango), str(id_registro)])
+
+
+def decodificar_cursor_busqueda(cursor: str) -> Tuple[Decimal, UUID]:
+    """
+    Obtener la relevancia y el id contenidos en un cursor de búsqueda
+
+    Args:
+        cursor: Cursor generado por codificar_cursor_busqueda
+
+    Returns:
+        Tupla con (rango, id)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        rango, id_registro = _decodificar(cursor)
+        rango = Decimal(rango)
+        if not rango.is_finite():
+            raise ValueError("Relevancia no finita")
+        return rango, UUID(id_registro)
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError("El cursor de paginación no es válido")
+
+
+def codificar_cursor_cambios(xid: int, id_registro: Optional[UUID] = None) -> str:
+    """
+    Generar el cursor de un feed de cambios
+
+    Args:
+        xid: Transacción del último cambio leído
+        id_registro: UUID del último registro leído, o None si ya se han
+            leído todos los cambios de transacciones anteriores a ``xid``
+
+    Returns:
+        Cursor codificado en base64 url-safe
+    """
+    return _codificar([xid, str(id_registro) if id_registro else None])
+
+
+def decodificar_cursor_cambios(cursor: str) -> Tuple[int, Optional[UUID]]:
+    """
+    Obtener la transacción y el id contenidos en un cursor de cambios
+
+    Args:
+        cursor: Cursor generado por codificar_cursor_cambios
+
+    Returns:
+        Tupla con (xid, id o None)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        xid, id_registro = _decodificar(cursor)
+        return int(xid), UUID(id_registro) if id_registro is not None else None
+    except (ValueError, TypeError):
+        raise ValueError("El cursor de cambios no es válido")
+
+
+def validar_limite(limit: int):
+    """
+    Comprobar que el tamaño de página está entre 1 y MAX_LIMITE
+
+    Raises:
+        ValueError: Si el límite está fuera de rango
+    """
+    if limit < 1 or limit > MAX_LIMITE:
+        raise ValueError(f"El límite debe estar entre 1 y {MAX_LIMITE}")
+
+
+def ordenar(query, columna_orden, columna_id, descendente: bool = False):
+    """
+    Ordenar una consulta por ``(columna_orden, columna_id)``
+
+    Es el orden estable que usan tanto las páginas como el modo streaming.
+    """
+    if descendente:
+        return query.order_by(columna_orden.desc(), columna_id.desc())
+    return query.order_by(columna_orden, columna_id)
+
+
+def paginar(
+    query,
+    columna_orden,
+    columna_id,
+    skip: int,
+    limit: int,
+    cursor: str,
+    descendente: bool = False,
+):
+    """
+    Aplicar orden estable y paginación por offset o por cursor a una consulta
+
+    Con cursor se usa una comparación de fila ``(orden, id) > (:valor, :id)``
+    (``<`` en orden descendente) que Postgres resuelve con el índice
+    compuesto, sin descartar filas.
+
+    Args:
+        query: Consulta de SQLAlchemy
+        columna_orden: Columna de orden (fecha_creacion salvo que se indique otra)
+        columna_id: Columna de clave primaria de la entidad
+        skip: Número de registros a omitir (solo en modo offset)
+        limit: Límite de registros a retornar (como máximo MAX_LIMITE)
+        cursor: Cursor de la página anterior o None para modo offset
+        descendente: Ordenar de mayor a menor
+
+    Returns:
+        Consulta paginada
+
+    Raises:
+        ValueError: Si el límite o el cursor no son válidos
+    """
+    validar_limite(limit)
+    query = ordenar(query, columna_orden, columna_id, descendente)
+
+    if cursor:
+        valor, id_registro = decodificar_cursor(cursor, columna_orden.type.python_type)
+        clave = tuple_(columna_orden, columna_id)
+        if descendente:
+            query = query.filter(clave < (valor, id_registro))
+        else:
+            query = query.filter(clave > (valor, id_registro))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def siguiente_cursor(
+    registros: list,
+    limit: int,
+    atributo_id: str,
+    atributo_orden: str = "fecha_creacion",
+) -> Optional[str]:
+    """
+    Calcular el cursor de la página siguiente
+
+    Args:
+        registros: Registros de la página actual
+        limit: Límite solicitado
+        atributo_id: Nombre del atributo de clave primaria
+        atributo_orden: Nombre del atributo por el que se ordenó la página
+
+    Returns:
+        Cursor de la página siguiente o None si no hay más páginas
+    """
+    if not registros or len(registros) < limit:
+        return None
+    ultimo = registros[-1]
+    return codificar_cursor(
+        getattr(ultimo, atributo_orden), getattr(ultimo, atributo_id)
+    )
@@ -2,17 +2,127 @@
 Operaciones CRUD para Producto
 """
 
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from uuid import UUID
 
+from auth.actor import actor_sistema
+from cache.entidades import cache_entidades
+from crud.busqueda import construir_consulta, relevancia, tsquery
+from crud.cambios import obtener_cambios
+from crud.categoria_crud import CategoriaCRUD
+from crud.importacion import (
+    TAMAÑO_LOTE_IMPORTACION,
+    importar_archivo,
+    numero,
+    texto,
+)
+from crud.inventario_crud import fijar_motivo
+from crud.lotes import filtro_ids, ordenar_por_ids, validar_ids
+from crud.paginacion import (
+    codificar_cursor_busqueda,
+    decodificar_cursor_busqueda,
+    ordenar,
+    paginar,
+    validar_limite,
+)
+from crud.versiones import (
+    VersionObsoletaError,
+    comprobar_conflicto,
+    condiciones_version,
+)
+from database.unidad_trabajo import al_terminar, confirmar
 from entities.producto import Producto
-from sqlalchemy.orm import Session
+from sqlalchemy import Integer, and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+# Columnas por las que se puede ordenar GET /productos (parámetro ``sort``)
+CAMPOS_ORDEN = {
+    "fecha_creacion": Producto.fecha_creacion,
+    "nombre": Producto.nombre,
+    "precio": Producto.precio,
+    "stock": Producto.stock,
+}
+
+# Relaciones que los endpoints pueden incluir en la respuesta (?expand=)
+RELACIONES_EXPANDIBLES = {
+    "categoria": Producto.categoria,
+    "usuario_crea": Producto.usuario_crea,
+}
+
+# Columnas de GET /productos/export, en el orden en que se exportan
+COLUMNAS_EXPORTACION = (
+    Producto.id_producto,
+    Producto.nombre,
+    Producto.descripcion,
+    Producto.precio,
+    Producto.stock,
+    Producto.categoria_id,
+    Producto.usuario_id,
+    Producto.fecha_creacion,
+    Producto.fecha_edicion,
+)
+
+
+class StockInsuficienteError(ValueError):
+    """El ajuste dejaría el stock del producto en negativo"""
 
 
 class ProductoCRUD:
     def __init__(self, db: Session):
         self.db = db
 
+    def _validar_campos(
+        self, nombre: str, descripcion: str, precio: float, stock: int
+    ) -> None:
+        """Validar los campos obligatorios de un producto"""
+        if not nombre or len(nombre.strip()) == 0:
+            raise ValueError("El nombre del producto es obligatorio")
+
+        if len(nombre) > 200:
+            raise ValueError("El nombre no puede exceder 200 caracteres")
+
+        if not descripcion or len(descripcion.strip()) == 0:
+            raise ValueError("La descripción del producto es obligatoria")
+
+        if precio <= 0:
+            raise ValueError("El precio debe ser mayor a 0")
+
+        if stock < 0:
+            raise ValueError("El stock no puede ser negativo")
+
+    def _opciones_expandir(self, expandir: Sequence[str]) -> list:
+        """
+        Opciones de carga de las relaciones pedidas
+
+        Cada relación se carga con ``selectinload``: una consulta adicional
+        ``WHERE id IN (...)`` por relación, sea cual sea el tamaño de la página,
+        en lugar de una por producto. No se usa ``joinedload`` para no cambiar
+        el plan (ni los índices) de la consulta paginada.
+
+        Raises:
+            ValueError: Si alguna relación no se puede expandir
+        """
+        for relacion in expandir:
+            if relacion not in RELACIONES_EXPANDIBLES:
+                raise ValueError(
+                    f"Relación no válida: {relacion}. "
+                    f"Opciones: {', '.join(RELACIONES_EXPANDIBLES)}"
+                )
+        return [selectinload(RELACIONES_EXPANDIBLES[relacion]) for relacion in expandir]
+
+    def _mensaje_integridad(self, error: IntegrityError) -> str:
+        """Traducir una violación de clave foránea a un mensaje de validación"""
+        detalle = str(error.orig)
+        if "(categoria_id)" in detalle:
+            return "La categoría especificada no existe"
+        if "(usuario_id)" in detalle:
+            return "El usuario especificado no existe"
+        if "(id_usuario_edita)" in detalle or "(id_usuario_crea)" in detalle:
+            return "El usuario que realiza la operación no existe"
+        return "Los datos del producto no son válidos"
+
     def crear_producto(
         self,
         nombre: str,
@@ -41,36 +151,16 @@ class ProductoCRUD:
         Raises:
             ValueError: Si los datos no son válidos
         """
-        if not nombre or len(nombre.strip()) == 0:
-            raise ValueError("El nombre del producto es obligatorio")
-
-        if len(nombre) > 200:
-            raise ValueError("El nombre no puede exceder 200 caracteres")
-
-        if not descripcion or len(descripcion.strip()) == 0:
-            raise ValueError("La descripción del producto es obligatoria")
+        self._validar_campos(nombre, descripcion, precio, stock)
 
-        if precio <= 0:
-            raise ValueError("El precio debe ser mayor a 0")
-
-        if stock < 0:
-            raise ValueError("El stock no puede ser negativo")
-
-        from entities.categoria import Categoria
-
-        categoria = (
-            self.db.query(Categoria)
-            .filter(Categoria.id_categoria == categoria_id)
-            .first()
-        )
+        # Lectura servida normalmente por la caché de categorías
+        categoria = CategoriaCRUD(self.db).obtener_categoria(categoria_id)
         if not categoria:
             raise ValueError("La categoría especificada no existe")
 
         from entities.usuario import Usuario
 
-        usuario = (
-            self.db.query(Usuario).filter(Usuario.id_usuario == usuario_id).first()
-        )
+        usuario = self.db.query(Usuario).filter(Usuario.id == usuario_id).first()
         if not usuario:
             raise ValueError("El usuario especificado no existe")
 
@@ -86,78 +176,634 @@ class ProductoCRUD:
             usuario_id=usuario_id,
             id_usuario_crea=id_usuario_crea,
         )
-        self.db.add(producto)
-        self.db.commit()
-        self.db.refresh(producto)
+        # Un punto de guardado: si falla una restricción solo se deshace este
+        # INSERT, no las escrituras anteriores de la misma petición
+        try:
+            with self.db.begin_nested():
+                self.db.add(producto)
+                self.db.flush()
+        except IntegrityError as e:
+            # Por ejemplo, una categoría eliminada desde otro proceso que
+            # todavía figuraba en la caché
+            raise ValueError(self._mensaje_integridad(e)) from e
+        confirmar(self.db, producto)
         return producto
 
-    def obtener_producto(self, producto_id: UUID) -> Optional[Producto]:
+    def crear_productos_lote(
+        self, productos: List[dict], id_usuario_crea: UUID = None
+    ) -> Tuple[List[Producto], List[dict]]:
+        """
+        Crear muchos productos en una sola transacción
+
+        Las categorías y usuarios referenciados se validan con una consulta
+        ``IN`` por tabla y las filas válidas se insertan con un INSERT
+        multi-fila, en lugar de cinco round-trips por producto.
+
+        Args:
+            productos: Lista de diccionarios con los campos de crear_producto
+            id_usuario_crea: UUID del usuario que crea los productos
+                (por defecto, el usuario propietario de cada fila)
+
+        Returns:
+            Tupla con (productos creados, errores por fila). Cada error es un
+            diccionario con el ``indice`` de la fila y el mensaje ``error``.
+
+        Raises:
+            ValueError: Si el INSERT viola una restricción (por ejemplo, una
+                categoría eliminada después de validarla)
+        """
+        from entities.categoria import Categoria
+        from entities.usuario import Usuario
+
+        errores = []
+        validos = []
+        for indice, datos in enumerate(productos):
+            try:
+                self._validar_campos(
+                    datos.get("nombre"),
+                    datos.get("descripcion"),
+                    datos.get("precio"),
+                    datos.get("stock"),
+                )
+                validos.append((indice, datos))
+            except (ValueError, TypeError) as e:
+                errores.append({"indice": indice, "error": str(e)})
+
+        categorias_ids = {datos["categoria_id"] for _, datos in validos}
+        usuarios_ids = {datos["usuario_id"] for _, datos in validos}
+        categorias_existentes = set(
+            self.db.scalars(
+                select(Categoria.id_categoria).where(
+                    Categoria.id_categoria.in_(categorias_ids)
+                )
+            )
+        )
+        usuarios_existentes = set(
+            self.db.scalars(select(Usuario.id).where(Usuario.id.in_(usuarios_ids)))
+        )
+
+        filas = []
+        for indice, datos in validos:
+            if datos["categoria_id"] not in categorias_existentes:
+                errores.append(
+                    {"indice": indice, "error": "La categoría especificada no existe"}
+                )
+                continue
+            if datos["usuario_id"] not in usuarios_existentes:
+                errores.append(
+                    {"indice": indice, "error": "El usuario especificado no existe"}
+                )
+                continue
+            filas.append(
+                {
+                    "nombre": datos["nombre"].strip(),
+                    "descripcion": datos["descripcion"].strip(),
+                    "precio": datos["precio"],
+                    "stock": datos["stock"],
+                    "categoria_id": datos["categoria_id"],
+                    "usuario_id": datos["usuario_id"],
+                    "id_usuario_crea": id_usuario_crea or datos["usuario_id"],
+                }
+            )
+
+        creados = []
+        if filas:
+            try:
+                with self.db.begin_nested():
+                    creados = list(
+                        self.db.scalars(
+                            insert(Producto).returning(
+                                Producto, sort_by_parameter_order=True
+                            ),
+                            filas,
+                        )
+                    )
+            except IntegrityError as e:
+                raise ValueError(self._mensaje_integridad(e)) from e
+            confirmar(self.db)
+
+        errores.sort(key=lambda error: error["indice"])
+        return creados, errores
+
+    def importar_archivo(
+        self,
+        filas: Iterable[Tuple[int, Optional[dict]]],
+        usuario_id: UUID,
+        id_usuario_crea: UUID = None,
+        tamaño_lote: int = TAMAÑO_LOTE_IMPORTACION,
+    ) -> Iterator[dict]:
+        """
+        Importar productos desde las filas de un archivo CSV o NDJSON
+
+        Campos de cada fila: ``nombre``, ``descripcion``, ``precio``,
+        ``stock`` (0 si falta) y ``categoria`` (nombre de la categoría).
+        El usuario se comprueba aquí, antes de leer ninguna fila; la
+        importación empieza al recorrer el iterador devuelto.
+
+        Args:
+            filas: Filas leídas con leer_filas
+            usuario_id: UUID del usuario propietario de los productos
+            id_usuario_crea: UUID del usuario que importa los productos
+                (por defecto, el propietario)
+            tamaño_lote: Filas por lote y transacción
+
+        Returns:
+            Iterador con el progreso de cada lote (ver importar_archivo)
+
+        Raises:
+            ValueError: Si el usuario no existe
+        """
+        from entities.usuario import Usuario
+
+        if self.db.get(Usuario, usuario_id) is None:
+            raise ValueError("El usuario especificado no existe")
+        categorias = {}
+        return importar_archivo(
+            filas,
+            lambda lote: self.importar_productos(
+                lote, usuario_id, id_usuario_crea or usuario_id, categorias
+            ),
+            tamaño_lote,
+        )
+
+    def importar_productos(
+        self,
+        filas: List[Tuple[int, dict]],
+        usuario_id: UUID,
+        id_usuario_crea: UUID,
+        categorias: Dict[str, Optional[UUID]],
+    ) -> Tuple[int, List[dict]]:
+        """
+        Insertar un lote de filas de un archivo de importación
+
+        Cada fila indica la categoría por su nombre (campo ``categoria``). Los
+        nombres que aún no están en ``categorias`` se resuelven con una sola
+        consulta por lote y se añaden al diccionario, que el llamador
+        conserva entre lotes. Las filas válidas se insertan con un INSERT
+        multi-fila y el lote se confirma en su propia transacción.
+
+        Args:
+            filas: Lista de (número de línea, campos de la fila)
+            usuario_id: UUID del usuario propietario de los productos
+            id_usuario_crea: UUID del usuario que importa los productos
+            categorias: Nombre de categoría -> id (None si no existe)
+
+        Returns:
+            Tupla con (productos insertados, errores). Cada error es un
+            diccionario con la ``linea`` del archivo y el mensaje ``error``.
+        """
+        from entities.categoria import Categoria
+
+        pendientes = {texto(datos, "categoria") for _, datos in filas} - set(categorias)
+        if pendientes:
+            categorias.update(dict.fromkeys(pendientes))
+            categorias.update(
+                self.db.execute(
+                    select(Categoria.nombre, Categoria.id_categoria).where(
+                        Categoria.nombre.in_(pendientes)
+                    )
+                ).all()
+            )
+
+        errores = []
+        productos = []
+        lineas = []
+        for linea, datos in filas:
+            try:
+                nombre = texto(datos, "nombre")
+                descripcion = texto(datos, "descripcion")
+                precio = numero(datos, "precio")
+                stock = numero(datos, "stock", int, defecto=0)
+                self._validar_campos(nombre, descripcion, precio, stock)
+                categoria_id = categorias[texto(datos, "categoria")]
+                if categoria_id is None:
+                    raise ValueError(
+                        f"La categoría no existe: {texto(datos, 'categoria')}"
+                    )
+            except ValueError as e:
+                errores.append({"linea": linea, "error": str(e)})
+                continue
+            lineas.append(linea)
+            productos.append(
+                {
+                    "nombre": nombre,
+                    "descripcion": descripcion,
+                    "precio": precio,
+                    "stock": stock,
+                    "categoria_id": categoria_id,
+                    "usuario_id": usuario_id,
+                    "id_usuario_crea": id_usuario_crea,
+                }
+            )
+
+        if not productos:
+            return 0, errores
+        try:
+            with self.db.begin_nested():
+                self.db.execute(insert(Producto), productos)
+        except (DataError, IntegrityError) as e:
+            # Una categoría borrada durante la importación o un valor fuera
+            # de rango: se rechaza el lote (solo su punto de guardado) y se
+            # sigue con el siguiente
+            categorias.clear()
+            mensaje = (
+                self._mensaje_integridad(e)
+                if isinstance(e, IntegrityError)
+                else "Algún valor del lote está fuera de rango"
+            )
+            errores.extend({"linea": linea, "error": mensaje} for linea in lineas)
+            return 0, errores
+        confirmar(self.db)
+        return len(productos), errores
+
+    def obtener_producto(
+        self, producto_id: UUID, expandir: Sequence[str] = ()
+    ) -> Optional[Producto]:
         """
         Obtener un producto por ID
 
         Args:
             producto_id: UUID del producto
+            expandir: Relaciones a cargar (ver RELACIONES_EXPANDIBLES)
 
         Returns:
             Producto encontrado o None
+
+        Raises:
+            ValueError: Si alguna relación no se puede expandir
         """
-        return (
-            self.db.query(Producto).filter(Producto.id_producto == producto_id).first()
+        if expandir:
+            # Con relaciones se consulta la BD: la caché solo guarda columnas
+            return (
+                self.db.query(Producto)
+                .options(*self._opciones_expandir(expandir))
+                .filter(Producto.id_producto == producto_id)
+                .first()
+            )
+        return cache_entidades.obtener(
+            self.db,
+            Producto,
+            producto_id,
+            lambda: self.db.query(Producto)
+            .filter(Producto.id_producto == producto_id)
+            .first(),
         )
 
-    def obtener_productos(self, skip: int = 0, limit: int = 100) -> List[Producto]:
+    def obtener_productos_por_ids(
+        self, ids: List[UUID]
+    ) -> Tuple[List[Optional[Producto]], List[UUID]]:
+        """
+        Obtener varios productos por id con una sola consulta
+
+        Args:
+            ids: UUIDs de productos (como máximo MAX_IDS_LOTE)
+
+        Returns:
+            Tupla con (producto o None por cada id, en el orden pedido, e
+            ids no encontrados)
+
+        Raises:
+            ValueError: Si no hay ids o hay demasiados
+        """
+        productos = self.db.scalars(
+            select(Producto).where(filtro_ids(Producto.id_producto, validar_ids(ids)))
+        ).all()
+        return ordenar_por_ids(productos, ids, "id_producto")
+
+    def obtener_cambios(self, desde: str = None, limit: int = 100) -> dict:
+        """
+        Productos creados, modificados o eliminados desde un cursor
+
+        Args:
+            desde: Cursor de la respuesta anterior (None: desde el principio)
+            limit: Número máximo de cambios (como máximo MAX_LIMITE)
+
+        Returns:
+            Diccionario con ``cambios``, ``eliminados``, ``cursor`` y ``hay_mas``
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
+        """
+        return obtener_cambios(self.db, Producto, Producto.id_producto, desde, limit)
+
+    def _filtrar_productos(
+        self,
+        nombre: str = None,
+        categoria_id: UUID = None,
+        usuario_id: UUID = None,
+        precio_min: float = None,
+        precio_max: float = None,
+        stock_min: int = None,
+        stock_max: int = None,
+        sort: str = "fecha_creacion",
+        order: str = "asc",
+        expandir: Sequence[str] = (),
+    ):
+        """Validar los filtros y construir la consulta sin ordenar ni paginar"""
+        if sort not in CAMPOS_ORDEN:
+            raise ValueError(
+                f"Campo de ordenación no válido. Opciones: {', '.join(CAMPOS_ORDEN)}"
+            )
+        if order not in ("asc", "desc"):
+            raise ValueError("La dirección de ordenación debe ser 'asc' o 'desc'")
+        if (
+            precio_min is not None
+            and precio_max is not None
+            and precio_min > precio_max
+        ):
+            raise ValueError("El precio mínimo no puede ser mayor que el máximo")
+        if stock_min is not None and stock_max is not None and stock_min > stock_max:
+            raise ValueError("El stock mínimo no puede ser mayor que el máximo")
+
+        query = self.db.query(Producto).options(*self._opciones_expandir(expandir))
+        if nombre:
+            # El patrón se construye aquí (y no con ``:prefijo || '%'``) para que
+            # Postgres pueda usar ix_productos_nombre_prefijo con LIKE 'abc%'
+            prefijo = (
+                nombre.strip()
+                .lower()
+                .replace("/", "//")
+                .replace("%", "/%")
+                .replace("_", "/_")
+            )
+            query = query.filter(
+                func.lower(Producto.nombre).like(prefijo + "%", escape="/")
+            )
+        if categoria_id is not None:
+            query = query.filter(Producto.categoria_id == categoria_id)
+        if usuario_id is not None:
+            query = query.filter(Producto.usuario_id == usuario_id)
+        if precio_min is not None:
+            query = query.filter(Producto.precio >= precio_min)
+        if precio_max is not None:
+            query = query.filter(Producto.precio <= precio_max)
+        if stock_min is not None:
+            query = query.filter(Producto.stock >= stock_min)
+        if stock_max is not None:
+            query = query.filter(Producto.stock <= stock_max)
+
+        return query
+
+    def obtener_productos(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: str = None,
+        nombre: str = None,
+        categoria_id: UUID = None,
+        usuario_id: UUID = None,
+        precio_min: float = None,
+        precio_max: float = None,
+        stock_min: int = None,
+        stock_max: int = None,
+        sort: str = "fecha_creacion",
+        order: str = "asc",
+        expandir: Sequence[str] = (),
+    ) -> List[Producto]:
         """
-        Obtener lista de productos con paginación
+        Obtener lista de productos filtrada, ordenada y paginada
+
+        Todos los filtros se aplican en una única consulta SQL. El cursor
+        depende del orden: debe reutilizarse con los mismos ``sort`` y ``order``.
 
         Args:
             skip: Número de registros a omitir
-            limit: Límite de registros a retornar
+            limit: Límite de registros a retornar (como máximo MAX_LIMITE)
+            cursor: Cursor de la página anterior (paginación keyset)
+            nombre: Prefijo del nombre (sin distinguir mayúsculas)
+            categoria_id: UUID de la categoría
+            usuario_id: UUID del usuario propietario
+            precio_min: Precio mínimo (incluido)
+            precio_max: Precio máximo (incluido)
+            stock_min: Stock mínimo (incluido)
+            stock_max: Stock máximo (incluido)
+            sort: Campo de orden (fecha_creacion, nombre, precio o stock)
+            order: Dirección del orden (asc o desc)
+            expandir: Relaciones a cargar (ver RELACIONES_EXPANDIBLES)
 
         Returns:
-            Lista de productos
+            Lista de productos ordenada por (sort, id_producto)
+
+        Raises:
+            ValueError: Si el límite, el cursor, el orden, algún rango o alguna
+                relación no son válidos
         """
-        return self.db.query(Producto).offset(skip).limit(limit).all()
+        query = self._filtrar_productos(
+            nombre=nombre,
+            categoria_id=categoria_id,
+            usuario_id=usuario_id,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            stock_min=stock_min,
+            stock_max=stock_max,
+            sort=sort,
+            order=order,
+            expandir=expandir,
+        )
+        return paginar(
+            query,
+            CAMPOS_ORDEN[sort],
+            Producto.id_producto,
+            skip,
+            limit,
+            cursor,
+            descendente=order == "desc",
+        ).all()
 
-    def obtener_productos_por_categoria(self, categoria_id: UUID) -> List[Producto]:
+    def consulta_productos(
+        self,
+        nombre: str = None,
+        categoria_id: UUID = None,
+        usuario_id: UUID = None,
+        precio_min: float = None,
+        precio_max: float = None,
+        stock_min: int = None,
+        stock_max: int = None,
+        sort: str = "fecha_creacion",
+        order: str = "asc",
+        expandir: Sequence[str] = (),
+    ):
+        """
+        Consulta completa (sin paginar) de obtener_productos
+
+        No se ejecuta: la API la recorre en streaming por lotes.
+
+        Args:
+            nombre: Prefijo del nombre (sin distinguir mayúsculas)
+            categoria_id: UUID de la categoría
+            usuario_id: UUID del usuario propietario
+            precio_min: Precio mínimo (incluido)
+            precio_max: Precio máximo (incluido)
+            stock_min: Stock mínimo (incluido)
+            stock_max: Stock máximo (incluido)
+            sort: Campo de orden (fecha_creacion, nombre, precio o stock)
+            order: Dirección del orden (asc o desc)
+            expandir: Relaciones a cargar (ver RELACIONES_EXPANDIBLES)
+
+        Returns:
+            Consulta ordenada por (sort, id_producto)
+
+        Raises:
+            ValueError: Si el orden, algún rango o alguna relación no son válidos
+        """
+        query = self._filtrar_productos(
+            nombre=nombre,
+            categoria_id=categoria_id,
+            usuario_id=usuario_id,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            stock_min=stock_min,
+            stock_max=stock_max,
+            sort=sort,
+            order=order,
+            expandir=expandir,
+        )
+        return ordenar(
+            query, CAMPOS_ORDEN[sort], Producto.id_producto, descendente=order == "desc"
+        )
+
+    def consulta_exportacion(
+        self, categoria_id: UUID = None, incluir_categoria: bool = False
+    ):
+        """
+        Consulta de columnas del catálogo completo para exportarlo
+
+        Selecciona columnas en lugar de entidades, así que no se crean objetos
+        Producto. No se ejecuta: la API la convierte en líneas CSV o NDJSON y
+        la recorre en streaming por lotes.
+
+        Args:
+            categoria_id: Exportar solo los productos de esta categoría
+            incluir_categoria: Añadir el nombre de la categoría
+                (columna ``categoria_nombre``)
+
+        Returns:
+            Consulta ordenada por (fecha_creacion, id_producto)
+        """
+        from entities.categoria import Categoria
+
+        query = self.db.query(*COLUMNAS_EXPORTACION)
+        if incluir_categoria:
+            query = query.join(
+                Categoria, Categoria.id_categoria == Producto.categoria_id
+            ).add_columns(Categoria.nombre.label("categoria_nombre"))
+        if categoria_id is not None:
+            query = query.filter(Producto.categoria_id == categoria_id)
+        return ordenar(query, Producto.fecha_creacion, Producto.id_producto)
+
+    def obtener_productos_por_categoria(
+        self, categoria_id: UUID, limit: int = 100, cursor: str = None
+    ) -> List[Producto]:
         """
         Obtener productos por categoría
 
         Args:
             categoria_id: UUID de la categoría
+            limit: Límite de registros a retornar (como máximo MAX_LIMITE)
+            cursor: Cursor de la página anterior (paginación keyset)
 
         Returns:
-            Lista de productos de la categoría
+            Productos de la categoría ordenados por (fecha_creacion, id_producto)
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
         """
-        return (
-            self.db.query(Producto).filter(Producto.categoria_id == categoria_id).all()
+        return self.obtener_productos(
+            limit=limit, cursor=cursor, categoria_id=categoria_id
         )
 
-    def obtener_productos_por_usuario(self, usuario_id: UUID) -> List[Producto]:
+    def obtener_productos_por_usuario(
+        self, usuario_id: UUID, limit: int = 100, cursor: str = None
+    ) -> List[Producto]:
         """
         Obtener productos por usuario
 
         Args:
             usuario_id: UUID del usuario
+            limit: Límite de registros a retornar (como máximo MAX_LIMITE)
+            cursor: Cursor de la página anterior (paginación keyset)
 
         Returns:
-            Lista de productos del usuario
+            Productos del usuario ordenados por (fecha_creacion, id_producto)
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
         """
-        return self.db.query(Producto).filter(Producto.usuario_id == usuario_id).all()
+        return self.obtener_productos(limit=limit, cursor=cursor, usuario_id=usuario_id)
 
-    def buscar_productos_por_nombre(self, nombre: str) -> List[Producto]:
+    def buscar_productos_por_nombre(
+        self, nombre: str, limit: int = 100
+    ) -> List[Producto]:
         """
-        Buscar productos por nombre (búsqueda parcial)
+        Buscar productos por nombre o descripción (búsqueda parcial)
 
         Args:
-            nombre: Texto a buscar en el nombre
+            nombre: Texto a buscar
+            limit: Límite de registros a retornar
 
         Returns:
-            Lista de productos que coinciden
+            Lista de productos que coinciden, de más a menos relevante
         """
-        return self.db.query(Producto).filter(Producto.nombre.contains(nombre)).all()
+        productos, _ = self.buscar_productos(nombre, limit=limit)
+        return productos
+
+    def buscar_productos(
+        self, texto: str, limit: int = 20, cursor: str = None
+    ) -> Tuple[List[Producto], Optional[str]]:
+        """
+        Búsqueda de texto completo ordenada por relevancia
+
+        Usa el índice GIN de ``productos.busqueda`` en lugar de un
+        ``LIKE '%texto%'`` que obliga a recorrer la tabla entera. No distingue
+        acentos y cada palabra se busca como prefijo. Los resultados se ordenan
+        por ``(relevancia DESC, id_producto)`` y se paginan por cursor; la
+        relevancia se redondea a numeric para que el cursor la guarde exacta.
+
+        Args:
+            texto: Texto a buscar en nombre y descripción
+            limit: Límite de registros a retornar
+            cursor: Cursor de la página anterior
+
+        Returns:
+            Tupla con (productos, cursor de la página siguiente o None)
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
+        """
+        validar_limite(limit)
+        expresion = construir_consulta(texto)
+        if expresion is None:
+            return [], None
+
+        consulta = tsquery(expresion)
+        rango = relevancia(Producto.busqueda, consulta)
+        query = self.db.query(Producto, rango).filter(
+            Producto.busqueda.bool_op("@@")(consulta)
+        )
+        if cursor:
+            rango_anterior, id_anterior = decodificar_cursor_busqueda(cursor)
+            query = query.filter(
+                or_(
+                    rango < rango_anterior,
+                    and_(rango == rango_anterior, Producto.id_producto > id_anterior),
+                )
+            )
+
+        filas = query.order_by(rango.desc(), Producto.id_producto).limit(limit).all()
+        productos = [producto for producto, _ in filas]
+
+        siguiente = None
+        if filas and len(filas) == limit:
+            ultimo, rango_ultimo = filas[-1]
+            siguiente = codificar_cursor_busqueda(rango_ultimo, ultimo.id_producto)
+        return productos, siguiente
 
     def actualizar_producto(
-        self, producto_id: UUID, id_usuario_edita: UUID = None, **kwargs
+        self,
+        producto_id: UUID,
+        id_usuario_edita: UUID = None,
+        versiones: Sequence[int] = None,
+        **kwargs,
     ) -> Optional[Producto]:
         """
         Actualizar un producto con validaciones
@@ -165,18 +811,17 @@ class ProductoCRUD:
         Args:
             producto_id: UUID del producto
             id_usuario_edita: UUID del usuario que edita
+            versiones: Versiones sobre las que se permite editar (If-Match);
+                None para editar cualquier versión
             **kwargs: Campos a actualizar
 
         Returns:
-            Producto actualizado o None
+            Producto actualizado o None si no existe
 
         Raises:
-            ValueError: Si los datos no son válidos
+            ValueError: Si los datos no son válidos o la categoría/usuario no existe
+            VersionObsoletaError: Si el producto tiene otra versión
         """
-        producto = self.obtener_producto(producto_id)
-        if not producto:
-            return None
-
         if "nombre" in kwargs:
             nombre = kwargs["nombre"]
             if not nombre or len(nombre.strip()) == 0:
@@ -201,49 +846,50 @@ class ProductoCRUD:
             if stock < 0:
                 raise ValueError("El stock no puede ser negativo")
 
-        if "categoria_id" in kwargs:
-            from entities.categoria import Categoria
-
-            categoria = (
-                self.db.query(Categoria)
-                .filter(Categoria.id_categoria == kwargs["categoria_id"])
-                .first()
-            )
-            if not categoria:
-                raise ValueError("La categoría especificada no existe")
-
-        if "usuario_id" in kwargs:
-            from entities.usuario import Usuario
-
-            usuario = (
-                self.db.query(Usuario)
-                .filter(Usuario.id_usuario == kwargs["usuario_id"])
-                .first()
+        id_usuario_edita = actor_sistema.resolver(self.db, id_usuario_edita)
+        if id_usuario_edita is None:
+            raise ValueError(
+                "No se encontró un usuario administrador para editar el producto"
             )
-            if not usuario:
-                raise ValueError("El usuario especificado no existe")
 
-        if id_usuario_edita is None:
-            from entities.usuario import Usuario
+        valores = {
+            key: value for key, value in kwargs.items() if key in Producto.__table__.c
+        }
+        valores["id_usuario_edita"] = id_usuario_edita
+        valores["version"] = Producto.version + 1
 
-            admin = self.db.query(Usuario).filter(Usuario.es_admin == True).first()
-            if not admin:
-                raise ValueError(
-                    "No se encontró un usuario administrador para editar el producto"
-                )
-            id_usuario_edita = admin.id_usuario
+        # La existencia de categoria_id/usuario_id la garantizan las claves
+        # foráneas: un único UPDATE ... RETURNING sustituye a las consultas
+        # previas de validación, el SELECT de existencia y el refresh. La
+        # versión se compara en el mismo UPDATE, sin bloquear la fila antes.
+        try:
+            with self.db.begin_nested():
+                producto = self.db.scalars(
+                    update(Producto)
+                    .where(
+                        Producto.id_producto == producto_id,
+                        *condiciones_version(Producto, versiones),
+                    )
+                    .values(**valores)
+                    .returning(Producto)
+                ).first()
+        except IntegrityError as e:
+            raise ValueError(self._mensaje_integridad(e)) from e
 
-        producto.id_usuario_edita = id_usuario_edita
+        if producto is None:
+            comprobar_conflicto(self.db, Producto.id_producto, producto_id, versiones)
+            return None
 
-        for key, value in kwargs.items():
-            if hasattr(producto, key):
-                setattr(producto, key, value)
-        self.db.commit()
-        self.db.refresh(producto)
+        confirmar(self.db)
+        al_terminar(self.db, lambda: cache_entidades.invalidar(Producto, producto_id))
         return producto
 
     def actualizar_stock(
-        self, producto_id: UUID, nuevo_stock: int
+        self,
+        producto_id: UUID,
+        nuevo_stock: int,
+        versiones: Sequence[int] = None,
+        id_usuario_edita: UUID = None,
     ) -> Optional[Producto]:
         """
         Actualizar el stock de un producto
@@ -251,11 +897,283 @@ class ProductoCRUD:
         Args:
             producto_id: UUID del producto
             nuevo_stock: Nueva cantidad en stock
+            versiones: Versiones sobre las que se permite editar (If-Match)
+            id_usuario_edita: UUID del usuario que edita
 
         Returns:
             Producto actualizado o None
         """
-        return self.actualizar_producto(producto_id, stock=nuevo_stock)
+        return self.actualizar_producto(
+            producto_id, id_usuario_edita, versiones=versiones, stock=nuevo_stock
+        )
+
+    def ajustar_stock(
+        self,
+        producto_id: UUID,
+        delta: int,
+        versiones: Sequence[int] = None,
+        id_usuario_edita: UUID = None,
+    ) -> Optional[Producto]:
+        """
+        Sumar o restar unidades al stock de forma atómica
+
+        Se ejecuta un único ``UPDATE ... SET stock = stock + :delta WHERE
+        stock + :delta >= 0 RETURNING ...``, así que las ventas concurrentes
+        no se pisan y no hace falta leer el producto antes.
+
+        Args:
+            producto_id: UUID del producto
+            delta: Unidades a sumar (positivo) o restar (negativo)
+            versiones: Versiones sobre las que se permite ajustar (If-Match);
+                None para ajustar cualquier versión
+            id_usuario_edita: UUID del usuario que edita (por defecto, el
+                administrador del sistema)
+
+        Returns:
+            Producto actualizado o None si no existe
+
+        Raises:
+            StockInsuficienteError: Si el stock quedaría en negativo
+            VersionObsoletaError: Si el producto tiene otra versión
+        """
+        valores = {"stock": Producto.stock + delta, "version": Producto.version + 1}
+        id_usuario_edita = actor_sistema.resolver(self.db, id_usuario_edita)
+        if id_usuario_edita is not None:
+            valores["id_usuario_edita"] = id_usuario_edita
+        producto = self.db.scalars(
+            update(Producto)
+            .where(
+                Producto.id_producto == producto_id,
+                Producto.stock + delta >= 0,
+                *condiciones_version(Producto, versiones),
+            )
+            .values(**valores)
+            .returning(Producto)
+        ).first()
+
+        if producto is None:
+            # Solo en el caso de fallo se distingue "no existe" de "conflicto"
+            version_actual = self.db.scalar(
+                select(Producto.version).where(Producto.id_producto == producto_id)
+            )
+            if version_actual is None:
+                return None
+            if versiones is not None and version_actual not in versiones:
+                raise VersionObsoletaError(version_actual)
+            raise StockInsuficienteError(
+                "Stock insuficiente para aplicar el ajuste solicitado"
+            )
+
+        confirmar(self.db)
+        al_terminar(self.db, lambda: cache_entidades.invalidar(Producto, producto_id))
+        return producto
+
+    def bloquear_stock(self, ids: Iterable[UUID]) -> Dict[UUID, int]:
+        """
+        Bloquear varios productos (``FOR UPDATE``) y leer su stock
+
+        Las filas se bloquean en orden de ``id_producto``: dos transacciones
+        que bloquean productos en común siempre los piden en el mismo orden,
+        así que una espera a la otra en lugar de formar un interbloqueo.
+
+        Args:
+            ids: UUIDs de los productos
+
+        Returns:
+            Diccionario {id_producto: stock} de los productos que existen
+        """
+        filas = self.db.execute(
+            select(Producto.id_producto, Producto.stock)
+            .where(filtro_ids(Producto.id_producto, sorted(set(ids))))
+            .order_by(Producto.id_producto)
+            .with_for_update()
+        )
+        return {id_producto: stock for id_producto, stock in filas}
+
+    def sumar_stock(self, deltas: Dict[UUID, int], motivo: str = None):
+        """
+        Sumar a cada producto su delta de stock con un único UPDATE
+
+        ``UPDATE productos ... FROM unnest(:ids, :deltas)``: el SQL es el
+        mismo para cualquier número de productos. No comprueba que el stock
+        quede en positivo ni confirma: forma parte de una operación mayor,
+        que lo comprueba con las filas ya bloqueadas por bloquear_stock y
+        confirma al terminar.
+
+        Args:
+            deltas: Diccionario {id_producto: unidades a sumar (o restar)}
+            motivo: Motivo de los movimientos de inventario (por defecto,
+                ``ajuste``)
+        """
+        if not deltas:
+            return
+        if motivo is not None:
+            fijar_motivo(self.db, motivo)
+        ids = sorted(deltas)
+        valores = (
+            func.unnest(
+                bindparam("ids", ids, type_=ARRAY(Producto.id_producto.type)),
+                bindparam(
+                    "deltas",
+                    [deltas[producto_id] for producto_id in ids],
+                    type_=ARRAY(Integer),
+                ),
+            )
+            .table_valued("producto_id", "delta")
+            .render_derived(name="v")
+        )
+        self.db.execute(
+            update(Producto)
+            .where(Producto.id_producto == valores.c.producto_id)
+            .values(
+                stock=Producto.stock + valores.c.delta, version=Producto.version + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        def invalidar():
+            for producto_id in ids:
+                cache_entidades.invalidar(Producto, producto_id)
+
+        al_terminar(self.db, invalidar)
+
+    def aplicar_cambios_stock(
+        self, cambios: Dict[UUID, Tuple[Optional[int], int, Optional[UUID]]]
+    ) -> Dict[UUID, Producto]:
+        """
+        Aplicar con un único UPDATE los cambios de stock acumulados de
+        varios productos
+
+        Cada cambio es ``(stock fijado o None, delta, usuario que edita o
+        None)`` y deja el stock en ``COALESCE(fijado, stock) + delta``, con
+        los valores en un ``FROM unnest(:ids, :fijados, :deltas, :editores)``.
+        Sin usuario, la edición se atribuye al administrador del sistema. Los
+        productos en los que el stock quedaría negativo no se modifican.
+
+        Args:
+            cambios: Diccionario {id_producto: (stock fijado, delta, usuario)}
+
+        Returns:
+            Diccionario {id_producto: producto actualizado}; no incluye los
+            productos que no existen ni los que quedarían en negativo
+        """
+        if not cambios:
+            return {}
+        ids = sorted(cambios)
+        valores = (
+            func.unnest(
+                bindparam("ids", ids, type_=ARRAY(Producto.id_producto.type)),
+                bindparam(
+                    "fijados",
+                    [cambios[producto_id][0] for producto_id in ids],
+                    type_=ARRAY(Integer),
+                ),
+                bindparam(
+                    "deltas",
+                    [cambios[producto_id][1] for producto_id in ids],
+                    type_=ARRAY(Integer),
+                ),
+                bindparam(
+                    "editores",
+                    [cambios[producto_id][2] for producto_id in ids],
+                    type_=ARRAY(Producto.id_usuario_edita.type),
+                ),
+            )
+            .table_valued("producto_id", "fijado", "delta", "id_usuario_edita")
+            .render_derived(name="v")
+        )
+        nuevo_stock = func.coalesce(valores.c.fijado, Producto.stock) + valores.c.delta
+        id_usuario_edita = func.coalesce(
+            valores.c.id_usuario_edita,
+            bindparam(
+                "editor_sistema",
+                actor_sistema.resolver(self.db),
+                type_=Producto.id_usuario_edita.type,
+            ),
+            Producto.id_usuario_edita,
+        )
+        productos = {
+            producto.id_producto: producto
+            for producto in self.db.scalars(
+                update(Producto)
+                .where(Producto.id_producto == valores.c.producto_id, nuevo_stock >= 0)
+                .values(
+                    stock=nuevo_stock,
+                    id_usuario_edita=id_usuario_edita,
+                    version=Producto.version + 1,
+                )
+                .returning(Producto)
+                .execution_options(synchronize_session=False)
+            )
+        }
+        if not productos:
+            return productos
+
+        def invalidar():
+            for producto_id in productos:
+                cache_entidades.invalidar(Producto, producto_id)
+
+        confirmar(self.db)
+        al_terminar(self.db, invalidar)
+        return productos
+
+    def reasignar_productos(
+        self, usuario_id: UUID, nuevo_usuario_id: UUID, id_usuario_edita: UUID = None
+    ) -> int:
+        """
+        Pasar todos los productos de un usuario a otro
+
+        Un único ``UPDATE ... RETURNING id_producto``; los productos
+        devueltos se invalidan en la caché de entidades.
+
+        Args:
+            usuario_id: UUID del usuario que tiene los productos
+            nuevo_usuario_id: UUID del usuario que los recibe
+            id_usuario_edita: UUID del usuario que hace el cambio (por
+                defecto, el administrador del sistema)
+
+        Returns:
+            Número de productos reasignados
+
+        Raises:
+            ValueError: Si el usuario destino es el mismo, no existe o está
+                inactivo
+        """
+        from entities.usuario import Usuario
+
+        if nuevo_usuario_id == usuario_id:
+            raise ValueError("El usuario destino debe ser distinto del actual")
+        activo = self.db.scalar(
+            select(Usuario.activo).where(Usuario.id == nuevo_usuario_id)
+        )
+        if activo is None:
+            raise ValueError("El usuario especificado no existe")
+        if not activo:
+            raise ValueError("El usuario destino está inactivo")
+
+        id_usuario_edita = actor_sistema.resolver(self.db, id_usuario_edita)
+        ids = list(
+            self.db.scalars(
+                update(Producto)
+                .where(Producto.usuario_id == usuario_id)
+                .values(
+                    usuario_id=nuevo_usuario_id,
+                    id_usuario_edita=id_usuario_edita,
+                    version=Producto.version + 1,
+                )
+                .returning(Producto.id_producto)
+            )
+        )
+        if not ids:
+            return 0
+
+        def invalidar():
+            for producto_id in ids:
+                cache_entidades.invalidar(Producto, producto_id)
+
+        confirmar(self.db)
+        al_terminar(self.db, invalidar)
+        return len(ids)
 
     def eliminar_producto(self, producto_id: UUID) -> bool:
         """
@@ -267,9 +1185,15 @@ class ProductoCRUD:
         Returns:
             True si se eliminó, False si no existe
         """
-        producto = self.obtener_producto(producto_id)
+        # Se consulta la BD y no la caché antes de eliminar
+        producto = (
+            self.db.query(Producto).filter(Producto.id_producto == producto_id).first()
+        )
         if producto:
             self.db.delete(producto)
-            self.db.commit()
+            confirmar(self.db)
+            al_terminar(
+                self.db, lambda: cache_entidades.invalidar(Producto, producto_id)
+            )
             return True
         return False
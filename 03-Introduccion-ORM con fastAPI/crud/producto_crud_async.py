@@ -0,0 +1,155 @@
+"""
+Operaciones CRUD asíncronas para Producto
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from crud.base_async import AsyncCRUDBase
+from crud.producto_crud import ProductoCRUD
+from entities.producto import Producto
+from sqlalchemy import Select
+
+
+class AsyncProductoCRUD(AsyncCRUDBase):
+    crud_class = ProductoCRUD
+
+    async def crear_producto(
+        self,
+        nombre: str,
+        descripcion: str,
+        precio: float,
+        stock: int,
+        categoria_id: UUID,
+        usuario_id: UUID,
+        id_usuario_crea: UUID = None,
+    ) -> Producto:
+        """Crear un nuevo producto con validaciones"""
+        return await self._ejecutar(
+            "crear_producto",
+            nombre=nombre,
+            descripcion=descripcion,
+            precio=precio,
+            stock=stock,
+            categoria_id=categoria_id,
+            usuario_id=usuario_id,
+            id_usuario_crea=id_usuario_crea,
+        )
+
+    async def crear_productos_lote(
+        self, productos: List[dict], id_usuario_crea: UUID = None
+    ) -> Tuple[List[Producto], List[dict]]:
+        """Crear muchos productos en una sola transacción"""
+        return await self._ejecutar("crear_productos_lote", productos, id_usuario_crea)
+
+    async def obtener_producto(
+        self, producto_id: UUID, expandir: Sequence[str] = ()
+    ) -> Optional[Producto]:
+        """Obtener un producto por ID, con las relaciones pedidas"""
+        return await self._ejecutar("obtener_producto", producto_id, expandir)
+
+    async def obtener_productos_por_ids(
+        self, ids: List[UUID]
+    ) -> Tuple[List[Optional[Producto]], List[UUID]]:
+        """Obtener varios productos por id con una sola consulta"""
+        return await self._ejecutar("obtener_productos_por_ids", ids)
+
+    async def obtener_cambios(self, desde: str = None, limit: int = 100) -> dict:
+        """Productos creados, modificados o eliminados desde un cursor"""
+        return await self._ejecutar("obtener_cambios", desde, limit)
+
+    async def obtener_productos(
+        self, skip: int = 0, limit: int = 100, cursor: str = None, **filtros
+    ) -> List[Producto]:
+        """Obtener lista de productos filtrada, ordenada y paginada"""
+        return await self._ejecutar(
+            "obtener_productos", skip=skip, limit=limit, cursor=cursor, **filtros
+        )
+
+    def consulta_productos(self, **filtros) -> Select:
+        """Consulta completa (sin paginar) de obtener_productos, sin ejecutar"""
+        return self._consulta("consulta_productos", **filtros)
+
+    def consulta_exportacion(
+        self, categoria_id: UUID = None, incluir_categoria: bool = False
+    ) -> Select:
+        """Consulta de columnas del catálogo completo para exportarlo, sin ejecutar"""
+        return self._consulta("consulta_exportacion", categoria_id, incluir_categoria)
+
+    async def obtener_productos_por_categoria(
+        self, categoria_id: UUID, limit: int = 100, cursor: str = None
+    ) -> List[Producto]:
+        """Obtener productos por categoría con paginación"""
+        return await self._ejecutar(
+            "obtener_productos_por_categoria", categoria_id, limit, cursor
+        )
+
+    async def obtener_productos_por_usuario(
+        self, usuario_id: UUID, limit: int = 100, cursor: str = None
+    ) -> List[Producto]:
+        """Obtener productos por usuario con paginación"""
+        return await self._ejecutar(
+            "obtener_productos_por_usuario", usuario_id, limit, cursor
+        )
+
+    async def buscar_productos_por_nombre(
+        self, nombre: str, limit: int = 100
+    ) -> List[Producto]:
+        """Buscar productos por nombre o descripción (búsqueda parcial)"""
+        return await self._ejecutar("buscar_productos_por_nombre", nombre, limit)
+
+    async def buscar_productos(
+        self, texto: str, limit: int = 20, cursor: str = None
+    ) -> Tuple[List[Producto], Optional[str]]:
+        """Búsqueda de texto completo ordenada por relevancia"""
+        return await self._ejecutar("buscar_productos", texto, limit, cursor)
+
+    async def actualizar_producto(
+        self, producto_id: UUID, id_usuario_edita: UUID = None, **kwargs
+    ) -> Optional[Producto]:
+        """Actualizar un producto con validaciones"""
+        return await self._ejecutar(
+            "actualizar_producto", producto_id, id_usuario_edita, **kwargs
+        )
+
+    async def actualizar_stock(
+        self,
+        producto_id: UUID,
+        nuevo_stock: int,
+        versiones: Sequence[int] = None,
+        id_usuario_edita: UUID = None,
+    ) -> Optional[Producto]:
+        """Actualizar el stock de un producto"""
+        return await self._ejecutar(
+            "actualizar_stock", producto_id, nuevo_stock, versiones, id_usuario_edita
+        )
+
+    async def ajustar_stock(
+        self,
+        producto_id: UUID,
+        delta: int,
+        versiones: Sequence[int] = None,
+        id_usuario_edita: UUID = None,
+    ) -> Optional[Producto]:
+        """Sumar o restar unidades al stock de forma atómica"""
+        return await self._ejecutar(
+            "ajustar_stock", producto_id, delta, versiones, id_usuario_edita
+        )
+
+    async def aplicar_cambios_stock(
+        self, cambios: Dict[UUID, Tuple[Optional[int], int, Optional[UUID]]]
+    ) -> Dict[UUID, Producto]:
+        """Aplicar con un único UPDATE los cambios de stock de varios productos"""
+        return await self._ejecutar("aplicar_cambios_stock", cambios)
+
+    async def reasignar_productos(
+        self, usuario_id: UUID, nuevo_usuario_id: UUID, id_usuario_edita: UUID = None
+    ) -> int:
+        """Pasar todos los productos de un usuario a otro"""
+        return await self._ejecutar(
+            "reasignar_productos", usuario_id, nuevo_usuario_id, id_usuario_edita
+        )
+
+    async def eliminar_producto(self, producto_id: UUID) -> bool:
+        """Eliminar un producto"""
+        return await self._ejecutar("eliminar_producto", producto_id)
@@ -0,0 +1,276 @@
+"""
+Operaciones CRUD para Reserva de stock
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from crud.lotes import filtro_ids
+from crud.producto_crud import ProductoCRUD, StockInsuficienteError
+from database.unidad_trabajo import confirmar
+from entities.inventario import DEVOLUCION, RESERVA
+from entities.reserva import (
+    CANCELADA,
+    CONFIRMADA,
+    EXPIRADA,
+    PENDIENTE,
+    LineaReserva,
+    Reserva,
+)
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+# Tiempo que una reserva retiene el stock si no se confirma ni se cancela
+TTL_RESERVA = int(os.getenv("RESERVAS_TTL_SEGUNDOS", "900"))
+TTL_RESERVA_MAX = int(os.getenv("RESERVAS_TTL_MAX_SEGUNDOS", "86400"))
+
+# Productos distintos admitidos en una cesta
+MAX_LINEAS_RESERVA = int(os.getenv("RESERVAS_MAX_LINEAS", "100"))
+
+# Reservas caducadas que se liberan en cada transacción del barrido
+LOTE_EXPIRACION = int(os.getenv("RESERVAS_LOTE_EXPIRACION", "500"))
+
+
+class EstadoReservaError(ValueError):
+    """La reserva no está pendiente (ya se confirmó, canceló o expiró)"""
+
+
+class ReservaCRUD:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def crear_reserva(
+        self,
+        lineas: List[dict],
+        usuario_id: UUID = None,
+        ttl_segundos: int = None,
+    ) -> Reserva:
+        """
+        Reservar el stock de una cesta de productos de forma atómica
+
+        Se bloquean todos los productos de la cesta en orden de id (sin
+        interbloqueos entre cestas que comparten productos), se comprueba el
+        stock de todos y se descuenta con un único UPDATE. O se reservan
+        todas las líneas o ninguna.
+
+        Args:
+            lineas: Lista de diccionarios con producto_id y cantidad; un
+                producto repetido suma sus cantidades
+            usuario_id: UUID del usuario que reserva (opcional)
+            ttl_segundos: Segundos hasta que la reserva caduca (por defecto
+                RESERVAS_TTL_SEGUNDOS)
+
+        Returns:
+            Reserva pendiente con sus líneas
+
+        Raises:
+            ValueError: Si la cesta no es válida o algún producto no existe
+            StockInsuficienteError: Si algún producto no tiene stock suficiente
+        """
+        if not lineas:
+            raise ValueError("La reserva debe tener al menos un producto")
+
+        cantidades: Dict[UUID, int] = {}
+        for linea in lineas:
+            if linea["cantidad"] <= 0:
+                raise ValueError("La cantidad debe ser mayor a 0")
+            producto_id = linea["producto_id"]
+            cantidades[producto_id] = cantidades.get(producto_id, 0) + linea["cantidad"]
+        if len(cantidades) > MAX_LINEAS_RESERVA:
+            raise ValueError(
+                f"Se permiten como máximo {MAX_LINEAS_RESERVA} productos por reserva"
+            )
+
+        if ttl_segundos is None:
+            ttl_segundos = TTL_RESERVA
+        if not 0 < ttl_segundos <= TTL_RESERVA_MAX:
+            raise ValueError(
+                f"La duración de la reserva debe estar entre 1 y {TTL_RESERVA_MAX} s"
+            )
+
+        producto_crud = ProductoCRUD(self.db)
+        stock = producto_crud.bloquear_stock(cantidades)
+
+        no_encontrados = [
+            str(producto_id)
+            for producto_id in sorted(cantidades)
+            if producto_id not in stock
+        ]
+        if no_encontrados:
+            raise ValueError(f"Productos no encontrados: {', '.join(no_encontrados)}")
+        sin_stock = [
+            str(producto_id)
+            for producto_id in sorted(cantidades)
+            if stock[producto_id] < cantidades[producto_id]
+        ]
+        if sin_stock:
+            raise StockInsuficienteError(
+                f"Stock insuficiente para los productos: {', '.join(sin_stock)}"
+            )
+
+        reserva = Reserva(
+            estado=PENDIENTE,
+            expira_en=datetime.now(timezone.utc) + timedelta(seconds=ttl_segundos),
+            usuario_id=usuario_id,
+            lineas=[
+                LineaReserva(producto_id=producto_id, cantidad=cantidad)
+                for producto_id, cantidad in sorted(cantidades.items())
+            ],
+        )
+        # El descuento del stock y la reserva van en el mismo punto de
+        # guardado: si el usuario no existe se deshacen los dos, pero no las
+        # escrituras anteriores de la petición
+        try:
+            with self.db.begin_nested():
+                producto_crud.sumar_stock(
+                    {
+                        producto_id: -cantidad
+                        for producto_id, cantidad in cantidades.items()
+                    },
+                    RESERVA,
+                )
+                self.db.add(reserva)
+                self.db.flush()
+        except IntegrityError as e:
+            raise ValueError("El usuario especificado no existe") from e
+        confirmar(self.db)
+        return reserva
+
+    def obtener_reserva(self, reserva_id: UUID) -> Optional[Reserva]:
+        """
+        Obtener una reserva con sus líneas
+
+        Args:
+            reserva_id: UUID de la reserva
+
+        Returns:
+            Reserva encontrada o None
+        """
+        return self.db.scalar(
+            select(Reserva)
+            .options(selectinload(Reserva.lineas))
+            .where(Reserva.id_reserva == reserva_id)
+        )
+
+    def _bloquear_pendiente(self, reserva_id: UUID) -> Optional[Reserva]:
+        """
+        Bloquear una reserva (``FOR UPDATE``) y comprobar que sigue pendiente
+
+        Raises:
+            EstadoReservaError: Si ya no está pendiente o ha caducado
+        """
+        reserva = self.db.scalar(
+            select(Reserva)
+            .options(selectinload(Reserva.lineas))
+            .where(Reserva.id_reserva == reserva_id)
+            .with_for_update(of=Reserva)
+        )
+        if reserva is None:
+            return None
+        if reserva.estado != PENDIENTE:
+            raise EstadoReservaError(f"La reserva ya está {reserva.estado}")
+        if reserva.expira_en <= datetime.now(timezone.utc):
+            # El barrido de caducadas devolverá el stock
+            raise EstadoReservaError("La reserva ha expirado")
+        return reserva
+
+    def confirmar_reserva(self, reserva_id: UUID) -> Optional[Reserva]:
+        """
+        Confirmar una reserva pendiente: las unidades se dan por vendidas
+
+        Args:
+            reserva_id: UUID de la reserva
+
+        Returns:
+            Reserva confirmada o None si no existe
+
+        Raises:
+            EstadoReservaError: Si ya no está pendiente o ha caducado
+        """
+        reserva = self._bloquear_pendiente(reserva_id)
+        if reserva is None:
+            return None
+        reserva.estado = CONFIRMADA
+        confirmar(self.db)
+        return reserva
+
+    def cancelar_reserva(self, reserva_id: UUID) -> Optional[Reserva]:
+        """
+        Cancelar una reserva pendiente y devolver sus unidades al stock
+
+        Args:
+            reserva_id: UUID de la reserva
+
+        Returns:
+            Reserva cancelada o None si no existe
+
+        Raises:
+            EstadoReservaError: Si ya no está pendiente o ha caducado
+        """
+        reserva = self._bloquear_pendiente(reserva_id)
+        if reserva is None:
+            return None
+        self._devolver_stock([reserva_id])
+        reserva.estado = CANCELADA
+        confirmar(self.db)
+        return reserva
+
+    def liberar_expiradas(self, limite: int = LOTE_EXPIRACION) -> int:
+        """
+        Marcar como expiradas las reservas caducadas y devolver su stock
+
+        Las reservas se toman como una cola con ``FOR UPDATE SKIP LOCKED``:
+        varios procesos pueden barrer a la vez sin esperarse ni procesar la
+        misma reserva, y las que están bloqueadas por una confirmación o
+        cancelación en curso se saltan (si siguen pendientes, las recoge el
+        barrido siguiente).
+
+        Args:
+            limite: Máximo de reservas liberadas en esta llamada
+
+        Returns:
+            Número de reservas liberadas
+        """
+        ids = list(
+            self.db.scalars(
+                select(Reserva.id_reserva)
+                .where(Reserva.estado == PENDIENTE, Reserva.expira_en <= func.now())
+                .order_by(Reserva.expira_en)
+                .limit(limite)
+                .with_for_update(skip_locked=True)
+            )
+        )
+        if not ids:
+            return 0
+        self._devolver_stock(ids)
+        self.db.execute(
+            update(Reserva)
+            .where(filtro_ids(Reserva.id_reserva, ids))
+            .values(estado=EXPIRADA)
+            .execution_options(synchronize_session=False)
+        )
+        confirmar(self.db)
+        return len(ids)
+
+    def _devolver_stock(self, reservas_ids: List[UUID]):
+        """Sumar al stock las unidades de las reservas indicadas"""
+        cantidades = dict(
+            self.db.execute(
+                select(LineaReserva.producto_id, func.sum(LineaReserva.cantidad))
+                .where(filtro_ids(LineaReserva.id_reserva, reservas_ids))
+                .group_by(LineaReserva.producto_id)
+            ).all()
+        )
+        producto_crud = ProductoCRUD(self.db)
+        # Mismo orden de bloqueo que crear_reserva
+        producto_crud.bloquear_stock(cantidades)
+        producto_crud.sumar_stock(
+            {
+                producto_id: int(cantidad)
+                for producto_id, cantidad in cantidades.items()
+            },
+            DEVOLUCION,
+        )
@@ -0,0 +1,36 @@
+"""
+Operaciones CRUD asíncronas para Reserva de stock
+"""
+
+from typing import List, Optional
+from uuid import UUID
+
+from crud.base_async import AsyncCRUDBase
+from crud.reserva_crud import LOTE_EXPIRACION, ReservaCRUD
+from entities.reserva import Reserva
+
+
+class AsyncReservaCRUD(AsyncCRUDBase):
+    crud_class = ReservaCRUD
+
+    async def crear_reserva(
+        self, lineas: List[dict], usuario_id: UUID = None, ttl_segundos: int = None
+    ) -> Reserva:
+        """Reservar el stock de una cesta de productos de forma atómica"""
+        return await self._ejecutar("crear_reserva", lineas, usuario_id, ttl_segundos)
+
+    async def obtener_reserva(self, reserva_id: UUID) -> Optional[Reserva]:
+        """Obtener una reserva con sus líneas"""
+        return await self._ejecutar("obtener_reserva", reserva_id)
+
+    async def confirmar_reserva(self, reserva_id: UUID) -> Optional[Reserva]:
+        """Confirmar una reserva pendiente"""
+        return await self._ejecutar("confirmar_reserva", reserva_id)
+
+    async def cancelar_reserva(self, reserva_id: UUID) -> Optional[Reserva]:
+        """Cancelar una reserva pendiente y devolver sus unidades al stock"""
+        return await self._ejecutar("cancelar_reserva", reserva_id)
+
+    async def liberar_expiradas(self, limite: int = LOTE_EXPIRACION) -> int:
+        """Marcar como expiradas las reservas caducadas y devolver su stock"""
+        return await self._ejecutar("liberar_expiradas", limite)
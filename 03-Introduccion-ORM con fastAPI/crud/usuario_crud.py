@@ -2,14 +2,77 @@
 Operaciones CRUD para Usuario
 """
 
+import os
 import re
+import time
 from typing import List, Optional, Tuple
 from uuid import UUID
 
+from auth.actor import actor_sistema
 from auth.security import PasswordManager
+from cache.bloom import FiltroBloom
+from cache.entidades import cache_entidades
+from crud.cambios import obtener_cambios
+from crud.lotes import filtro_ids, ordenar_por_ids, validar_ids
+from crud.paginacion import ordenar, paginar
+from database.unidad_trabajo import al_terminar, confirmar
+from entities.cambios import SQL_XMIN_SNAPSHOT
 from entities.usuario import Usuario
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+# El hash de la contraseña no se guarda en caché; se carga de la BD si se usa
+EXCLUIDOS_CACHE = frozenset({"contraseña_hash"})
+
+# Nombres de usuario y emails registrados (normalizados) para responder sin
+# consultar la BD a las comprobaciones de disponibilidad. Es local al proceso:
+# las altas de otros workers se añaden al sincronizarlo con el feed de cambios
+# de tbl_usuarios (refrescar_filtro), cada BLOOM_USUARIOS_REFRESCO segundos.
+# La unicidad la garantizan las restricciones UNIQUE de la tabla.
+filtro_identificadores = FiltroBloom(
+    capacidad=int(os.getenv("BLOOM_USUARIOS_CAPACIDAD", "100000")),
+    tasa_falsos_positivos=float(os.getenv("BLOOM_USUARIOS_TASA_FP", "0.01")),
+)
+
+# Segundos entre dos sincronizaciones del filtro con el feed de cambios
+INTERVALO_REFRESCO_FILTRO = float(os.getenv("BLOOM_USUARIOS_REFRESCO", "1"))
+
+# Posición del feed (xmin) desde la que falta leer usuarios y momento
+# (time.monotonic) de la última sincronización; xid es None hasta la precarga
+_sincronizacion = {"xid": None, "instante": 0.0}
+
+
+def _clave_nombre_usuario(nombre_usuario: str) -> str:
+    return "nombre_usuario:" + nombre_usuario.strip().lower()
+
+
+def _clave_email(email: str) -> str:
+    return "email:" + email.strip().lower()
+
+
+def registrar_identificadores(nombre_usuario: str = None, email: str = None):
+    """Añadir al filtro el nombre de usuario y el email de un usuario"""
+    if nombre_usuario:
+        filtro_identificadores.añadir(_clave_nombre_usuario(nombre_usuario))
+    if email:
+        filtro_identificadores.añadir(_clave_email(email))
+
+
+def filtro_sincronizado() -> bool:
+    """
+    Comprobar si el filtro puede responder por sí solo que un valor está libre
+
+    Exige una sincronización reciente (de hace menos de tres intervalos): si
+    la tarea de fondo deja de ejecutarse, las altas de otros workers dejarían
+    de llegar al filtro.
+    """
+    return (
+        _sincronizacion["xid"] is not None
+        and time.monotonic() - _sincronizacion["instante"]
+        < 3 * INTERVALO_REFRESCO_FILTRO
+    )
+
 
 class UsuarioCRUD:
     def __init__(self, db: Session):
@@ -31,6 +94,169 @@ class UsuarioCRUD:
         pattern = r"^[a-zA-Z0-9_]{3,20}$"
         return re.match(pattern, nombre_usuario) is not None
 
+    def _mensaje_integridad(self, error: IntegrityError) -> str:
+        """Traducir una violación de unicidad a un mensaje de validación"""
+        detalle = str(error.orig)
+        if "ix_tbl_usuarios_email_lower" in detalle or "(email)" in detalle:
+            return "El email ya está registrado"
+        if "(nombre_usuario)" in detalle:
+            return "El nombre de usuario ya está registrado"
+        return "Los datos del usuario no son válidos"
+
+    def precargar_filtro(self) -> int:
+        """
+        Reconstruir el filtro de identificadores con todos los usuarios
+
+        Returns:
+            Número de usuarios cargados
+        """
+        instante = time.monotonic()
+        # El xmin se lee antes que los usuarios: todo lo confirmado por
+        # transacciones anteriores a xmin aparece en la consulta siguiente
+        xmin = self.db.scalar(select(literal_column(SQL_XMIN_SNAPSHOT)))
+        filas = self.db.execute(
+            select(Usuario.nombre_usuario, Usuario.email).execution_options(
+                yield_per=1000
+            )
+        )
+        filtro_identificadores.limpiar()
+        total = 0
+        for nombre_usuario, email in filas:
+            registrar_identificadores(nombre_usuario, email)
+            total += 1
+        _sincronizacion.update(xid=xmin, instante=instante)
+        return total
+
+    def refrescar_filtro(self) -> int:
+        """
+        Añadir al filtro los usuarios escritos desde la sincronización anterior
+
+        Lee ``tbl_usuarios`` desde el xmin guardado en la sincronización
+        anterior, con un recorrido por rango del índice ``(xid_cambio, id)``,
+        como el feed de cambios. Las transacciones que seguían abiertas
+        entonces tienen un xid mayor o igual, así que sus altas se leen en
+        esta o en la siguiente sincronización. Sin precarga previa se
+        reconstruye el filtro entero.
+
+        Returns:
+            Número de usuarios leídos
+        """
+        desde = _sincronizacion["xid"]
+        if desde is None:
+            return self.precargar_filtro()
+
+        instante = time.monotonic()
+        xmin = self.db.scalar(select(literal_column(SQL_XMIN_SNAPSHOT)))
+        filas = self.db.execute(
+            select(Usuario.nombre_usuario, Usuario.email).where(
+                Usuario.xid_cambio >= desde
+            )
+        )
+        total = 0
+        for nombre_usuario, email in filas:
+            registrar_identificadores(nombre_usuario, email)
+            total += 1
+        _sincronizacion.update(xid=xmin, instante=instante)
+        return total
+
+    def nombre_usuario_registrado(
+        self, nombre_usuario: str, usar_filtro: bool = True
+    ) -> bool:
+        """
+        Comprobar si un nombre de usuario está registrado
+
+        Si el filtro de identificadores lo descarta no se consulta la BD.
+
+        Args:
+            nombre_usuario: Nombre de usuario
+            usar_filtro: False para consultar siempre la BD
+
+        Returns:
+            True si existe un usuario con ese nombre de usuario
+        """
+        if (
+            usar_filtro
+            and _clave_nombre_usuario(nombre_usuario) not in filtro_identificadores
+        ):
+            return False
+        existe = self.db.scalar(
+            select(
+                select(Usuario.id)
+                .where(Usuario.nombre_usuario == nombre_usuario.lower().strip())
+                .exists()
+            )
+        )
+        if not existe:
+            filtro_identificadores.registrar_falso_positivo()
+        return existe
+
+    def email_registrado(self, email: str, usar_filtro: bool = True) -> bool:
+        """
+        Comprobar si un email está registrado (sin distinguir mayúsculas)
+
+        Si el filtro de identificadores lo descarta no se consulta la BD.
+
+        Args:
+            email: Email
+            usar_filtro: False para consultar siempre la BD
+
+        Returns:
+            True si existe un usuario con ese email
+        """
+        if usar_filtro and _clave_email(email) not in filtro_identificadores:
+            return False
+        existe = self.db.scalar(
+            select(
+                select(Usuario.id)
+                .where(func.lower(Usuario.email) == email.lower().strip())
+                .exists()
+            )
+        )
+        if not existe:
+            filtro_identificadores.registrar_falso_positivo()
+        return existe
+
+    def comprobar_disponibilidad(
+        self, nombre_usuario: str = None, email: str = None
+    ) -> dict:
+        """
+        Comprobar si un nombre de usuario y/o un email están libres
+
+        El filtro de identificadores solo se usa si está sincronizado (ver
+        ``filtro_sincronizado``); si no, se consulta la BD. Aun así, un alta
+        hecha en otro worker puede tardar un intervalo de sincronización en
+        verse, y el alta puede fallar igualmente si otro usuario se registra
+        antes con el mismo valor.
+
+        Args:
+            nombre_usuario: Nombre de usuario a comprobar (opcional)
+            email: Email a comprobar (opcional)
+
+        Returns:
+            Diccionario {campo: disponible} con los campos recibidos
+
+        Raises:
+            ValueError: Si no se recibe ningún campo o alguno no es válido
+        """
+        if nombre_usuario is None and email is None:
+            raise ValueError("Indique un nombre de usuario o un email")
+
+        usar_filtro = filtro_sincronizado()
+        disponibilidad = {}
+        if nombre_usuario is not None:
+            if not self._validar_nombre_usuario(nombre_usuario.strip()):
+                raise ValueError(
+                    "El nombre de usuario debe tener entre 3-20 caracteres y solo contener letras, números y guiones bajos"
+                )
+            disponibilidad["nombre_usuario"] = not self.nombre_usuario_registrado(
+                nombre_usuario, usar_filtro
+            )
+        if email is not None:
+            if not self._validar_email(email.strip()):
+                raise ValueError("Email inválido")
+            disponibilidad["email"] = not self.email_registrado(email, usar_filtro)
+        return disponibilidad
+
     def crear_usuario(
         self,
         nombre: str,
@@ -39,6 +265,7 @@ class UsuarioCRUD:
         contraseña: str,
         telefono: str = None,
         es_admin: bool = False,
+        contraseña_hash: str = None,
     ) -> Usuario:
         """
         Crear un nuevo usuario con validaciones
@@ -50,6 +277,7 @@ class UsuarioCRUD:
             contraseña: Contraseña segura
             telefono: Teléfono opcional (formato internacional)
             es_admin: Si es administrador
+            contraseña_hash: Hash ya calculado de la contraseña (opcional)
 
         Returns:
             Usuario creado
@@ -68,13 +296,13 @@ class UsuarioCRUD:
                 "El nombre de usuario debe tener entre 3-20 caracteres y solo contener letras, números y guiones bajos"
             )
 
-        if self.obtener_usuario_por_nombre_usuario(nombre_usuario):
+        if self.nombre_usuario_registrado(nombre_usuario):
             raise ValueError("El nombre de usuario ya está registrado")
 
         if not email or not self._validar_email(email):
             raise ValueError("Email inválido")
 
-        if self.obtener_usuario_por_email(email):
+        if self.email_registrado(email):
             raise ValueError("El email ya está registrado")
 
         if not contraseña:
@@ -87,7 +315,8 @@ class UsuarioCRUD:
         if telefono and not self._validar_telefono(telefono):
             raise ValueError("Formato de teléfono inválido")
 
-        contraseña_hash = PasswordManager.hash_password(contraseña)
+        if contraseña_hash is None:
+            contraseña_hash = PasswordManager.hash_password(contraseña)
 
         usuario = Usuario(
             nombre=nombre.strip(),
@@ -97,9 +326,17 @@ class UsuarioCRUD:
             telefono=telefono.strip() if telefono else None,
             es_admin=es_admin,
         )
-        self.db.add(usuario)
-        self.db.commit()
-        self.db.refresh(usuario)
+        # La comprobación previa no cubre altas simultáneas ni las hechas en
+        # otro proceso: las restricciones UNIQUE son la garantía final. El
+        # punto de guardado limita el rollback a este INSERT
+        try:
+            with self.db.begin_nested():
+                self.db.add(usuario)
+                self.db.flush()
+        except IntegrityError as e:
+            raise ValueError(self._mensaje_integridad(e)) from e
+        confirmar(self.db, usuario)
+        registrar_identificadores(usuario.nombre_usuario, usuario.email)
         return usuario
 
     def obtener_usuario(self, usuario_id: UUID) -> Optional[Usuario]:
@@ -112,7 +349,64 @@ class UsuarioCRUD:
         Returns:
             Usuario encontrado o None
         """
-        return self.db.query(Usuario).filter(Usuario.id == usuario_id).first()
+        return cache_entidades.obtener(
+            self.db,
+            Usuario,
+            usuario_id,
+            lambda: self.db.query(Usuario).filter(Usuario.id == usuario_id).first(),
+            excluir=EXCLUIDOS_CACHE,
+        )
+
+    def obtener_usuarios_por_ids(
+        self, ids: List[UUID]
+    ) -> Tuple[List[Optional[Usuario]], List[UUID]]:
+        """
+        Obtener varios usuarios por id con una sola consulta
+
+        Args:
+            ids: UUIDs de usuarios (como máximo MAX_IDS_LOTE)
+
+        Returns:
+            Tupla con (usuario o None por cada id, en el orden pedido, e
+            ids no encontrados)
+
+        Raises:
+            ValueError: Si no hay ids o hay demasiados
+        """
+        usuarios = self.db.scalars(
+            select(Usuario).where(filtro_ids(Usuario.id, validar_ids(ids)))
+        ).all()
+        return ordenar_por_ids(usuarios, ids, "id")
+
+    def obtener_cambios(self, desde: str = None, limit: int = 100) -> dict:
+        """
+        Usuarios creados, modificados o eliminados desde un cursor
+
+        Args:
+            desde: Cursor de la respuesta anterior (None: desde el principio)
+            limit: Número máximo de cambios (como máximo MAX_LIMITE)
+
+        Returns:
+            Diccionario con ``cambios``, ``eliminados``, ``cursor`` y ``hay_mas``
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
+        """
+        return obtener_cambios(self.db, Usuario, Usuario.id, desde, limit)
+
+    def obtener_contraseña_hash(self, usuario_id: UUID) -> Optional[str]:
+        """
+        Obtener el hash de la contraseña de un usuario directamente de la BD
+
+        Args:
+            usuario_id: UUID del usuario
+
+        Returns:
+            Hash de la contraseña o None si el usuario no existe
+        """
+        return self.db.scalar(
+            select(Usuario.contraseña_hash).where(Usuario.id == usuario_id)
+        )
 
     def obtener_usuario_por_email(self, email: str) -> Optional[Usuario]:
         """
@@ -126,7 +420,7 @@ class UsuarioCRUD:
         """
         return (
             self.db.query(Usuario)
-            .filter(Usuario.email == email.lower().strip())
+            .filter(func.lower(Usuario.email) == email.lower().strip())
             .first()
         )
 
@@ -148,6 +442,24 @@ class UsuarioCRUD:
             .first()
         )
 
+    def obtener_usuario_para_login(self, identificador: str) -> Optional[Usuario]:
+        """
+        Obtener un usuario activo por nombre de usuario o email
+
+        Args:
+            identificador: Nombre de usuario o email
+
+        Returns:
+            Usuario activo encontrado o None
+        """
+        usuario = self.obtener_usuario_por_nombre_usuario(identificador)
+        if not usuario:
+            usuario = self.obtener_usuario_por_email(identificador)
+
+        if not usuario or not usuario.activo:
+            return None
+        return usuario
+
     def autenticar_usuario(
         self, nombre_usuario: str, contraseña: str
     ) -> Optional[Usuario]:
@@ -161,12 +473,8 @@ class UsuarioCRUD:
         Returns:
             Usuario autenticado o None si las credenciales son inválidas
         """
-        # Buscar por nombre de usuario o email
-        usuario = self.obtener_usuario_por_nombre_usuario(nombre_usuario)
+        usuario = self.obtener_usuario_para_login(nombre_usuario)
         if not usuario:
-            usuario = self.obtener_usuario_por_email(nombre_usuario)
-
-        if not usuario or not usuario.activo:
             return None
 
         if PasswordManager.verify_password(contraseña, usuario.contraseña_hash):
@@ -207,21 +515,52 @@ class UsuarioCRUD:
             raise ValueError(f"Nueva contraseña inválida: {mensaje}")
 
         usuario.contraseña_hash = PasswordManager.hash_password(nueva_contraseña)
-        self.db.commit()
+        confirmar(self.db)
+        al_terminar(self.db, lambda: cache_entidades.invalidar(Usuario, usuario_id))
         return True
 
-    def obtener_usuarios(self, skip: int = 0, limit: int = 100) -> List[Usuario]:
+    def obtener_usuarios(
+        self, skip: int = 0, limit: int = 100, cursor: str = None
+    ) -> List[Usuario]:
         """
         Obtener lista de usuarios con paginación
 
         Args:
             skip: Número de registros a omitir
-            limit: Límite de registros a retornar
+            limit: Límite de registros a retornar (como máximo MAX_LIMITE)
+            cursor: Cursor de la página anterior (paginación keyset)
+
+        Returns:
+            Lista de usuarios ordenada por (fecha_creacion, id)
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
+        """
+        return paginar(
+            self.db.query(Usuario),
+            Usuario.fecha_creacion,
+            Usuario.id,
+            skip,
+            limit,
+            cursor,
+        ).all()
+
+    def consulta_usuarios(self, solo_admin: bool = False):
+        """
+        Consulta completa (sin paginar) de usuarios
+
+        No se ejecuta: la API la recorre en streaming por lotes.
+
+        Args:
+            solo_admin: Incluir solo administradores
 
         Returns:
-            Lista de usuarios
+            Consulta ordenada por (fecha_creacion, id)
         """
-        return self.db.query(Usuario).offset(skip).limit(limit).all()
+        query = self.db.query(Usuario)
+        if solo_admin:
+            query = query.filter(Usuario.es_admin == True)
+        return ordenar(query, Usuario.fecha_creacion, Usuario.id)
 
     def actualizar_usuario(self, usuario_id: UUID, **kwargs) -> Optional[Usuario]:
         """
@@ -232,24 +571,15 @@ class UsuarioCRUD:
             **kwargs: Campos a actualizar
 
         Returns:
-            Usuario actualizado o None
+            Usuario actualizado o None si no existe
 
         Raises:
             ValueError: Si los datos no son válidos
         """
-        usuario = self.obtener_usuario(usuario_id)
-        if not usuario:
-            return None
-
         if "email" in kwargs:
             email = kwargs["email"]
             if not self._validar_email(email):
                 raise ValueError("Email inválido")
-            if (
-                self.obtener_usuario_por_email(email)
-                and self.obtener_usuario_por_email(email).id != usuario_id
-            ):
-                raise ValueError("El email ya está registrado")
             kwargs["email"] = email.lower().strip()
 
         if "telefono" in kwargs and kwargs["telefono"]:
@@ -271,12 +601,6 @@ class UsuarioCRUD:
                 raise ValueError(
                     "El nombre de usuario debe tener entre 3-20 caracteres y solo contener letras, números y guiones bajos"
                 )
-            if (
-                self.obtener_usuario_por_nombre_usuario(nombre_usuario)
-                and self.obtener_usuario_por_nombre_usuario(nombre_usuario).id
-                != usuario_id
-            ):
-                raise ValueError("El nombre de usuario ya está registrado")
             kwargs["nombre_usuario"] = nombre_usuario.strip().lower()
 
         if "contraseña" in kwargs:
@@ -287,11 +611,32 @@ class UsuarioCRUD:
             kwargs["contraseña_hash"] = PasswordManager.hash_password(contraseña)
             del kwargs["contraseña"]  # Eliminar la contraseña en texto plano
 
-        for key, value in kwargs.items():
-            if hasattr(usuario, key):
-                setattr(usuario, key, value)
-        self.db.commit()
-        self.db.refresh(usuario)
+        valores = {
+            key: value for key, value in kwargs.items() if key in Usuario.__table__.c
+        }
+
+        # La unicidad de email y nombre de usuario la garantizan las
+        # restricciones UNIQUE: un único UPDATE ... RETURNING sustituye a las
+        # búsquedas previas, el SELECT de existencia y el refresh.
+        try:
+            with self.db.begin_nested():
+                usuario = self.db.scalars(
+                    update(Usuario)
+                    .where(Usuario.id == usuario_id)
+                    .values(**valores)
+                    .returning(Usuario)
+                ).first()
+        except IntegrityError as e:
+            raise ValueError(self._mensaje_integridad(e)) from e
+
+        if usuario is None:
+            return None
+
+        confirmar(self.db)
+        al_terminar(self.db, lambda: cache_entidades.invalidar(Usuario, usuario_id))
+        registrar_identificadores(valores.get("nombre_usuario"), valores.get("email"))
+        if "es_admin" in valores or "activo" in valores:
+            al_terminar(self.db, lambda: actor_sistema.invalidar(usuario_id))
         return usuario
 
     def eliminar_usuario(self, usuario_id: UUID) -> bool:
@@ -304,10 +649,13 @@ class UsuarioCRUD:
         Returns:
             True si se eliminó, False si no existe
         """
-        usuario = self.obtener_usuario(usuario_id)
+        # Se consulta la BD y no la caché antes de eliminar
+        usuario = self.db.query(Usuario).filter(Usuario.id == usuario_id).first()
         if usuario:
             self.db.delete(usuario)
-            self.db.commit()
+            confirmar(self.db)
+            al_terminar(self.db, lambda: cache_entidades.invalidar(Usuario, usuario_id))
+            al_terminar(self.db, lambda: actor_sistema.invalidar(usuario_id))
             return True
         return False
 
@@ -323,14 +671,30 @@ class UsuarioCRUD:
         """
         return self.actualizar_usuario(usuario_id, activo=False)
 
-    def obtener_usuarios_admin(self) -> List[Usuario]:
+    def obtener_usuarios_admin(
+        self, limit: int = 100, cursor: str = None
+    ) -> List[Usuario]:
         """
-        Obtener todos los usuarios administradores
+        Obtener los usuarios administradores con paginación
+
+        Args:
+            limit: Límite de registros a retornar (como máximo MAX_LIMITE)
+            cursor: Cursor de la página anterior (paginación keyset)
 
         Returns:
-            Lista de usuarios administradores
+            Lista de administradores ordenada por (fecha_creacion, id)
+
+        Raises:
+            ValueError: Si el límite o el cursor no son válidos
         """
-        return self.db.query(Usuario).filter(Usuario.es_admin == True).all()
+        return paginar(
+            self.db.query(Usuario).filter(Usuario.es_admin == True),
+            Usuario.fecha_creacion,
+            Usuario.id,
+            0,
+            limit,
+            cursor,
+        ).all()
 
     def es_admin(self, usuario_id: UUID) -> bool:
         """
@@ -354,6 +718,9 @@ class UsuarioCRUD:
         """
         return (
             self.db.query(Usuario)
-            .filter(Usuario.email == "admin@system.com", Usuario.es_admin == True)
+            .filter(
+                func.lower(Usuario.email) == "admin@system.com",
+                Usuario.es_admin == True,
+            )
             .first()
         )
@@ -0,0 +1,178 @@
+"""
+Operaciones CRUD asíncronas para Usuario
+"""
+
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from auth.security import PasswordManager, password_hasher
+from crud.base_async import AsyncCRUDBase
+from crud.usuario_crud import UsuarioCRUD
+from entities.usuario import Usuario
+from sqlalchemy import Select
+
+
+class AsyncUsuarioCRUD(AsyncCRUDBase):
+    """
+    Variante asíncrona de UsuarioCRUD.
+
+    El hash y la verificación de contraseñas se hacen con ``password_hasher``
+    fuera de ``run_sync``, para que PBKDF2 no se ejecute en el event loop.
+    """
+
+    crud_class = UsuarioCRUD
+
+    async def crear_usuario(
+        self,
+        nombre: str,
+        nombre_usuario: str,
+        email: str,
+        contraseña: str,
+        telefono: str = None,
+        es_admin: bool = False,
+    ) -> Usuario:
+        """Crear un nuevo usuario con validaciones"""
+        contraseña_hash = None
+        if contraseña and PasswordManager.validate_password_strength(contraseña)[0]:
+            contraseña_hash = await password_hasher.hash_password(contraseña)
+
+        return await self._ejecutar(
+            "crear_usuario",
+            nombre=nombre,
+            nombre_usuario=nombre_usuario,
+            email=email,
+            contraseña=contraseña,
+            telefono=telefono,
+            es_admin=es_admin,
+            contraseña_hash=contraseña_hash,
+        )
+
+    async def precargar_filtro(self) -> int:
+        """Reconstruir el filtro de identificadores con todos los usuarios"""
+        return await self._ejecutar("precargar_filtro")
+
+    async def refrescar_filtro(self) -> int:
+        """Añadir al filtro los usuarios escritos desde la sincronización anterior"""
+        return await self._ejecutar("refrescar_filtro")
+
+    async def comprobar_disponibilidad(
+        self, nombre_usuario: str = None, email: str = None
+    ) -> dict:
+        """Comprobar si un nombre de usuario y/o un email están libres"""
+        return await self._ejecutar(
+            "comprobar_disponibilidad", nombre_usuario=nombre_usuario, email=email
+        )
+
+    async def obtener_usuario(self, usuario_id: UUID) -> Optional[Usuario]:
+        """Obtener un usuario por ID"""
+        return await self._ejecutar("obtener_usuario", usuario_id)
+
+    async def obtener_usuarios_por_ids(
+        self, ids: List[UUID]
+    ) -> Tuple[List[Optional[Usuario]], List[UUID]]:
+        """Obtener varios usuarios por id con una sola consulta"""
+        return await self._ejecutar("obtener_usuarios_por_ids", ids)
+
+    async def obtener_cambios(self, desde: str = None, limit: int = 100) -> dict:
+        """Usuarios creados, modificados o eliminados desde un cursor"""
+        return await self._ejecutar("obtener_cambios", desde, limit)
+
+    async def obtener_contraseña_hash(self, usuario_id: UUID) -> Optional[str]:
+        """Obtener el hash de la contraseña de un usuario directamente de la BD"""
+        return await self._ejecutar("obtener_contraseña_hash", usuario_id)
+
+    async def obtener_usuario_por_email(self, email: str) -> Optional[Usuario]:
+        """Obtener un usuario por email"""
+        return await self._ejecutar("obtener_usuario_por_email", email)
+
+    async def obtener_usuario_por_nombre_usuario(
+        self, nombre_usuario: str
+    ) -> Optional[Usuario]:
+        """Obtener un usuario por nombre de usuario"""
+        return await self._ejecutar(
+            "obtener_usuario_por_nombre_usuario", nombre_usuario
+        )
+
+    async def autenticar_usuario(
+        self, nombre_usuario: str, contraseña: str
+    ) -> Optional[Usuario]:
+        """Autenticar un usuario con nombre de usuario y contraseña"""
+        usuario = await self._ejecutar("obtener_usuario_para_login", nombre_usuario)
+        if not usuario:
+            return None
+
+        if await password_hasher.verify_password(contraseña, usuario.contraseña_hash):
+            return usuario
+
+        return None
+
+    async def cambiar_contraseña(
+        self, usuario_id: UUID, contraseña_actual: str, nueva_contraseña: str
+    ) -> bool:
+        """Cambiar la contraseña de un usuario"""
+        # El hash no se guarda en la caché de usuarios: se lee de la BD
+        contraseña_hash = await self.obtener_contraseña_hash(usuario_id)
+        if contraseña_hash is None:
+            return False
+
+        if not await password_hasher.verify_password(
+            contraseña_actual, contraseña_hash
+        ):
+            raise ValueError("La contraseña actual es incorrecta")
+
+        es_valida, mensaje = PasswordManager.validate_password_strength(
+            nueva_contraseña
+        )
+        if not es_valida:
+            raise ValueError(f"Nueva contraseña inválida: {mensaje}")
+
+        contraseña_hash = await password_hasher.hash_password(nueva_contraseña)
+        usuario = await self.actualizar_usuario(
+            usuario_id, contraseña_hash=contraseña_hash
+        )
+        return usuario is not None
+
+    async def obtener_usuarios(
+        self, skip: int = 0, limit: int = 100, cursor: str = None
+    ) -> List[Usuario]:
+        """Obtener lista de usuarios con paginación"""
+        return await self._ejecutar(
+            "obtener_usuarios", skip=skip, limit=limit, cursor=cursor
+        )
+
+    async def actualizar_usuario(self, usuario_id: UUID, **kwargs) -> Optional[Usuario]:
+        """Actualizar un usuario con validaciones"""
+        if "contraseña" in kwargs:
+            contraseña = kwargs.pop("contraseña")
+            es_valida, mensaje = PasswordManager.validate_password_strength(contraseña)
+            if not es_valida:
+                raise ValueError(f"Contraseña inválida: {mensaje}")
+            kwargs["contraseña_hash"] = await password_hasher.hash_password(contraseña)
+
+        return await self._ejecutar("actualizar_usuario", usuario_id, **kwargs)
+
+    async def eliminar_usuario(self, usuario_id: UUID) -> bool:
+        """Eliminar un usuario"""
+        return await self._ejecutar("eliminar_usuario", usuario_id)
+
+    async def desactivar_usuario(self, usuario_id: UUID) -> Optional[Usuario]:
+        """Desactivar un usuario (soft delete)"""
+        return await self._ejecutar("desactivar_usuario", usuario_id)
+
+    def consulta_usuarios(self, solo_admin: bool = False) -> Select:
+        """Consulta completa (sin paginar) de usuarios, sin ejecutar"""
+        return self._consulta("consulta_usuarios", solo_admin)
+
+    async def obtener_usuarios_admin(
+        self, limit: int = 100, cursor: str = None
+    ) -> List[Usuario]:
+        """Obtener los usuarios administradores con paginación"""
+        return await self._ejecutar("obtener_usuarios_admin", limit, cursor)
+
+    async def es_admin(self, usuario_id: UUID) -> bool:
+        """Verificar si un usuario es administrador"""
+        return await self._ejecutar("es_admin", usuario_id)
+
+    async def obtener_admin_por_defecto(self) -> Optional[Usuario]:
+        """Obtener el usuario administrador por defecto"""
+        return await self._ejecutar("obtener_admin_por_defecto")
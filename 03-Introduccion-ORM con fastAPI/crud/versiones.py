@@ -0,0 +1,62 @@
+"""
+Control de concurrencia optimista con la columna ``version``
+"""
+
+from typing import Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+
+class VersionObsoletaError(ValueError):
+    """El registro cambió después de que el cliente leyera su versión"""
+
+    def __init__(self, version_actual: int):
+        super().__init__(
+            "El registro ha cambiado desde que se leyó "
+            f"(versión actual: {version_actual})"
+        )
+        self.version_actual = version_actual
+
+
+def condiciones_version(modelo, versiones: Optional[Sequence[int]]) -> list:
+    """
+    Condiciones de un UPDATE condicionado a la versión leída
+
+    Args:
+        modelo: Clase del modelo (con columna ``version``)
+        versiones: Versiones aceptadas (las de If-Match) o None si la
+            escritura no es condicional
+
+    Returns:
+        Lista de condiciones para ``where`` (vacía si no hay condición)
+    """
+    if versiones is None:
+        return []
+    return [modelo.version.in_(versiones)]
+
+
+def comprobar_conflicto(
+    db: Session, columna_id, entidad_id, versiones: Optional[Sequence[int]]
+):
+    """
+    Distinguir "no existe" de "otra versión" tras un UPDATE sin filas
+
+    Solo se consulta la BD en el caso de fallo de una escritura condicional.
+
+    Args:
+        db: Sesión de base de datos
+        columna_id: Columna de clave primaria del modelo
+        entidad_id: Id del registro
+        versiones: Versiones aceptadas en el UPDATE (None si no era condicional)
+
+    Raises:
+        VersionObsoletaError: Si el registro existe con otra versión
+    """
+    if versiones is None:
+        return
+    version_actual = db.scalar(
+        select(columna_id.class_.version).where(columna_id == entidad_id)
+    )
+    if version_actual is not None:
+        raise VersionObsoletaError(version_actual)
@@ -4,8 +4,12 @@ Configuración de la base de datos PostgreSQL con Neon
 
 import os
 
+from database.unidad_trabajo import iniciar_unidad_de_trabajo
 from dotenv import load_dotenv
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -31,6 +35,38 @@ engine = create_engine(
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _url_asincrona(url: str):
+    """
+    Convertir la URL síncrona (psycopg2) en una URL para asyncpg.
+
+    asyncpg no entiende los parámetros libpq ``sslmode`` ni ``channel_binding``
+    que incluye la cadena de conexión de Neon, así que se eliminan y el SSL se
+    configura mediante ``connect_args``.
+    """
+    url_async = make_url(url).set(drivername="postgresql+asyncpg")
+    return url_async.difference_update_query(["sslmode", "channel_binding"])
+
+
+# Crear el motor asíncrono (asyncpg) para los endpoints de FastAPI
+async_engine = create_async_engine(
+    _url_asincrona(DATABASE_URL),
+    echo=False,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    connect_args={"ssl": "require"},
+)
+
+# Crear la sesión asíncrona
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,  # Los objetos se serializan después del commit
+)
+
 # Base para los modelos
 Base = declarative_base()
 
@@ -46,6 +82,21 @@ def get_db():
         db.close()
 
 
+async def get_async_db(request: Request):
+    """
+    Generador de sesiones asíncronas de base de datos para FastAPI
+
+    La sesión es la unidad de trabajo de la petición: las clases CRUD solo
+    hacen flush y la ruta (``apis.transaccion.RutaTransaccional``) confirma
+    una vez antes de responder. Si la petición falla, al cerrar la sesión se
+    deshace todo lo escrito.
+    """
+    async with AsyncSessionLocal() as db:
+        iniciar_unidad_de_trabajo(db.sync_session)
+        request.state.db = db
+        yield db
+
+
 def create_tables():
     """
     Crear todas las tablas definidas en los modelos
@@ -0,0 +1,86 @@
+"""
+Unidad de trabajo por petición: un único commit al final de cada petición
+"""
+
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+# Claves de Session.info que usa la unidad de trabajo
+_UNIDAD_DE_TRABAJO = "unidad_de_trabajo"
+_CAMBIOS_PENDIENTES = "cambios_pendientes"
+_AL_TERMINAR = "al_terminar"
+
+
+def iniciar_unidad_de_trabajo(db: Session):
+    """
+    Marcar la sesión como unidad de trabajo de una petición
+
+    A partir de aquí ``confirmar`` solo hace flush y quien abrió la sesión
+    (la ruta, ver ``apis.transaccion``) confirma una vez al terminar.
+    """
+    db.info[_UNIDAD_DE_TRABAJO] = True
+
+
+def en_unidad_de_trabajo(db: Session) -> bool:
+    """Comprobar si la sesión la confirma quien la abrió y no las clases CRUD"""
+    return db.info.get(_UNIDAD_DE_TRABAJO, False)
+
+
+def confirmar(db: Session, *refrescar):
+    """
+    Enviar los cambios de una operación CRUD
+
+    Dentro de una unidad de trabajo solo se hace flush: los cambios viajan a
+    la BD (y los errores de restricciones saltan aquí), pero el commit queda
+    para el final de la petición. Fuera de ella (scripts, sesiones sueltas)
+    se confirma en el acto, como hasta ahora.
+
+    Args:
+        db: Sesión de base de datos
+        *refrescar: Entidades que se recargan tras el commit. Dentro de una
+            unidad de trabajo no hace falta: el INSERT devuelve los valores
+            por defecto del servidor con RETURNING
+    """
+    if en_unidad_de_trabajo(db):
+        db.flush()
+        db.info[_CAMBIOS_PENDIENTES] = True
+        return
+    db.commit()
+    for entidad in refrescar:
+        db.refresh(entidad)
+
+
+def tiene_cambios_pendientes(db: Session) -> bool:
+    """Comprobar si la transacción de la petición tiene escrituras sin confirmar"""
+    return db.info.get(_CAMBIOS_PENDIENTES, False)
+
+
+def al_terminar(db: Session, accion: Callable[[], None]):
+    """
+    Ejecutar una acción ahora y otra vez cuando termine la transacción
+
+    Pensado para invalidar cachés de proceso: la invalidación inmediata hace
+    que el resto de la petición no lea datos viejos, y la del final (tras el
+    commit o el rollback) descarta lo que otra petición haya cacheado
+    mientras la transacción seguía abierta.
+
+    Args:
+        db: Sesión de base de datos
+        accion: Función sin argumentos
+    """
+    accion()
+    if db.in_transaction():
+        db.info.setdefault(_AL_TERMINAR, []).append(accion)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _terminar_transaccion(db: Session, transaccion: SessionTransaction):
+    """Ejecutar las acciones pendientes al cerrar la transacción principal"""
+    if transaccion.parent is not None:
+        # Un punto de guardado (begin_nested) no termina la unidad de trabajo
+        return
+    db.info.pop(_CAMBIOS_PENDIENTES, None)
+    for accion in db.info.pop(_AL_TERMINAR, ()):
+        accion()
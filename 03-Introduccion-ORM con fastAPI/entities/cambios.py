@@ -0,0 +1,91 @@
+from database.config import Base
+from sqlalchemy import BigInteger, Column, DateTime, String, event, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+# Transacción que escribe la fila (xid de 64 bits, creciente). A diferencia de
+# fecha_edicion (hora de inicio de la transacción) o de una secuencia, permite
+# saber qué cambios ya no pueden aparecer por detrás del cursor: toda
+# transacción con xid menor que el xmin de la foto actual ha terminado.
+SQL_XID_ACTUAL = "pg_current_xact_id()::text::bigint"
+SQL_XMIN_SNAPSHOT = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+# Tablas con feed de cambios y su columna de clave primaria
+TABLAS_CAMBIOS = {
+    "productos": "id_producto",
+    "categorias": "id_categoria",
+    "tbl_usuarios": "id",
+}
+
+# Las inserciones toman xid_cambio del valor por defecto de la columna; las
+# actualizaciones lo renuevan con un trigger BEFORE, también las que no pasan
+# por las clases CRUD
+SQL_FUNCION_XID = f"""
+CREATE OR REPLACE FUNCTION marcar_xid_cambio() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.xid_cambio := {SQL_XID_ACTUAL};
+    RETURN NEW;
+END
+$$
+"""
+
+# Una lápida por fila eliminada, con un único INSERT ... SELECT por sentencia
+# (tabla de transición), así que los borrados en cascada también se registran
+SQL_FUNCION_ELIMINACIONES = f"""
+CREATE OR REPLACE FUNCTION registrar_eliminaciones() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format(
+        'INSERT INTO eliminaciones (tabla, xid_cambio, id_registro) '
+        'SELECT %L, {SQL_XID_ACTUAL}, %I FROM viejas',
+        TG_TABLE_NAME, TG_ARGV[0]
+    );
+    RETURN NULL;
+END
+$$
+"""
+
+
+def sql_triggers_cambios(tabla: str, columna_id: str) -> list:
+    """Sentencias que (re)crean los triggers del feed de cambios de ``tabla``"""
+    return [
+        f"DROP TRIGGER IF EXISTS tr_{tabla}_xid_cambio ON {tabla}",
+        f"CREATE TRIGGER tr_{tabla}_xid_cambio BEFORE UPDATE ON {tabla} "
+        "FOR EACH ROW EXECUTE FUNCTION marcar_xid_cambio()",
+        f"DROP TRIGGER IF EXISTS tr_{tabla}_eliminaciones ON {tabla}",
+        f"CREATE TRIGGER tr_{tabla}_eliminaciones AFTER DELETE ON {tabla} "
+        "REFERENCING OLD TABLE AS viejas FOR EACH STATEMENT "
+        f"EXECUTE FUNCTION registrar_eliminaciones('{columna_id}')",
+    ]
+
+
+class Eliminacion(Base):
+    """
+    Modelo de lápida: registro eliminado de una tabla con feed de cambios
+
+    La clave primaria (tabla, xid_cambio, id_registro) es también el orden
+    en que se leen desde un cursor.
+    """
+
+    __tablename__ = "eliminaciones"
+
+    tabla = Column(String(50), primary_key=True)
+    xid_cambio = Column(BigInteger, primary_key=True)
+    id_registro = Column(UUID(as_uuid=True), primary_key=True)
+    fecha = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<Eliminacion(tabla='{self.tabla}', id_registro={self.id_registro})>"
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _crear_triggers_cambios(target, connection, tables=(), **kw):
+    """Con create_all: funciones y triggers del feed de cambios"""
+    if Eliminacion.__table__ not in tables:
+        return
+    connection.execute(text(SQL_FUNCION_XID))
+    connection.execute(text(SQL_FUNCION_ELIMINACIONES))
+    for tabla, columna_id in TABLAS_CAMBIOS.items():
+        for sentencia in sql_triggers_cambios(tabla, columna_id):
+            connection.execute(text(sentencia))
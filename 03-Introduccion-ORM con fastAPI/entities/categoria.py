@@ -1,7 +1,18 @@
 import uuid
 
 from database.config import Base
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text
+from entities.cambios import SQL_XID_ACTUAL
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -12,13 +23,16 @@ class Categoria(Base):
 
     __tablename__ = "categorias"
 
-    id_categoria = Column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
-    )
+    id_categoria = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre = Column(String(100), nullable=False, unique=True)
     descripcion = Column(Text, nullable=True)
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     fecha_edicion = Column(DateTime(timezone=True), onupdate=func.now())
+    # Control de concurrencia optimista (ver Producto.version)
+    version = Column(Integer, nullable=False, server_default="1")
+    # Transacción de la última escritura, para el feed de cambios (ver
+    # entities/cambios.py); en las actualizaciones la renueva un trigger
+    xid_cambio = Column(BigInteger, nullable=False, server_default=text(SQL_XID_ACTUAL))
 
     id_usuario_crea = Column(
         UUID(as_uuid=True), ForeignKey("tbl_usuarios.id"), nullable=False
@@ -27,6 +41,26 @@ class Categoria(Base):
         UUID(as_uuid=True), ForeignKey("tbl_usuarios.id"), nullable=True
     )
 
+    # Clave estable para la paginación keyset (fecha_creacion, id_categoria)
+    __table_args__ = (
+        Index(
+            "ix_categorias_fecha_creacion_id_categoria",
+            "fecha_creacion",
+            "id_categoria",
+        ),
+        # Claves foráneas de auditoría (comprobadas al eliminar usuarios)
+        Index("ix_categorias_id_usuario_crea", "id_usuario_crea"),
+        Index(
+            "ix_categorias_id_usuario_edita",
+            "id_usuario_edita",
+            postgresql_where=id_usuario_edita.isnot(None),
+        ),
+        # Feed de cambios: recorrido por rango desde el cursor
+        Index("ix_categorias_xid_cambio_id_categoria", "xid_cambio", "id_categoria"),
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
     productos = relationship("Producto", back_populates="categoria")
 
     def __repr__(self):
@@ -0,0 +1,223 @@
+from datetime import date, datetime, time, timezone
+from typing import Tuple
+
+from database.config import Base
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Identity,
+    Index,
+    Integer,
+    String,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+# Motivos de un movimiento. Los triggers de productos usan alta/ajuste/baja
+# salvo que la transacción fije otro con ``SET LOCAL inventario.motivo``
+ALTA = "alta"
+AJUSTE = "ajuste"
+BAJA = "baja"
+APERTURA = "apertura"
+RESERVA = "reserva"
+DEVOLUCION = "devolucion"
+
+# Un único INSERT ... SELECT por sentencia sobre productos: los triggers son
+# FOR EACH STATEMENT con tablas de transición, así que un INSERT de 5 000
+# productos o el UPDATE ... FROM unnest() de una cesta escriben todos sus
+# movimientos de una vez. La base de datos registra cualquier cambio de stock,
+# también los que no pasan por las clases CRUD.
+SQL_FUNCION_MOVIMIENTOS = """
+CREATE OR REPLACE FUNCTION registrar_movimientos_inventario() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    motivo text := NULLIF(current_setting('inventario.motivo', true), '');
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO movimientos_inventario
+            (producto_id, delta, stock_resultante, motivo)
+        SELECT id_producto, stock, stock, COALESCE(motivo, 'alta')
+        FROM nuevas
+        WHERE COALESCE(stock, 0) <> 0;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO movimientos_inventario
+            (producto_id, delta, stock_resultante, motivo)
+        SELECT n.id_producto,
+               COALESCE(n.stock, 0) - COALESCE(v.stock, 0),
+               COALESCE(n.stock, 0),
+               COALESCE(motivo, 'ajuste')
+        FROM nuevas n
+        JOIN viejas v USING (id_producto)
+        WHERE n.stock IS DISTINCT FROM v.stock;
+    ELSE
+        INSERT INTO movimientos_inventario
+            (producto_id, delta, stock_resultante, motivo)
+        SELECT id_producto, -stock, 0, COALESCE(motivo, 'baja')
+        FROM viejas
+        WHERE COALESCE(stock, 0) <> 0;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+SQL_TRIGGERS_MOVIMIENTOS = [
+    "DROP TRIGGER IF EXISTS tr_productos_movimientos_alta ON productos",
+    "CREATE TRIGGER tr_productos_movimientos_alta AFTER INSERT ON productos "
+    "REFERENCING NEW TABLE AS nuevas FOR EACH STATEMENT "
+    "EXECUTE FUNCTION registrar_movimientos_inventario()",
+    "DROP TRIGGER IF EXISTS tr_productos_movimientos_ajuste ON productos",
+    "CREATE TRIGGER tr_productos_movimientos_ajuste AFTER UPDATE ON productos "
+    "REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas FOR EACH STATEMENT "
+    "EXECUTE FUNCTION registrar_movimientos_inventario()",
+    "DROP TRIGGER IF EXISTS tr_productos_movimientos_baja ON productos",
+    "CREATE TRIGGER tr_productos_movimientos_baja AFTER DELETE ON productos "
+    "REFERENCING OLD TABLE AS viejas FOR EACH STATEMENT "
+    "EXECUTE FUNCTION registrar_movimientos_inventario()",
+]
+
+# El kardex es de solo inserción: UPDATE, DELETE y TRUNCATE fallan aunque los
+# lance el propietario de la tabla. El trigger de fila se clona en cada
+# partición, también en las que se creen después.
+SQL_FUNCION_SOLO_INSERCION = """
+CREATE OR REPLACE FUNCTION impedir_cambios_movimientos() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    RAISE EXCEPTION 'movimientos_inventario es de solo inserción (% no permitido)',
+        TG_OP USING ERRCODE = 'insufficient_privilege';
+END
+$$
+"""
+
+SQL_TRIGGERS_SOLO_INSERCION = [
+    "DROP TRIGGER IF EXISTS tr_movimientos_solo_insercion ON movimientos_inventario",
+    "CREATE TRIGGER tr_movimientos_solo_insercion "
+    "BEFORE UPDATE OR DELETE ON movimientos_inventario "
+    "FOR EACH ROW EXECUTE FUNCTION impedir_cambios_movimientos()",
+    "DROP TRIGGER IF EXISTS tr_movimientos_sin_truncate ON movimientos_inventario",
+    "CREATE TRIGGER tr_movimientos_sin_truncate "
+    "BEFORE TRUNCATE ON movimientos_inventario "
+    "FOR EACH STATEMENT EXECUTE FUNCTION impedir_cambios_movimientos()",
+]
+
+
+class MovimientoInventario(Base):
+    """
+    Modelo de movimiento de inventario (kardex)
+
+    Tabla de solo inserción (un trigger rechaza UPDATE, DELETE y TRUNCATE),
+    particionada por mes de ``fecha``. No tiene clave foránea a productos:
+    el historial se conserva al eliminarlos.
+    """
+
+    __tablename__ = "movimientos_inventario"
+
+    id_movimiento = Column(BigInteger, Identity(), primary_key=True)
+    # La clave de partición forma parte de la clave primaria
+    fecha = Column(
+        DateTime(timezone=True),
+        primary_key=True,
+        nullable=False,
+        server_default=func.now(),
+    )
+    producto_id = Column(UUID(as_uuid=True), nullable=False)
+    delta = Column(Integer, nullable=False)
+    stock_resultante = Column(Integer, nullable=False)
+    motivo = Column(String(20), nullable=False)
+
+    __table_args__ = (
+        # BRIN: las filas llegan en orden de fecha, así que el índice ocupa
+        # unas pocas páginas y apenas encarece las inserciones
+        Index(
+            "ix_movimientos_inventario_fecha",
+            "fecha",
+            postgresql_using="brin",
+        ),
+        {"postgresql_partition_by": "RANGE (fecha)"},
+    )
+
+    def __repr__(self):
+        return (
+            f"<MovimientoInventario(producto={self.producto_id}, "
+            f"delta={self.delta}, motivo='{self.motivo}')>"
+        )
+
+
+class SnapshotInventario(Base):
+    """
+    Modelo de foto periódica del stock de todos los productos
+
+    Cada foto guarda, con la misma ``fecha``, una fila por producto con stock
+    distinto de 0; un producto que no aparece tenía stock 0 en esa fecha.
+    """
+
+    __tablename__ = "inventario_snapshots"
+
+    fecha = Column(DateTime(timezone=True), primary_key=True)
+    producto_id = Column(UUID(as_uuid=True), primary_key=True)
+    stock = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<SnapshotInventario(fecha={self.fecha}, "
+            f"producto={self.producto_id}, stock={self.stock})>"
+        )
+
+
+def mes_siguiente(mes: date) -> date:
+    """Primer día del mes siguiente a ``mes``"""
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def nombre_particion(mes: date) -> str:
+    """Nombre de la partición mensual que contiene ``mes``"""
+    return f"movimientos_inventario_{mes:%Y_%m}"
+
+
+def limites_particion(mes: date) -> Tuple[datetime, datetime]:
+    """Inicio (incluido) y fin (excluido) en UTC del mes que contiene ``mes``"""
+    inicio = mes.replace(day=1)
+    return (
+        datetime(inicio.year, inicio.month, 1, tzinfo=timezone.utc),
+        datetime.combine(mes_siguiente(inicio), time(), tzinfo=timezone.utc),
+    )
+
+
+def sql_particion(mes: date) -> str:
+    """``CREATE TABLE`` de la partición mensual que contiene ``mes``"""
+    inicio, fin = limites_particion(mes)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {nombre_particion(mes)} "
+        "PARTITION OF movimientos_inventario "
+        f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{fin.isoformat()}')"
+    )
+
+
+# Partición para las filas de meses sin partición propia: un movimiento nunca
+# se pierde aunque el mantenimiento se retrase
+PARTICION_DEFECTO = "movimientos_inventario_defecto"
+
+SQL_PARTICION_DEFECTO = (
+    f"CREATE TABLE IF NOT EXISTS {PARTICION_DEFECTO} "
+    "PARTITION OF movimientos_inventario DEFAULT"
+)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _crear_triggers_inventario(target, connection, tables=(), **kw):
+    """Con create_all: particiones iniciales y triggers del kardex"""
+    if MovimientoInventario.__table__ not in tables:
+        return
+    hoy = datetime.now(timezone.utc).date()
+    connection.execute(text(SQL_PARTICION_DEFECTO))
+    connection.execute(text(sql_particion(hoy)))
+    connection.execute(text(sql_particion(mes_siguiente(hoy))))
+    connection.execute(text(SQL_FUNCION_MOVIMIENTOS))
+    for sentencia in SQL_TRIGGERS_MOVIMIENTOS:
+        connection.execute(text(sentencia))
+    connection.execute(text(SQL_FUNCION_SOLO_INSERCION))
+    for sentencia in SQL_TRIGGERS_SOLO_INSERCION:
+        connection.execute(text(sentencia))
@@ -1,26 +1,62 @@
 import uuid
 
 from database.config import Base
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Numeric, String, Text
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from entities.cambios import SQL_XID_ACTUAL
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
+# Vocales acentuadas y ñ que se sustituyen para que la búsqueda no distinga
+# acentos. translate() es IMMUTABLE, a diferencia de unaccent(), así que puede
+# usarse en una columna generada sin extensiones adicionales.
+ACENTUADAS = "áéíóúüñàèìòùÁÉÍÓÚÜÑÀÈÌÒÙ"
+SIN_ACENTO = "aeiouunaeiouAEIOUUNAEIOU"
+
+# Documento de búsqueda: el nombre pesa más (A) que la descripción (B)
+SQL_DOCUMENTO_BUSQUEDA = (
+    "setweight(to_tsvector('spanish'::regconfig, "
+    f"translate(coalesce(nombre, ''), '{ACENTUADAS}', '{SIN_ACENTO}')), 'A') || "
+    "setweight(to_tsvector('spanish'::regconfig, "
+    f"translate(coalesce(descripcion, ''), '{ACENTUADAS}', '{SIN_ACENTO}')), 'B')"
+)
+
 
 class Producto(Base):
     """Modelo de Producto"""
 
     __tablename__ = "productos"
 
-    id_producto = Column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
-    )
+    id_producto = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre = Column(String(200), nullable=False)
     descripcion = Column(Text, nullable=True)
     precio = Column(Numeric(10, 2), nullable=False)
     stock = Column(Integer, default=0)
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     fecha_edicion = Column(DateTime(timezone=True), onupdate=func.now())
+    # Control de concurrencia optimista: cada escritura incrementa la versión
+    # y las ediciones con If-Match solo se aplican sobre la versión leída
+    version = Column(Integer, nullable=False, server_default="1")
+    # Transacción de la última escritura, para el feed de cambios (ver
+    # entities/cambios.py); en las actualizaciones la renueva un trigger
+    xid_cambio = Column(BigInteger, nullable=False, server_default=text(SQL_XID_ACTUAL))
+    # Columna calculada por Postgres para la búsqueda de texto completo; no se
+    # carga al leer productos salvo que se pida explícitamente
+    busqueda = deferred(
+        Column(TSVECTOR, Computed(SQL_DOCUMENTO_BUSQUEDA, persisted=True))
+    )
 
     categoria_id = Column(
         UUID(as_uuid=True), ForeignKey("categorias.id_categoria"), nullable=False
@@ -36,6 +72,45 @@ class Producto(Base):
         UUID(as_uuid=True), ForeignKey("tbl_usuarios.id"), nullable=True
     )
 
+    # Clave estable para la paginación keyset (fecha_creacion, id_producto)
+    __table_args__ = (
+        Index(
+            "ix_productos_fecha_creacion_id_producto", "fecha_creacion", "id_producto"
+        ),
+        # Búsqueda de texto completo sobre nombre y descripción
+        Index("ix_productos_busqueda", "busqueda", postgresql_using="gin"),
+        # Claves foráneas: filtros por categoría/usuario y comprobaciones de
+        # integridad al eliminar categorías o usuarios. La de categoria_id la
+        # cubre el índice compuesto, que además sirve al listado por categoría
+        Index(
+            "ix_productos_categoria_fecha",
+            "categoria_id",
+            "fecha_creacion",
+            "id_producto",
+        ),
+        Index("ix_productos_usuario_id", "usuario_id"),
+        Index("ix_productos_id_usuario_crea", "id_usuario_crea"),
+        Index(
+            "ix_productos_id_usuario_edita",
+            "id_usuario_edita",
+            postgresql_where=id_usuario_edita.isnot(None),
+        ),
+        # Filtros y ordenaciones del listado GET /productos
+        Index("ix_productos_categoria_precio", "categoria_id", "precio", "id_producto"),
+        Index("ix_productos_precio_id_producto", "precio", "id_producto"),
+        Index("ix_productos_nombre_id_producto", "nombre", "id_producto"),
+        Index("ix_productos_stock_id_producto", "stock", "id_producto"),
+        Index(
+            "ix_productos_nombre_prefijo",
+            func.lower(nombre).label("nombre_lower"),
+            postgresql_ops={"nombre_lower": "text_pattern_ops"},
+        ),
+        # Feed de cambios: recorrido por rango desde el cursor
+        Index("ix_productos_xid_cambio_id_producto", "xid_cambio", "id_producto"),
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
     categoria = relationship("Categoria", back_populates="productos")
     # usuario = relationship(
     #     "Usuario", back_populates="productos", foreign_keys=[usuario_id]
@@ -0,0 +1,102 @@
+import uuid
+
+from database.config import Base
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+# Estados de una reserva. Solo las pendientes retienen stock; al confirmarse
+# las unidades se dan por vendidas y al cancelarse o expirar vuelven al stock
+PENDIENTE = "pendiente"
+CONFIRMADA = "confirmada"
+CANCELADA = "cancelada"
+EXPIRADA = "expirada"
+
+
+class Reserva(Base):
+    """Modelo de Reserva de stock (cesta de un checkout)"""
+
+    __tablename__ = "reservas"
+
+    id_reserva = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    estado = Column(String(20), nullable=False, default=PENDIENTE)
+    expira_en = Column(DateTime(timezone=True), nullable=False)
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    fecha_edicion = Column(DateTime(timezone=True), onupdate=func.now())
+
+    usuario_id = Column(
+        UUID(as_uuid=True), ForeignKey("tbl_usuarios.id"), nullable=True
+    )
+
+    __table_args__ = (
+        CheckConstraint(
+            estado.in_([PENDIENTE, CONFIRMADA, CANCELADA, EXPIRADA]),
+            name="ck_reservas_estado",
+        ),
+        # Barrido de reservas caducadas: solo las pendientes, por caducidad
+        Index(
+            "ix_reservas_pendientes_expira_en",
+            "expira_en",
+            postgresql_where=estado == PENDIENTE,
+        ),
+        Index(
+            "ix_reservas_usuario_id",
+            "usuario_id",
+            postgresql_where=usuario_id.isnot(None),
+        ),
+    )
+
+    # Las fechas del servidor vuelven con RETURNING al hacer flush: la reserva
+    # se serializa sin otra consulta
+    __mapper_args__ = {"eager_defaults": True}
+
+    lineas = relationship(
+        "LineaReserva",
+        back_populates="reserva",
+        cascade="all, delete-orphan",
+        order_by="LineaReserva.producto_id",
+    )
+
+    def __repr__(self):
+        return f"<Reserva(id={self.id_reserva}, estado='{self.estado}')>"
+
+
+class LineaReserva(Base):
+    """Modelo de línea de Reserva: unidades retenidas de un producto"""
+
+    __tablename__ = "reservas_lineas"
+
+    id_reserva = Column(
+        UUID(as_uuid=True),
+        ForeignKey("reservas.id_reserva", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    producto_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("productos.id_producto", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    cantidad = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("cantidad > 0", name="ck_reservas_lineas_cantidad"),
+        # Clave foránea: comprobación de integridad al eliminar productos
+        Index("ix_reservas_lineas_producto_id", "producto_id"),
+    )
+
+    reserva = relationship("Reserva", back_populates="lineas")
+
+    def __repr__(self):
+        return (
+            f"<LineaReserva(reserva={self.id_reserva}, "
+            f"producto={self.producto_id}, cantidad={self.cantidad})>"
+        )
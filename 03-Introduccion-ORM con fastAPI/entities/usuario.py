@@ -1,7 +1,8 @@
 import uuid
 
 from database.config import Base
-from sqlalchemy import Boolean, Column, DateTime, String
+from entities.cambios import SQL_XID_ACTUAL
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, String, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -10,16 +11,35 @@ from sqlalchemy.sql import func
 class Usuario(Base):
     __tablename__ = "tbl_usuarios"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nombre = Column(String(100), nullable=False)
     nombre_usuario = Column(String(50), unique=True, index=True, nullable=False)
-    email = Column(String(150), unique=True, index=True, nullable=False)
+    email = Column(String(150), nullable=False)
     contraseña_hash = Column(String(255), nullable=False)
     telefono = Column(String(20), nullable=True)
     activo = Column(Boolean, default=True)
     es_admin = Column(Boolean, default=False)
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     fecha_edicion = Column(DateTime(timezone=True), onupdate=func.now())
+    # Transacción de la última escritura, para el feed de cambios (ver
+    # entities/cambios.py); en las actualizaciones la renueva un trigger
+    xid_cambio = Column(BigInteger, nullable=False, server_default=text(SQL_XID_ACTUAL))
+
+    # Clave estable para la paginación keyset (fecha_creacion, id)
+    __table_args__ = (
+        Index("ix_tbl_usuarios_fecha_creacion_id", "fecha_creacion", "id"),
+        # Unicidad del email sin distinguir mayúsculas; sirve a login y registro
+        Index("ix_tbl_usuarios_email_lower", func.lower(email), unique=True),
+        # Administradores activos (actor por defecto de la auditoría)
+        Index(
+            "ix_tbl_usuarios_admin_activo",
+            "fecha_creacion",
+            "id",
+            postgresql_where=(es_admin == True) & (activo == True),
+        ),
+        # Feed de cambios: recorrido por rango desde el cursor
+        Index("ix_tbl_usuarios_xid_cambio_id", "xid_cambio", "id"),
+    )
 
     # productos = relationship(
     #     "Producto", back_populates="usuario", foreign_keys="Producto.usuario_id"
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Script para importar catálogos de productos o categorías desde CSV o NDJSON
+
+Lee el archivo por lotes de tamaño fijo (sin cargarlo entero en memoria),
+resuelve el nombre de la categoría de cada producto con una consulta por
+lote e inserta cada lote con un INSERT multi-fila en su propia transacción.
+Muestra el progreso tras cada lote y las filas rechazadas con su línea.
+
+Uso:
+    python importar_catalogo.py categorias categorias.csv
+    python importar_catalogo.py productos catalogo.csv --usuario-id <uuid>
+    python importar_catalogo.py productos catalogo.ndjson.gz --usuario-id <uuid>
+
+Columnas de productos: nombre, descripcion, precio, stock y categoria
+(nombre de la categoría). Columnas de categorías: nombre y descripcion.
+
+Devuelve código de salida 1 si alguna fila se rechazó.
+"""
+
+import argparse
+import os
+import sys
+from uuid import UUID
+
+from crud.categoria_crud import CategoriaCRUD
+from crud.importacion import (
+    FORMATOS_IMPORTACION,
+    TAMAÑO_LOTE_IMPORTACION,
+    abrir_texto,
+    detectar_formato,
+    leer_filas,
+)
+from crud.producto_crud import ProductoCRUD
+from database.config import SessionLocal
+from dotenv import load_dotenv
+
+
+def importar(args) -> bool:
+    """Importar el archivo y mostrar el progreso; False si hubo rechazos"""
+    formato = detectar_formato(args.formato, args.archivo)
+    db = SessionLocal()
+    try:
+        with open(args.archivo, "rb") as binario:
+            filas = leer_filas(abrir_texto(binario, args.archivo), formato)
+            if args.entidad == "productos":
+                progreso = ProductoCRUD(db).importar_archivo(
+                    filas, args.usuario_id, tamaño_lote=args.lote
+                )
+            else:
+                progreso = CategoriaCRUD(db).importar_archivo(
+                    filas, tamaño_lote=args.lote
+                )
+
+            for paso in progreso:
+                if paso.get("completado"):
+                    print(
+                        f"Importación completada en {paso['segundos']} s: "
+                        f"{paso['filas']} filas, {paso['insertadas']} insertadas, "
+                        f"{paso['rechazadas']} rechazadas"
+                    )
+                    return paso["rechazadas"] == 0
+                for error in paso["errores"]:
+                    print(
+                        f"  línea {error['linea']}: {error['error']}", file=sys.stderr
+                    )
+                print(
+                    f"Lote {paso['lote']}: {paso['filas']} filas, "
+                    f"{paso['insertadas']} insertadas, {paso['rechazadas']} rechazadas"
+                )
+    finally:
+        db.close()
+
+
+def main():
+    """Funcion principal"""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(
+        description="Importar productos o categorías desde CSV o NDJSON"
+    )
+    parser.add_argument("entidad", choices=["productos", "categorias"])
+    parser.add_argument("archivo", help="Archivo .csv, .ndjson o .jsonl (o .gz)")
+    parser.add_argument(
+        "--formato",
+        choices=list(FORMATOS_IMPORTACION),
+        help="Formato del archivo (por defecto, según la extensión)",
+    )
+    parser.add_argument(
+        "--usuario-id",
+        type=UUID,
+        help="Usuario propietario de los productos (obligatorio para productos)",
+    )
+    parser.add_argument(
+        "--lote",
+        type=int,
+        default=TAMAÑO_LOTE_IMPORTACION,
+        help=f"Filas por lote (por defecto {TAMAÑO_LOTE_IMPORTACION})",
+    )
+    args = parser.parse_args()
+
+    if args.entidad == "productos" and args.usuario_id is None:
+        parser.error("--usuario-id es obligatorio para importar productos")
+    if args.lote < 1:
+        parser.error("--lote debe ser mayor que 0")
+
+    if not os.getenv("DATABASE_URL"):
+        print("Error: DATABASE_URL no esta configurada")
+        return False
+
+    try:
+        return importar(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -3,9 +3,19 @@ Sistema de gestión de productos con ORM SQLAlchemy y Neon PostgreSQL
 API REST con FastAPI - Sin interfaz de consola
 """
 
+import asyncio
+
 import uvicorn
-from apis import auth, categoria, producto, usuario
-from database.config import create_tables
+from apis import auth, categoria, inventario, producto, reserva, usuario
+from auth.actor import actor_sistema
+from auth.security import password_hasher
+from cache.entidades import cache_entidades
+from crud.agrupador_stock import agrupador_stock
+from crud.categoria_crud import cache_categorias
+from crud.categoria_crud_async import AsyncCategoriaCRUD
+from crud.usuario_crud import filtro_identificadores
+from crud.usuario_crud_async import AsyncUsuarioCRUD
+from database.config import AsyncSessionLocal, create_tables
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -25,6 +35,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 # Incluir los routers de las APIs
@@ -32,6 +43,12 @@ app.include_router(auth.router)
 app.include_router(usuario.router)
 app.include_router(categoria.router)
 app.include_router(producto.router)
+app.include_router(reserva.router)
+app.include_router(inventario.router)
+
+# Tareas de fondo: liberar las reservas caducadas, sincronizar el filtro de
+# usuarios y mantener el kardex
+tareas_fondo = []
 
 
 @app.on_event("startup")
@@ -40,10 +57,30 @@ async def startup_event():
     print("Iniciando Sistema de Gestión de Productos...")
     print("Configurando base de datos...")
     create_tables()
+    async with AsyncSessionLocal() as db:
+        categorias = await AsyncCategoriaCRUD(db).precargar_cache()
+        usuarios = await AsyncUsuarioCRUD(db).precargar_filtro()
+    print(f"Caché de categorías precargada ({categorias} categorías).")
+    print(f"Filtro de usuarios precargado ({usuarios} usuarios).")
+    tareas_fondo.append(asyncio.create_task(reserva.barrer_reservas_expiradas()))
+    tareas_fondo.append(asyncio.create_task(usuario.sincronizar_filtro_usuarios()))
+    tareas_fondo.append(
+        asyncio.create_task(inventario.tarea_mantenimiento_inventario())
+    )
     print("Sistema listo para usar.")
     print("Documentación disponible en: http://localhost:8000/docs")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de cierre de la aplicación"""
+    for tarea in tareas_fondo:
+        tarea.cancel()
+    # Los cambios de stock agrupados que aún esperan su ventana
+    await agrupador_stock.vaciar()
+    password_hasher.cerrar()
+
+
 @app.get("/", tags=["raíz"])
 async def root():
     """Endpoint raíz que devuelve información básica de la API."""
@@ -57,10 +94,27 @@ async def root():
             "usuarios": "/usuarios",
             "categorias": "/categorias",
             "productos": "/productos",
+            "reservas": "/reservas",
+            "inventario": "/inventario",
         },
     }
 
 
+@app.get("/cache/metricas", tags=["raíz"])
+async def metricas_cache():
+    """
+    Métricas de las cachés, del filtro de nombres de usuario y emails y del
+    agrupador de escrituras de stock.
+    """
+    return {
+        "categorias": cache_categorias.metricas(),
+        "entidades": cache_entidades.metricas(),
+        "usuarios_auditoria": actor_sistema.metricas(),
+        "identificadores_usuario": filtro_identificadores.metricas(),
+        "agrupador_stock": agrupador_stock.metricas(),
+    }
+
+
 def main():
     """Función principal para ejecutar el servidor"""
     print("Iniciando servidor FastAPI...")
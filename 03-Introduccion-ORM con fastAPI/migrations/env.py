@@ -14,8 +14,11 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 # Importar los modelos para que Alembic los detecte
 from database.config import Base
+from entities.cambios import Eliminacion
 from entities.categoria import Categoria
+from entities.inventario import MovimientoInventario, SnapshotInventario
 from entities.producto import Producto
+from entities.reserva import LineaReserva, Reserva
 from entities.usuario import Usuario
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,44 @@
+"""Add (fecha_creacion, id) indexes for keyset pagination
+
+Revision ID: 002_keyset
+Revises: 04c005510a3f
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "002_keyset"
+down_revision = "04c005510a3f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Índices compuestos para ORDER BY (fecha_creacion, id) y la comparación
+    # de fila (fecha_creacion, id) > (:fecha, :id) de la paginación por cursor
+    op.create_index(
+        "ix_productos_fecha_creacion_id_producto",
+        "productos",
+        ["fecha_creacion", "id_producto"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_categorias_fecha_creacion_id_categoria",
+        "categorias",
+        ["fecha_creacion", "id_categoria"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_tbl_usuarios_fecha_creacion_id",
+        "tbl_usuarios",
+        ["fecha_creacion", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tbl_usuarios_fecha_creacion_id", table_name="tbl_usuarios")
+    op.drop_index("ix_categorias_fecha_creacion_id_categoria", table_name="categorias")
+    op.drop_index("ix_productos_fecha_creacion_id_producto", table_name="productos")
@@ -0,0 +1,52 @@
+"""Add full-text search column and GIN index to productos
+
+Revision ID: 003_busqueda
+Revises: 002_keyset
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "003_busqueda"
+down_revision = "002_keyset"
+branch_labels = None
+depends_on = None
+
+# Debe coincidir con entities.producto.SQL_DOCUMENTO_BUSQUEDA
+ACENTUADAS = "áéíóúüñàèìòùÁÉÍÓÚÜÑÀÈÌÒÙ"
+SIN_ACENTO = "aeiouunaeiouAEIOUUNAEIOU"
+SQL_DOCUMENTO_BUSQUEDA = (
+    "setweight(to_tsvector('spanish'::regconfig, "
+    f"translate(coalesce(nombre, ''), '{ACENTUADAS}', '{SIN_ACENTO}')), 'A') || "
+    "setweight(to_tsvector('spanish'::regconfig, "
+    f"translate(coalesce(descripcion, ''), '{ACENTUADAS}', '{SIN_ACENTO}')), 'B')"
+)
+
+
+def upgrade() -> None:
+    # Columna generada: Postgres la recalcula al insertar o editar un producto
+    op.add_column(
+        "productos",
+        sa.Column(
+            "busqueda",
+            postgresql.TSVECTOR(),
+            sa.Computed(SQL_DOCUMENTO_BUSQUEDA, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_productos_busqueda",
+        "productos",
+        ["busqueda"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_productos_busqueda", table_name="productos")
+    op.drop_column("productos", "busqueda")
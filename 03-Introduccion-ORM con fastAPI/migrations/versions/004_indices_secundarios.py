@@ -0,0 +1,81 @@
+"""Add foreign key, lower(email) and partial indexes; drop redundant PK indexes
+
+Revision ID: 004_indices
+Revises: 003_busqueda
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "004_indices"
+down_revision = "003_busqueda"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Claves foráneas sin índice: filtros por categoría/usuario y comprobación
+    # de integridad al eliminar una categoría o un usuario
+    op.create_index("ix_productos_categoria_id", "productos", ["categoria_id"])
+    op.create_index("ix_productos_usuario_id", "productos", ["usuario_id"])
+    op.create_index("ix_productos_id_usuario_crea", "productos", ["id_usuario_crea"])
+    op.create_index(
+        "ix_productos_id_usuario_edita",
+        "productos",
+        ["id_usuario_edita"],
+        postgresql_where=sa.text("id_usuario_edita IS NOT NULL"),
+    )
+    op.create_index("ix_categorias_id_usuario_crea", "categorias", ["id_usuario_crea"])
+    op.create_index(
+        "ix_categorias_id_usuario_edita",
+        "categorias",
+        ["id_usuario_edita"],
+        postgresql_where=sa.text("id_usuario_edita IS NOT NULL"),
+    )
+
+    # El email se compara con lower(email): un único índice único funcional
+    # sustituye al índice único sobre la columna
+    op.create_index(
+        "ix_tbl_usuarios_email_lower",
+        "tbl_usuarios",
+        [sa.text("lower(email)")],
+        unique=True,
+    )
+    op.execute("DROP INDEX IF EXISTS ix_tbl_usuarios_email")
+
+    # Administradores activos, en el orden en que los busca el actor por defecto
+    op.create_index(
+        "ix_tbl_usuarios_admin_activo",
+        "tbl_usuarios",
+        ["fecha_creacion", "id"],
+        postgresql_where=sa.text("es_admin AND activo"),
+    )
+
+    # Las claves primarias ya tienen su propio índice único
+    op.execute("DROP INDEX IF EXISTS ix_productos_id_producto")
+    op.execute("DROP INDEX IF EXISTS ix_categorias_id_categoria")
+    op.execute("DROP INDEX IF EXISTS ix_tbl_usuarios_id")
+
+
+def downgrade() -> None:
+    op.create_index("ix_tbl_usuarios_id", "tbl_usuarios", ["id"], unique=False)
+    op.create_index(
+        "ix_categorias_id_categoria", "categorias", ["id_categoria"], unique=False
+    )
+    op.create_index(
+        "ix_productos_id_producto", "productos", ["id_producto"], unique=False
+    )
+
+    op.drop_index("ix_tbl_usuarios_admin_activo", table_name="tbl_usuarios")
+    op.create_index("ix_tbl_usuarios_email", "tbl_usuarios", ["email"], unique=True)
+    op.drop_index("ix_tbl_usuarios_email_lower", table_name="tbl_usuarios")
+
+    op.drop_index("ix_categorias_id_usuario_edita", table_name="categorias")
+    op.drop_index("ix_categorias_id_usuario_crea", table_name="categorias")
+    op.drop_index("ix_productos_id_usuario_edita", table_name="productos")
+    op.drop_index("ix_productos_id_usuario_crea", table_name="productos")
+    op.drop_index("ix_productos_usuario_id", table_name="productos")
+    op.drop_index("ix_productos_categoria_id", table_name="productos")
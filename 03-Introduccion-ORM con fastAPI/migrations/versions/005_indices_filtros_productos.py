@@ -0,0 +1,58 @@
+"""Add composite indexes for GET /productos filters and sorting
+
+Revision ID: 005_filtros
+Revises: 004_indices
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "005_filtros"
+down_revision = "004_indices"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # El índice por categoría pasa a ser compuesto: sigue cubriendo la FK y
+    # además sirve al listado por categoría en el orden por defecto
+    op.create_index(
+        "ix_productos_categoria_fecha",
+        "productos",
+        ["categoria_id", "fecha_creacion", "id_producto"],
+    )
+    op.drop_index("ix_productos_categoria_id", table_name="productos")
+
+    op.create_index(
+        "ix_productos_categoria_precio",
+        "productos",
+        ["categoria_id", "precio", "id_producto"],
+    )
+    op.create_index(
+        "ix_productos_precio_id_producto", "productos", ["precio", "id_producto"]
+    )
+    op.create_index(
+        "ix_productos_nombre_id_producto", "productos", ["nombre", "id_producto"]
+    )
+    op.create_index(
+        "ix_productos_stock_id_producto", "productos", ["stock", "id_producto"]
+    )
+    # Prefijo de nombre sin distinguir mayúsculas: lower(nombre) LIKE 'abc%'
+    op.create_index(
+        "ix_productos_nombre_prefijo",
+        "productos",
+        [sa.text("lower(nombre) text_pattern_ops")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_productos_nombre_prefijo", table_name="productos")
+    op.drop_index("ix_productos_stock_id_producto", table_name="productos")
+    op.drop_index("ix_productos_nombre_id_producto", table_name="productos")
+    op.drop_index("ix_productos_precio_id_producto", table_name="productos")
+    op.drop_index("ix_productos_categoria_precio", table_name="productos")
+    op.create_index("ix_productos_categoria_id", "productos", ["categoria_id"])
+    op.drop_index("ix_productos_categoria_fecha", table_name="productos")
@@ -0,0 +1,34 @@
+"""Add version columns for optimistic concurrency on productos and categorias
+
+Revision ID: 006_version
+Revises: 005_filtros
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "006_version"
+down_revision = "005_filtros"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Con un DEFAULT constante Postgres no reescribe la tabla: las filas
+    # existentes leen la versión 1 del catálogo
+    op.add_column(
+        "productos",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.add_column(
+        "categorias",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("categorias", "version")
+    op.drop_column("productos", "version")
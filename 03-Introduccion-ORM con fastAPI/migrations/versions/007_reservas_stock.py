@@ -0,0 +1,79 @@
+"""Add reservas and reservas_lineas tables for stock reservations
+
+Revision ID: 007_reservas
+Revises: 006_version
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "007_reservas"
+down_revision = "006_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reservas",
+        sa.Column("id_reserva", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("estado", sa.String(length=20), nullable=False),
+        sa.Column("expira_en", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "fecha_creacion",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("fecha_edicion", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("usuario_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.CheckConstraint(
+            "estado IN ('pendiente', 'confirmada', 'cancelada', 'expirada')",
+            name="ck_reservas_estado",
+        ),
+        sa.ForeignKeyConstraint(["usuario_id"], ["tbl_usuarios.id"]),
+        sa.PrimaryKeyConstraint("id_reserva"),
+    )
+    # Barrido de reservas caducadas: solo las pendientes, por caducidad
+    op.create_index(
+        "ix_reservas_pendientes_expira_en",
+        "reservas",
+        ["expira_en"],
+        postgresql_where=sa.text("estado = 'pendiente'"),
+    )
+    op.create_index(
+        "ix_reservas_usuario_id",
+        "reservas",
+        ["usuario_id"],
+        postgresql_where=sa.text("usuario_id IS NOT NULL"),
+    )
+
+    op.create_table(
+        "reservas_lineas",
+        sa.Column("id_reserva", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("producto_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.CheckConstraint("cantidad > 0", name="ck_reservas_lineas_cantidad"),
+        sa.ForeignKeyConstraint(
+            ["id_reserva"], ["reservas.id_reserva"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["producto_id"], ["productos.id_producto"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id_reserva", "producto_id"),
+    )
+    op.create_index(
+        "ix_reservas_lineas_producto_id", "reservas_lineas", ["producto_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservas_lineas_producto_id", table_name="reservas_lineas")
+    op.drop_table("reservas_lineas")
+    op.drop_index("ix_reservas_usuario_id", table_name="reservas")
+    op.drop_index("ix_reservas_pendientes_expira_en", table_name="reservas")
+    op.drop_table("reservas")
@@ -0,0 +1,143 @@
+"""Add inventory movements ledger (kardex) and stock snapshots
+
+Revision ID: 008_kardex
+Revises: 007_reservas
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+
+from datetime import date, datetime, timezone
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "008_kardex"
+down_revision = "007_reservas"
+branch_labels = None
+depends_on = None
+
+FUNCION_MOVIMIENTOS = """
+CREATE OR REPLACE FUNCTION registrar_movimientos_inventario() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    motivo text := NULLIF(current_setting('inventario.motivo', true), '');
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO movimientos_inventario
+            (producto_id, delta, stock_resultante, motivo)
+        SELECT id_producto, stock, stock, COALESCE(motivo, 'alta')
+        FROM nuevas
+        WHERE COALESCE(stock, 0) <> 0;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO movimientos_inventario
+            (producto_id, delta, stock_resultante, motivo)
+        SELECT n.id_producto,
+               COALESCE(n.stock, 0) - COALESCE(v.stock, 0),
+               COALESCE(n.stock, 0),
+               COALESCE(motivo, 'ajuste')
+        FROM nuevas n
+        JOIN viejas v USING (id_producto)
+        WHERE n.stock IS DISTINCT FROM v.stock;
+    ELSE
+        INSERT INTO movimientos_inventario
+            (producto_id, delta, stock_resultante, motivo)
+        SELECT id_producto, -stock, 0, COALESCE(motivo, 'baja')
+        FROM viejas
+        WHERE COALESCE(stock, 0) <> 0;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = {
+    "tr_productos_movimientos_alta": (
+        "AFTER INSERT ON productos REFERENCING NEW TABLE AS nuevas"
+    ),
+    "tr_productos_movimientos_ajuste": (
+        "AFTER UPDATE ON productos "
+        "REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas"
+    ),
+    "tr_productos_movimientos_baja": (
+        "AFTER DELETE ON productos REFERENCING OLD TABLE AS viejas"
+    ),
+}
+
+
+def _mes_siguiente(mes: date) -> date:
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "movimientos_inventario",
+        sa.Column("id_movimiento", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column(
+            "fecha",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("producto_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("delta", sa.Integer(), nullable=False),
+        sa.Column("stock_resultante", sa.Integer(), nullable=False),
+        sa.Column("motivo", sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint("id_movimiento", "fecha"),
+        postgresql_partition_by="RANGE (fecha)",
+    )
+    op.create_index(
+        "ix_movimientos_inventario_fecha",
+        "movimientos_inventario",
+        ["fecha"],
+        postgresql_using="brin",
+    )
+
+    # Partición por defecto y particiones del mes actual y los dos siguientes;
+    # la aplicación crea las de los meses posteriores
+    op.execute(
+        "CREATE TABLE movimientos_inventario_defecto "
+        "PARTITION OF movimientos_inventario DEFAULT"
+    )
+    mes = datetime.now(timezone.utc).date().replace(day=1)
+    for _ in range(3):
+        fin = _mes_siguiente(mes)
+        op.execute(
+            f"CREATE TABLE movimientos_inventario_{mes:%Y_%m} "
+            "PARTITION OF movimientos_inventario "
+            f"FOR VALUES FROM ('{mes}T00:00:00+00') TO ('{fin}T00:00:00+00')"
+        )
+        mes = fin
+
+    op.create_table(
+        "inventario_snapshots",
+        sa.Column("fecha", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("producto_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("stock", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("fecha", "producto_id"),
+    )
+
+    # Movimiento de apertura con el stock actual: el kardex cuadra desde hoy
+    op.execute(
+        "INSERT INTO movimientos_inventario "
+        "(producto_id, delta, stock_resultante, motivo) "
+        "SELECT id_producto, stock, stock, 'apertura' FROM productos "
+        "WHERE COALESCE(stock, 0) <> 0"
+    )
+
+    op.execute(FUNCION_MOVIMIENTOS)
+    for nombre, definicion in TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER {nombre} {definicion} FOR EACH STATEMENT "
+            "EXECUTE FUNCTION registrar_movimientos_inventario()"
+        )
+
+
+def downgrade() -> None:
+    for nombre in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {nombre} ON productos")
+    op.execute("DROP FUNCTION IF EXISTS registrar_movimientos_inventario()")
+    op.drop_table("inventario_snapshots")
+    # Elimina también todas las particiones
+    op.drop_table("movimientos_inventario")
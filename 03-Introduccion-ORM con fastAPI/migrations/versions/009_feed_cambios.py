@@ -0,0 +1,103 @@
+"""Add change feed columns, tombstones and triggers for incremental sync
+
+Revision ID: 009_cambios
+Revises: 008_kardex
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "009_cambios"
+down_revision = "008_kardex"
+branch_labels = None
+depends_on = None
+
+XID_ACTUAL = "pg_current_xact_id()::text::bigint"
+
+# Tabla -> columna de clave primaria
+TABLAS = {
+    "productos": "id_producto",
+    "categorias": "id_categoria",
+    "tbl_usuarios": "id",
+}
+
+FUNCION_XID = f"""
+CREATE OR REPLACE FUNCTION marcar_xid_cambio() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.xid_cambio := {XID_ACTUAL};
+    RETURN NEW;
+END
+$$
+"""
+
+FUNCION_ELIMINACIONES = f"""
+CREATE OR REPLACE FUNCTION registrar_eliminaciones() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format(
+        'INSERT INTO eliminaciones (tabla, xid_cambio, id_registro) '
+        'SELECT %L, {XID_ACTUAL}, %I FROM viejas',
+        TG_TABLE_NAME, TG_ARGV[0]
+    );
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "eliminaciones",
+        sa.Column("tabla", sa.String(length=50), nullable=False),
+        sa.Column("xid_cambio", sa.BigInteger(), nullable=False),
+        sa.Column("id_registro", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "fecha",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("tabla", "xid_cambio", "id_registro"),
+    )
+
+    op.execute(FUNCION_XID)
+    op.execute(FUNCION_ELIMINACIONES)
+    for tabla, columna_id in TABLAS.items():
+        # Con un DEFAULT constante Postgres no reescribe la tabla: las filas
+        # existentes quedan con xid_cambio 0 y entran en la primera
+        # sincronización; las nuevas toman el xid de su transacción
+        op.add_column(
+            tabla,
+            sa.Column(
+                "xid_cambio", sa.BigInteger(), server_default="0", nullable=False
+            ),
+        )
+        op.alter_column(tabla, "xid_cambio", server_default=sa.text(XID_ACTUAL))
+        op.create_index(
+            f"ix_{tabla}_xid_cambio_{columna_id}", tabla, ["xid_cambio", columna_id]
+        )
+        op.execute(
+            f"CREATE TRIGGER tr_{tabla}_xid_cambio BEFORE UPDATE ON {tabla} "
+            "FOR EACH ROW EXECUTE FUNCTION marcar_xid_cambio()"
+        )
+        op.execute(
+            f"CREATE TRIGGER tr_{tabla}_eliminaciones AFTER DELETE ON {tabla} "
+            "REFERENCING OLD TABLE AS viejas FOR EACH STATEMENT "
+            f"EXECUTE FUNCTION registrar_eliminaciones('{columna_id}')"
+        )
+
+
+def downgrade() -> None:
+    for tabla, columna_id in TABLAS.items():
+        op.execute(f"DROP TRIGGER IF EXISTS tr_{tabla}_eliminaciones ON {tabla}")
+        op.execute(f"DROP TRIGGER IF EXISTS tr_{tabla}_xid_cambio ON {tabla}")
+        op.drop_index(f"ix_{tabla}_xid_cambio_{columna_id}", table_name=tabla)
+        op.drop_column(tabla, "xid_cambio")
+    op.execute("DROP FUNCTION IF EXISTS registrar_eliminaciones()")
+    op.execute("DROP FUNCTION IF EXISTS marcar_xid_cambio()")
+    op.drop_table("eliminaciones")
@@ -0,0 +1,51 @@
+"""Reject updates, deletes and truncates on the inventory movements ledger
+
+Revision ID: 010_kardex_solo_insercion
+Revises: 009_cambios
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "010_kardex_solo_insercion"
+down_revision = "009_cambios"
+branch_labels = None
+depends_on = None
+
+FUNCION_SOLO_INSERCION = """
+CREATE OR REPLACE FUNCTION impedir_cambios_movimientos() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    RAISE EXCEPTION 'movimientos_inventario es de solo inserción (% no permitido)',
+        TG_OP USING ERRCODE = 'insufficient_privilege';
+END
+$$
+"""
+
+TRIGGERS = {
+    # Los triggers de fila se clonan en todas las particiones, también en las
+    # que se creen después
+    "tr_movimientos_solo_insercion": (
+        "BEFORE UPDATE OR DELETE ON movimientos_inventario FOR EACH ROW"
+    ),
+    "tr_movimientos_sin_truncate": (
+        "BEFORE TRUNCATE ON movimientos_inventario FOR EACH STATEMENT"
+    ),
+}
+
+
+def upgrade() -> None:
+    op.execute(FUNCION_SOLO_INSERCION)
+    for nombre, definicion in TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER {nombre} {definicion} "
+            "EXECUTE FUNCTION impedir_cambios_movimientos()"
+        )
+
+
+def downgrade() -> None:
+    for nombre in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {nombre} ON movimientos_inventario")
+    op.execute("DROP FUNCTION IF EXISTS impedir_cambios_movimientos()")
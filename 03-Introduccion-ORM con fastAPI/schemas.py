@@ -75,6 +75,7 @@ class CategoriaResponse(CategoriaBase):
     id_categoria: UUID
     fecha_creacion: datetime
     fecha_edicion: Optional[datetime] = None
+    version: int
 
     class Config:
         from_attributes = True
@@ -107,16 +108,83 @@ class ProductoResponse(ProductoBase):
     id_producto: UUID
     fecha_creacion: datetime
     fecha_edicion: Optional[datetime] = None
+    version: int
 
     class Config:
         from_attributes = True
 
 
+class ProductoLoteError(BaseModel):
+    indice: int
+    error: str
+
+
+class ProductoLoteResponse(BaseModel):
+    creados: list[ProductoResponse] = []
+    errores: list[ProductoLoteError] = []
+
+
+# Modelos de respuesta para consultas por lote de ids: un elemento por id
+# pedido (None si no existe), en el mismo orden
+class ProductosPorIdsResponse(BaseModel):
+    resultados: list[Optional[ProductoResponse]] = []
+    no_encontrados: list[UUID] = []
+
+
+class CategoriasPorIdsResponse(BaseModel):
+    resultados: list[Optional[CategoriaResponse]] = []
+    no_encontrados: list[UUID] = []
+
+
+class UsuariosPorIdsResponse(BaseModel):
+    resultados: list[Optional[UsuarioResponse]] = []
+    no_encontrados: list[UUID] = []
+
+
+# Modelos del feed de cambios: registros creados o modificados e ids
+# eliminados desde el cursor pedido, y el cursor de la siguiente petición
+class CambiosProductosResponse(BaseModel):
+    cambios: list[ProductoResponse] = []
+    eliminados: list[UUID] = []
+    cursor: Optional[str] = None
+    hay_mas: bool = False
+
+
+class CambiosCategoriasResponse(BaseModel):
+    cambios: list[CategoriaResponse] = []
+    eliminados: list[UUID] = []
+    cursor: Optional[str] = None
+    hay_mas: bool = False
+
+
+class CambiosUsuariosResponse(BaseModel):
+    cambios: list[UsuarioResponse] = []
+    eliminados: list[UUID] = []
+    cursor: Optional[str] = None
+    hay_mas: bool = False
+
+
 # Modelos de respuesta con relaciones
 class ProductoConCategoria(ProductoResponse):
     categoria: CategoriaResponse
 
 
+# Producto con las relaciones pedidas en ?expand=; las que no se piden no se
+# asignan y no aparecen en la respuesta (response_model_exclude_unset)
+class ProductoExpandido(ProductoResponse):
+    categoria: Optional[CategoriaResponse] = None
+    usuario_crea: Optional[UsuarioResponse] = None
+
+    @classmethod
+    def desde_producto(cls, producto, expandir=()) -> "ProductoExpandido":
+        """Convertir un producto leyendo solo las relaciones de ``expandir``"""
+        campos = {
+            campo: getattr(producto, campo) for campo in ProductoResponse.model_fields
+        }
+        campos.update({relacion: getattr(producto, relacion) for relacion in expandir})
+        return cls.model_validate(campos)
+
+
 # class UsuarioConProductos(UsuarioResponse):
 #     productos: list[ProductoResponse] = []
 
@@ -125,6 +193,59 @@ class CategoriaConProductos(CategoriaResponse):
     productos: list[ProductoResponse] = []
 
 
+# Modelos del kardex de inventario
+class MovimientoInventarioResponse(BaseModel):
+    id_movimiento: int
+    fecha: datetime
+    producto_id: UUID
+    delta: int
+    stock_resultante: int
+    motivo: str
+
+    class Config:
+        from_attributes = True
+
+
+class StockHistoricoResponse(BaseModel):
+    producto_id: UUID
+    fecha: datetime
+    stock: int
+
+
+class DescuadreInventario(BaseModel):
+    producto_id: UUID
+    stock: int
+    stock_kardex: int
+
+
+# Modelos para Reserva de stock
+class LineaReserva(BaseModel):
+    producto_id: UUID
+    cantidad: int
+
+    class Config:
+        from_attributes = True
+
+
+class ReservaCreate(BaseModel):
+    lineas: list[LineaReserva]
+    usuario_id: Optional[UUID] = None
+    ttl_segundos: Optional[int] = None
+
+
+class ReservaResponse(BaseModel):
+    id_reserva: UUID
+    estado: str
+    expira_en: datetime
+    usuario_id: Optional[UUID] = None
+    lineas: list[LineaReserva] = []
+    fecha_creacion: datetime
+    fecha_edicion: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Modelos de respuesta para la API
 class RespuestaAPI(BaseModel):
     mensaje: str
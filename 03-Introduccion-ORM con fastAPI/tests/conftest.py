@@ -0,0 +1,81 @@
+"""
+Configuración común de las pruebas
+
+Las pruebas de cachés, cursores, ETag, agrupador y usuario de auditoría no
+necesitan base de datos. Las de concurrencia optimista, unidad de trabajo y
+filtro de usuarios usan la base de datos PostgreSQL de ``TEST_DATABASE_URL``
+(vacía, solo para pruebas): se crean las tablas y cada prueba se deshace al
+terminar. Sin esa variable se omiten.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.config exige DATABASE_URL al importarse; los motores de la
+# aplicación no abren conexiones hasta que se usan
+os.environ.setdefault("DATABASE_URL", "postgresql://pruebas@localhost/pruebas")
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="session")
+def motor():
+    """Motor de la base de datos de pruebas con todas las tablas creadas"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL no está configurada")
+
+    from database.config import Base
+    from entities import cambios, categoria, inventario, producto, reserva, usuario
+    from sqlalchemy import create_engine
+
+    motor = create_engine(TEST_DATABASE_URL)
+    Base.metadata.create_all(bind=motor)
+    yield motor
+    motor.dispose()
+
+
+@pytest.fixture
+def conexion(motor):
+    """Conexión con una transacción que se deshace al terminar la prueba"""
+    from auth.actor import actor_sistema
+    from crud.categoria_crud import cache_categorias
+
+    with motor.connect() as conexion:
+        transaccion = conexion.begin()
+        yield conexion
+        transaccion.rollback()
+    # Las cachés de proceso no deben conservar filas que ya no existen
+    actor_sistema.invalidar()
+    cache_categorias.limpiar()
+
+
+@pytest.fixture
+def db(conexion):
+    """
+    Sesión de prueba; sus commits son puntos de guardado dentro de la
+    transacción de ``conexion``
+    """
+    from sqlalchemy.orm import Session
+
+    sesion = Session(bind=conexion, join_transaction_mode="create_savepoint")
+    yield sesion
+    sesion.close()
+
+
+@pytest.fixture
+def admin(db):
+    """Usuario administrador activo"""
+    from crud.usuario_crud import UsuarioCRUD
+
+    return UsuarioCRUD(db).crear_usuario(
+        nombre="Administrador",
+        nombre_usuario="admin_pruebas",
+        email="admin_pruebas@example.com",
+        contraseña="Pruebas123!",
+        es_admin=True,
+        contraseña_hash="sal:hash",
+    )
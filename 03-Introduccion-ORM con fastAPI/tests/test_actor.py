@@ -0,0 +1,76 @@
+"""
+Pruebas del usuario al que se atribuyen las escrituras (X-Usuario-Id)
+
+Se sustituye la sesión asíncrona por un doble que cuenta las consultas.
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from auth import actor as modulo
+from auth.actor import ResolutorActorSistema, obtener_id_usuario_actual
+from fastapi import HTTPException
+
+
+class SesionFalsa:
+    """Responde a la consulta de usuario activo con los ids de ``activos``"""
+
+    def __init__(self, *activos):
+        self.activos = set(activos)
+        self.consultas = 0
+
+    async def scalar(self, consulta):
+        self.consultas += 1
+        id_usuario = consulta.whereclause.clauses[0].right.value
+        return id_usuario if id_usuario in self.activos else None
+
+
+@pytest.fixture
+def resolutor(monkeypatch):
+    resolutor = ResolutorActorSistema(ttl_segundos=60)
+    monkeypatch.setattr(modulo, "actor_sistema", resolutor)
+    monkeypatch.setattr(modulo, "CONFIAR_CABECERA_USUARIO", True)
+    return resolutor
+
+
+def test_usuario_comprobado_no_se_consulta_de_nuevo(resolutor):
+    id_usuario = uuid4()
+    db = SesionFalsa(id_usuario)
+
+    for _ in range(3):
+        assert asyncio.run(obtener_id_usuario_actual(id_usuario, db)) == id_usuario
+    assert db.consultas == 1
+
+    resolutor.invalidar(id_usuario)
+    asyncio.run(obtener_id_usuario_actual(id_usuario, db))
+    assert db.consultas == 2
+
+
+def test_usuario_inexistente_o_inactivo(resolutor):
+    db = SesionFalsa()
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(obtener_id_usuario_actual(uuid4(), db))
+        assert error.value.status_code == 401
+    # Los rechazos no se guardan
+    assert db.consultas == 2
+
+
+def test_invalidar_sin_id_olvida_todos(resolutor):
+    ids = [uuid4(), uuid4()]
+    db = SesionFalsa(*ids)
+    for id_usuario in ids:
+        asyncio.run(resolutor.usuario_activo(db, id_usuario))
+
+    resolutor.invalidar()
+    assert resolutor.metricas()["entradas"] == 0
+
+
+def test_cabecera_ignorada_sin_proxy_de_confianza(resolutor, monkeypatch):
+    monkeypatch.setattr(modulo, "CONFIAR_CABECERA_USUARIO", False)
+    db = SesionFalsa()
+
+    assert asyncio.run(obtener_id_usuario_actual(uuid4(), db)) is None
+    assert db.consultas == 0
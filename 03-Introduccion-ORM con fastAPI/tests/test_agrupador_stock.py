@@ -0,0 +1,177 @@
+"""
+Pruebas del agrupador de escrituras de stock
+
+Se sustituyen la sesión y la clase CRUD por dobles que registran los
+cambios recibidos, para comprobar cómo se combinan las operaciones de un
+grupo y cómo se responde a cada llamada.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from crud import agrupador_stock as modulo
+from crud.agrupador_stock import AgrupadorStock
+from crud.producto_crud import StockInsuficienteError
+
+
+class SesionFalsa:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class CRUDFalso:
+    """Aplica los cambios sobre un stock en memoria, como el UPDATE agrupado"""
+
+    stock = {}
+    llamadas = []
+
+    def __init__(self, db):
+        pass
+
+    async def aplicar_cambios_stock(self, cambios):
+        CRUDFalso.llamadas.append(("grupo", dict(cambios)))
+        productos = {}
+        for producto_id, (fijado, delta, editor) in cambios.items():
+            if producto_id not in self.stock:
+                continue
+            nuevo = (self.stock[producto_id] if fijado is None else fijado) + delta
+            if nuevo < 0:
+                continue
+            self.stock[producto_id] = nuevo
+            productos[producto_id] = SimpleNamespace(
+                id_producto=producto_id, stock=nuevo, id_usuario_edita=editor
+            )
+        return productos
+
+    async def ajustar_stock(self, producto_id, delta, id_usuario_edita=None):
+        CRUDFalso.llamadas.append(("ajustar", producto_id, delta))
+        if producto_id not in self.stock:
+            return None
+        if self.stock[producto_id] + delta < 0:
+            raise StockInsuficienteError("Stock insuficiente")
+        self.stock[producto_id] += delta
+        return SimpleNamespace(id_producto=producto_id, stock=self.stock[producto_id])
+
+    async def actualizar_stock(self, producto_id, stock, id_usuario_edita=None):
+        CRUDFalso.llamadas.append(("fijar", producto_id, stock))
+        if producto_id not in self.stock:
+            return None
+        self.stock[producto_id] = stock
+        return SimpleNamespace(id_producto=producto_id, stock=stock)
+
+
+@pytest.fixture
+def agrupador(monkeypatch):
+    CRUDFalso.stock = {}
+    CRUDFalso.llamadas = []
+    monkeypatch.setattr(modulo, "AsyncSessionLocal", SesionFalsa)
+    monkeypatch.setattr(modulo, "AsyncProductoCRUD", CRUDFalso)
+    return AgrupadorStock(ventana_ms=10)
+
+
+def test_un_grupo_por_ventana(agrupador):
+    producto_id = uuid4()
+    CRUDFalso.stock[producto_id] = 10
+
+    async def llamadas():
+        return await asyncio.gather(
+            *(agrupador.ajustar(producto_id, -1) for _ in range(5))
+        )
+
+    resultados = asyncio.run(llamadas())
+
+    assert [llamada[0] for llamada in CRUDFalso.llamadas] == ["grupo"]
+    assert CRUDFalso.llamadas[0][1] == {producto_id: (None, -5, None)}
+    # Todas las llamadas reciben el producto con el grupo entero aplicado
+    assert {producto.stock for producto in resultados} == {5}
+    assert agrupador.metricas() == {
+        "ventana_ms": 10,
+        "grupos": 1,
+        "operaciones": 5,
+        "pendientes": 0,
+    }
+
+
+def test_fijar_descarta_deltas_anteriores_y_atribuye_al_ultimo(agrupador):
+    producto_id = uuid4()
+    CRUDFalso.stock[producto_id] = 10
+    usuario_a, usuario_b = uuid4(), uuid4()
+
+    async def llamadas():
+        return await asyncio.gather(
+            agrupador.ajustar(producto_id, 4, usuario_a),
+            agrupador.fijar(producto_id, 20, usuario_a),
+            agrupador.ajustar(producto_id, -3, usuario_b),
+        )
+
+    resultados = asyncio.run(llamadas())
+
+    assert CRUDFalso.llamadas == [("grupo", {producto_id: (20, -3, usuario_b)})]
+    assert resultados[0].stock == 17
+    assert resultados[0].id_usuario_edita == usuario_b
+
+
+def test_negativos_se_repiten_una_a_una(agrupador):
+    producto_id, inexistente = uuid4(), uuid4()
+    CRUDFalso.stock[producto_id] = 2
+
+    async def llamadas():
+        return await asyncio.gather(
+            agrupador.ajustar(producto_id, -2),
+            agrupador.ajustar(producto_id, -1),
+            agrupador.ajustar(inexistente, 1),
+            return_exceptions=True,
+        )
+
+    primera, segunda, tercera = asyncio.run(llamadas())
+
+    # Solo falla el ajuste que no cabe
+    assert primera.stock == 0
+    assert isinstance(segunda, StockInsuficienteError)
+    assert tercera is None
+    assert CRUDFalso.llamadas[1:] == [
+        ("ajustar", producto_id, -2),
+        ("ajustar", producto_id, -1),
+        ("ajustar", inexistente, 1),
+    ]
+
+
+def test_error_del_grupo_llega_a_todas_las_llamadas(agrupador, monkeypatch):
+    async def fallar(self, cambios):
+        raise RuntimeError("sin conexión")
+
+    monkeypatch.setattr(CRUDFalso, "aplicar_cambios_stock", fallar)
+
+    async def llamadas():
+        return await asyncio.gather(
+            agrupador.ajustar(uuid4(), 1),
+            agrupador.fijar(uuid4(), 1),
+            return_exceptions=True,
+        )
+
+    resultados = asyncio.run(llamadas())
+
+    assert all(isinstance(resultado, RuntimeError) for resultado in resultados)
+
+
+def test_vaciar_aplica_los_pendientes_sin_esperar(agrupador):
+    producto_id = uuid4()
+    CRUDFalso.stock[producto_id] = 1
+    agrupador.ventana = 60
+
+    async def cerrar():
+        llamada = asyncio.create_task(agrupador.ajustar(producto_id, 1))
+        await asyncio.sleep(0)
+        assert agrupador.metricas()["pendientes"] == 1
+        await agrupador.vaciar()
+        return await llamada
+
+    producto = asyncio.run(cerrar())
+
+    assert producto.stock == 2
+    assert agrupador.metricas()["pendientes"] == 0
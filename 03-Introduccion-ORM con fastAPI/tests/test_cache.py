@@ -0,0 +1,242 @@
+"""
+Pruebas de las cachés de proceso, del filtro de Bloom y de los backends de
+la caché de entidades
+"""
+
+import time
+
+import pytest
+from cache.backends import BackendCache, BackendMemoria, BackendRedis
+from cache.bloom import FiltroBloom
+from cache.entidades import CacheEntidades
+from cache.lru import CacheLRU
+
+
+class RedisFalso:
+    """Cliente en memoria con la parte de la interfaz de redis.Redis que se usa"""
+
+    def __init__(self):
+        self.datos = {}
+        self.caducidades = {}
+        self.transacciones = []
+
+    def get(self, clave):
+        valor = self.datos.get(clave)
+        return valor.encode("utf-8") if isinstance(valor, str) else valor
+
+    def set(self, clave, valor, ex=None):
+        self.datos[clave] = valor
+        self.caducidades[clave] = ex
+
+    def delete(self, clave):
+        self.datos.pop(clave, None)
+        self.caducidades.pop(clave, None)
+
+    def incr(self, clave):
+        valor = int(self.datos.get(clave, 0)) + 1
+        self.datos[clave] = str(valor)
+        return valor
+
+    def expire(self, clave, segundos):
+        self.caducidades[clave] = segundos
+        return True
+
+    def pipeline(self, transaction=True):
+        return PipelineFalso(self, transaction)
+
+
+class PipelineFalso:
+    """Acumula los comandos y los ejecuta juntos, como MULTI/EXEC"""
+
+    def __init__(self, cliente, transaccion):
+        self.cliente = cliente
+        self.transaccion = transaccion
+        self.comandos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def __getattr__(self, nombre):
+        return lambda *args: self.comandos.append((nombre, *args))
+
+    def execute(self):
+        self.cliente.transacciones.append((self.transaccion, list(self.comandos)))
+        return [getattr(self.cliente, nombre)(*args) for nombre, *args in self.comandos]
+
+
+class ModeloFalso:
+    __tablename__ = "modelos"
+
+
+# CacheLRU
+
+
+def test_lru_expulsa_el_menos_usado():
+    cache = CacheLRU(max_entradas=2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    assert cache.obtener("a") == 1  # "b" pasa a ser el menos usado
+    cache.guardar("c", 3)
+
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") == 1
+    assert cache.obtener("c") == 3
+    assert cache.metricas()["expulsiones"] == 1
+
+
+def test_lru_caducidad_por_entrada():
+    cache = CacheLRU(ttl_segundos=60)
+    cache.guardar("corta", 1, ttl_segundos=0.01)
+    cache.guardar("larga", 2)
+    time.sleep(0.02)
+
+    assert cache.obtener("corta", "nada") == "nada"
+    assert cache.obtener("larga") == 2
+
+
+def test_lru_metricas_e_invalidacion():
+    cache = CacheLRU()
+    cache.guardar("a", 1)
+    cache.obtener("a")
+    cache.obtener("b")
+    cache.invalidar("a")
+    cache.obtener("a")
+
+    metricas = cache.metricas()
+    assert metricas["aciertos"] == 1
+    assert metricas["fallos"] == 2
+    assert metricas["tasa_aciertos"] == round(1 / 3, 4)
+    assert metricas["entradas"] == 0
+
+
+# FiltroBloom
+
+
+def test_bloom_sin_falsos_negativos():
+    filtro = FiltroBloom(capacidad=1000)
+    valores = [f"usuario{n}" for n in range(1000)]
+    for valor in valores:
+        filtro.añadir(valor)
+
+    assert all(valor in filtro for valor in valores)
+
+
+def test_bloom_tasa_de_falsos_positivos():
+    filtro = FiltroBloom(capacidad=1000, tasa_falsos_positivos=0.01)
+    for n in range(1000):
+        filtro.añadir(f"dentro{n}")
+
+    falsos = sum(filtro.puede_contener(f"fuera{n}") for n in range(10000))
+    # Margen amplio sobre el 1 % teórico para que la prueba sea estable
+    assert falsos < 300
+
+
+def test_bloom_limpiar_y_parametros():
+    filtro = FiltroBloom(capacidad=10)
+    filtro.añadir("a")
+    filtro.limpiar()
+
+    assert "a" not in filtro
+    assert filtro.metricas()["elementos"] == 0
+    with pytest.raises(ValueError):
+        FiltroBloom(capacidad=0)
+    with pytest.raises(ValueError):
+        FiltroBloom(tasa_falsos_positivos=1)
+
+
+# Backends
+
+
+@pytest.fixture(params=["memoria", "redis"])
+def backend(request):
+    if request.param == "memoria":
+        return BackendMemoria(max_entradas=100)
+    return BackendRedis(RedisFalso())
+
+
+def test_backend_guardar_obtener_eliminar(backend):
+    backend.guardar("clave", "valor", 60)
+    assert backend.obtener("clave") == "valor"
+
+    backend.eliminar("clave")
+    assert backend.obtener("clave") is None
+
+
+def test_backend_contadores(backend):
+    assert backend.contador("c") == 0
+    assert backend.incrementar("c", 60) == 1
+    assert backend.incrementar("c", 60) == 2
+    assert backend.contador("c") == 2
+
+
+def test_backend_memoria_no_expulsa_contadores():
+    backend = BackendMemoria(max_entradas=2)
+    backend.incrementar("tienda:productos:1:version", 60)
+    for n in range(10):
+        backend.guardar(f"dato{n}", "x", 60)
+
+    assert backend.contador("tienda:productos:1:version") == 1
+
+
+def test_backend_redis_caducidades():
+    cliente = RedisFalso()
+    backend = BackendRedis(cliente)
+    backend.guardar("dato", "x", 0.5)
+    backend.incrementar("version", 86400)
+
+    assert cliente.caducidades == {"dato": 1, "version": 86400}
+
+
+def test_backend_redis_incrementar_en_una_transaccion():
+    cliente = RedisFalso()
+    BackendRedis(cliente).incrementar("version", 86400)
+
+    assert cliente.transacciones == [
+        (True, [("incr", "version"), ("expire", "version", 86400)])
+    ]
+
+
+def test_backend_incompleto_no_se_instancia():
+    class BackendSinContadores(BackendCache):
+        def obtener(self, clave):
+            return None
+
+        def guardar(self, clave, valor, ttl_segundos):
+            pass
+
+        def eliminar(self, clave):
+            pass
+
+    with pytest.raises(TypeError):
+        BackendSinContadores()
+
+
+# CacheEntidades
+
+
+def test_cache_entidades_invalidar_cambia_la_version(backend):
+    cache = CacheEntidades(backend, prefijo="pruebas")
+    clave = cache._clave(ModeloFalso, 1)
+    backend.guardar(f"{clave}:0", "antiguo", 60)
+
+    cache.invalidar(ModeloFalso, 1)
+
+    assert backend.contador(f"{clave}:version") == 1
+    assert backend.obtener(f"{clave}:0") is None
+
+
+def test_cache_entidades_no_guarda_ausencias(backend):
+    cache = CacheEntidades(backend, prefijo="pruebas")
+    cargas = []
+
+    def cargar():
+        cargas.append(1)
+        return None
+
+    assert cache.obtener(None, ModeloFalso, 1, cargar) is None
+    assert cache.obtener(None, ModeloFalso, 1, cargar) is None
+    assert len(cargas) == 2
+    assert cache.metricas()["tablas"]["modelos"]["fallos"] == 2
@@ -0,0 +1,81 @@
+"""
+Pruebas de las escrituras condicionadas a la versión (If-Match)
+
+Necesitan la base de datos de ``TEST_DATABASE_URL``.
+"""
+
+from uuid import uuid4
+
+import pytest
+from crud.categoria_crud import CategoriaCRUD
+from crud.producto_crud import ProductoCRUD, StockInsuficienteError
+from crud.versiones import VersionObsoletaError
+
+
+@pytest.fixture
+def producto(db, admin):
+    categoria = CategoriaCRUD(db).crear_categoria("Pruebas concurrencia")
+    return ProductoCRUD(db).crear_producto(
+        nombre="Producto",
+        descripcion="Producto de prueba",
+        precio=10,
+        stock=5,
+        categoria_id=categoria.id_categoria,
+        usuario_id=admin.id,
+    )
+
+
+def test_actualizar_con_la_version_leida(db, producto):
+    version = producto.version
+
+    actualizado = ProductoCRUD(db).actualizar_producto(
+        producto.id_producto, versiones=[version], precio=12
+    )
+
+    assert actualizado.precio == 12
+    assert actualizado.version == version + 1
+
+
+def test_actualizar_con_version_obsoleta(db, producto):
+    version = producto.version
+    ProductoCRUD(db).actualizar_producto(producto.id_producto, precio=11)
+
+    with pytest.raises(VersionObsoletaError) as error:
+        ProductoCRUD(db).actualizar_producto(
+            producto.id_producto, versiones=[version], precio=12
+        )
+
+    assert error.value.version_actual == version + 1
+    db.expire_all()
+    assert ProductoCRUD(db).obtener_producto(producto.id_producto).precio == 11
+
+
+def test_actualizar_producto_inexistente_con_if_match(db, admin):
+    assert (
+        ProductoCRUD(db).actualizar_producto(uuid4(), versiones=[1], precio=5) is None
+    )
+
+
+def test_ajustar_stock_condicional(db, producto):
+    version = producto.version
+    producto_crud = ProductoCRUD(db)
+
+    assert producto_crud.ajustar_stock(producto.id_producto, -2, [version]).stock == 3
+    with pytest.raises(VersionObsoletaError):
+        producto_crud.ajustar_stock(producto.id_producto, -1, [version])
+    with pytest.raises(StockInsuficienteError):
+        producto_crud.ajustar_stock(producto.id_producto, -4)
+
+
+def test_actualizar_categoria_con_version_obsoleta(db, admin):
+    categoria_crud = CategoriaCRUD(db)
+    categoria = categoria_crud.crear_categoria("Versionada")
+    version = categoria.version
+    categoria_crud.actualizar_categoria(categoria.id_categoria, descripcion="Nueva")
+
+    with pytest.raises(VersionObsoletaError) as error:
+        categoria_crud.actualizar_categoria(
+            categoria.id_categoria, versiones=[version], descripcion="Otra"
+        )
+
+    assert error.value.version_actual == version + 1
@@ -0,0 +1,65 @@
+"""
+Pruebas de la sincronización del filtro de nombres de usuario y emails
+
+Necesitan la base de datos de ``TEST_DATABASE_URL``.
+"""
+
+import pytest
+from crud import usuario_crud as modulo
+from crud.usuario_crud import UsuarioCRUD, filtro_sincronizado
+from entities.usuario import Usuario
+from sqlalchemy import insert
+
+
+@pytest.fixture
+def usuario_crud(db, monkeypatch):
+    monkeypatch.setattr(modulo, "_sincronizacion", {"xid": None, "instante": 0.0})
+    usuario_crud = UsuarioCRUD(db)
+    usuario_crud.precargar_filtro()
+    yield usuario_crud
+    modulo.filtro_identificadores.limpiar()
+
+
+def alta_en_otro_worker(db, nombre_usuario: str):
+    """Insertar un usuario sin pasar por el filtro de este proceso"""
+    db.execute(
+        insert(Usuario).values(
+            nombre="Otro",
+            nombre_usuario=nombre_usuario,
+            email=f"{nombre_usuario}@example.com",
+            contraseña_hash="sal:hash",
+        )
+    )
+
+
+def test_refrescar_filtro_añade_las_altas_de_otros_workers(db, usuario_crud):
+    alta_en_otro_worker(db, "otro_worker")
+    assert usuario_crud.comprobar_disponibilidad(nombre_usuario="otro_worker") == {
+        "nombre_usuario": True
+    }
+
+    assert usuario_crud.refrescar_filtro() >= 1
+    assert usuario_crud.comprobar_disponibilidad(
+        nombre_usuario="otro_worker", email="OTRO_WORKER@example.com"
+    ) == {"nombre_usuario": False, "email": False}
+
+
+def test_sin_sincronizar_se_consulta_la_bd(db, usuario_crud, monkeypatch):
+    alta_en_otro_worker(db, "sin_sincronizar")
+    assert filtro_sincronizado()
+
+    monkeypatch.setitem(modulo._sincronizacion, "instante", -1e9)
+    assert not filtro_sincronizado()
+    assert usuario_crud.comprobar_disponibilidad(nombre_usuario="sin_sincronizar") == {
+        "nombre_usuario": False
+    }
+    # El alta sigue usando el filtro para la comprobación previa; la
+    # restricción UNIQUE rechaza el duplicado
+    with pytest.raises(ValueError, match="nombre de usuario ya está registrado"):
+        usuario_crud.crear_usuario(
+            nombre="Duplicado",
+            nombre_usuario="sin_sincronizar",
+            email="duplicado@example.com",
+            contraseña="Pruebas123!",
+            contraseña_hash="sal:hash",
+        )
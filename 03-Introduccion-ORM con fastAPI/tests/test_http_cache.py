@@ -0,0 +1,112 @@
+"""
+Pruebas de las utilidades de caché HTTP (ETag, If-Match, GET condicional)
+"""
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+from apis.http_cache import (
+    CACHE_PUBLICA,
+    calcular_etag,
+    etag_version,
+    respuesta_condicional,
+    versiones_if_match,
+)
+from fastapi import Request, Response
+
+FECHA = datetime(2026, 10, 17, 12, 0, 0, 500000, tzinfo=timezone.utc)
+
+
+def peticion(**cabeceras) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [
+                (nombre.replace("_", "-").encode(), valor.encode())
+                for nombre, valor in cabeceras.items()
+            ],
+        }
+    )
+
+
+def registro(id_registro, fecha_edicion=None):
+    return SimpleNamespace(
+        id=id_registro, fecha_creacion=FECHA, fecha_edicion=fecha_edicion
+    )
+
+
+def test_etag_version():
+    assert etag_version(3) == '"3"'
+
+
+def test_calcular_etag_cambia_con_los_registros():
+    etag = calcular_etag([registro(1), registro(2)], "id")
+
+    assert etag.startswith('W/"')
+    assert etag == calcular_etag([registro(1), registro(2)], "id")
+    assert etag != calcular_etag([registro(1)], "id")
+    assert etag != calcular_etag(
+        [registro(1), registro(2, FECHA + timedelta(seconds=1))], "id"
+    )
+
+
+def test_versiones_if_match():
+    assert versiones_if_match(peticion()) is None
+    assert versiones_if_match(peticion(if_match="*")) is None
+    assert versiones_if_match(peticion(if_match='"3", "4"')) == [3, 4]
+    # Los ETag débiles y los que no son de versión no coinciden con ninguna
+    assert versiones_if_match(peticion(if_match='W/"3", "abc"')) == []
+
+
+def test_respuesta_condicional_if_none_match():
+    response = Response()
+    resultado = respuesta_condicional(
+        peticion(if_none_match='"otro", W/"3"'), response, '"3"', CACHE_PUBLICA
+    )
+
+    assert resultado.status_code == 304
+    assert resultado.headers["etag"] == '"3"'
+    assert resultado.headers["cache-control"] == CACHE_PUBLICA
+
+
+def test_respuesta_condicional_sin_coincidencia():
+    response = Response()
+    resultado = respuesta_condicional(
+        peticion(if_none_match='"2"'), response, '"3"', CACHE_PUBLICA, FECHA
+    )
+
+    assert resultado is None
+    assert response.headers["etag"] == '"3"'
+    assert response.headers["last-modified"] == format_datetime(FECHA, usegmt=True)
+
+
+def test_respuesta_condicional_if_modified_since():
+    cabecera = format_datetime(FECHA, usegmt=True)
+
+    resultado = respuesta_condicional(
+        peticion(if_modified_since=cabecera), Response(), '"3"', CACHE_PUBLICA, FECHA
+    )
+    assert resultado.status_code == 304
+
+    posterior = FECHA + timedelta(seconds=1)
+    resultado = respuesta_condicional(
+        peticion(if_modified_since=cabecera),
+        Response(),
+        '"3"',
+        CACHE_PUBLICA,
+        posterior,
+    )
+    assert resultado is None
+
+    # If-None-Match tiene prioridad sobre If-Modified-Since
+    resultado = respuesta_condicional(
+        peticion(if_none_match='"2"', if_modified_since=cabecera),
+        Response(),
+        '"3"',
+        CACHE_PUBLICA,
+        FECHA,
+    )
+    assert resultado is None
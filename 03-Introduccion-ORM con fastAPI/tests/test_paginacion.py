@@ -0,0 +1,98 @@
+"""
+Pruebas de los cursores de paginación, búsqueda y feed de cambios
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from crud.paginacion import (
+    MAX_LIMITE,
+    _codificar,
+    codificar_cursor,
+    codificar_cursor_busqueda,
+    codificar_cursor_cambios,
+    decodificar_cursor,
+    decodificar_cursor_busqueda,
+    decodificar_cursor_cambios,
+    siguiente_cursor,
+    validar_limite,
+)
+
+
+class Registro:
+    def __init__(self, fecha_creacion, id_registro):
+        self.fecha_creacion = fecha_creacion
+        self.id_registro = id_registro
+
+
+def test_cursor_fecha_ida_y_vuelta():
+    fecha = datetime(2026, 10, 17, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    id_registro = uuid4()
+    cursor = codificar_cursor(fecha, id_registro)
+
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor) == (fecha, id_registro)
+
+
+def test_cursor_decimal_y_otros_tipos():
+    id_registro = uuid4()
+
+    cursor = codificar_cursor(Decimal("19.99"), id_registro)
+    assert decodificar_cursor(cursor, Decimal) == (Decimal("19.99"), id_registro)
+
+    cursor = codificar_cursor("Café", id_registro)
+    assert decodificar_cursor(cursor, str) == ("Café", id_registro)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["no-es-base64!", _codificar(["ayer", str(uuid4())]), _codificar([1]), ""],
+)
+def test_cursor_no_valido(cursor):
+    with pytest.raises(ValueError, match="cursor de paginación"):
+        decodificar_cursor(cursor)
+
+
+def test_cursor_busqueda_conserva_la_relevancia_exacta():
+    id_registro = uuid4()
+    rango = Decimal("0.060793")
+    cursor = codificar_cursor_busqueda(rango, id_registro)
+
+    assert decodificar_cursor_busqueda(cursor) == (rango, id_registro)
+
+
+@pytest.mark.parametrize("rango", ["NaN", "Infinity", "abc", None])
+def test_cursor_busqueda_no_valido(rango):
+    cursor = _codificar([rango, str(uuid4())])
+    with pytest.raises(ValueError):
+        decodificar_cursor_busqueda(cursor)
+
+
+def test_cursor_cambios():
+    id_registro = uuid4()
+
+    assert decodificar_cursor_cambios(codificar_cursor_cambios(42)) == (42, None)
+    cursor = codificar_cursor_cambios(42, id_registro)
+    assert decodificar_cursor_cambios(cursor) == (42, id_registro)
+    with pytest.raises(ValueError, match="cursor de cambios"):
+        decodificar_cursor_cambios(_codificar(["x", None]))
+
+
+def test_validar_limite():
+    validar_limite(1)
+    validar_limite(MAX_LIMITE)
+    for limite in (0, MAX_LIMITE + 1):
+        with pytest.raises(ValueError):
+            validar_limite(limite)
+
+
+def test_siguiente_cursor():
+    fecha = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    registros = [Registro(fecha, uuid4()) for _ in range(3)]
+
+    assert siguiente_cursor(registros, 4, "id_registro") is None
+    assert siguiente_cursor([], 3, "id_registro") is None
+    cursor = siguiente_cursor(registros, 3, "id_registro")
+    assert decodificar_cursor(cursor) == (fecha, registros[-1].id_registro)
@@ -0,0 +1,105 @@
+"""
+Pruebas de la unidad de trabajo por petición y de los puntos de guardado de
+las clases CRUD
+
+Necesitan la base de datos de ``TEST_DATABASE_URL``.
+"""
+
+from uuid import uuid4
+
+import pytest
+from crud.categoria_crud import CategoriaCRUD
+from crud.producto_crud import ProductoCRUD
+from crud.reserva_crud import ReservaCRUD
+from database.unidad_trabajo import (
+    al_terminar,
+    iniciar_unidad_de_trabajo,
+    tiene_cambios_pendientes,
+)
+from entities.categoria import Categoria
+from sqlalchemy import func, select
+
+
+@pytest.fixture
+def unidad(db, admin):
+    """Sesión marcada como unidad de trabajo, como la de una petición"""
+    db.commit()
+    iniciar_unidad_de_trabajo(db)
+    return db
+
+
+def contar_categorias(db) -> int:
+    return db.scalar(select(func.count()).select_from(Categoria))
+
+
+def test_confirmar_fuera_de_una_unidad_de_trabajo_hace_commit(db, admin):
+    CategoriaCRUD(db).crear_categoria("Suelta")
+    assert not tiene_cambios_pendientes(db)
+
+    # Ya confirmada: un rollback posterior no la deshace
+    db.rollback()
+    assert contar_categorias(db) == 1
+
+
+def test_confirmar_en_una_unidad_de_trabajo_solo_hace_flush(unidad):
+    CategoriaCRUD(unidad).crear_categoria("Pendiente")
+
+    assert unidad.in_transaction()
+    assert tiene_cambios_pendientes(unidad)
+
+    unidad.rollback()
+    assert contar_categorias(unidad) == 0
+    assert not tiene_cambios_pendientes(unidad)
+
+
+def test_al_terminar_se_ejecuta_ahora_y_al_final(unidad):
+    llamadas = []
+    CategoriaCRUD(unidad).crear_categoria("Con acción")
+    al_terminar(unidad, lambda: llamadas.append(1))
+    assert llamadas == [1]
+
+    # Un punto de guardado no termina la unidad de trabajo
+    with unidad.begin_nested():
+        pass
+    assert llamadas == [1]
+
+    unidad.commit()
+    assert llamadas == [1, 1]
+
+
+def test_error_de_restriccion_no_deshace_lo_anterior(unidad):
+    categoria_crud = CategoriaCRUD(unidad)
+    primera = categoria_crud.crear_categoria("Primera")
+
+    with pytest.raises(ValueError):
+        categoria_crud.crear_categoria("Primera")
+    with pytest.raises(ValueError):
+        categoria_crud.actualizar_categoria(
+            categoria_crud.crear_categoria("Segunda").id_categoria, nombre="Primera"
+        )
+
+    unidad.commit()
+    nombres = set(unidad.scalars(select(Categoria.nombre)))
+    assert nombres == {"Primera", "Segunda"}
+    assert unidad.get(Categoria, primera.id_categoria) is not None
+
+
+def test_reserva_fallida_no_descuenta_stock(unidad, admin):
+    categoria = CategoriaCRUD(unidad).crear_categoria("Reservas")
+    producto = ProductoCRUD(unidad).crear_producto(
+        nombre="Reservable",
+        descripcion="Producto de prueba",
+        precio=5,
+        stock=10,
+        categoria_id=categoria.id_categoria,
+        usuario_id=admin.id,
+    )
+
+    with pytest.raises(ValueError, match="usuario"):
+        ReservaCRUD(unidad).crear_reserva(
+            [{"producto_id": producto.id_producto, "cantidad": 3}], usuario_id=uuid4()
+        )
+
+    unidad.commit()
+    unidad.expire_all()
+    assert ProductoCRUD(unidad).obtener_producto(producto.id_producto).stock == 10
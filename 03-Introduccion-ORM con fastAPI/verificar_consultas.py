@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script para verificar que expandir relaciones no provoca consultas N+1
+
+Lista páginas de productos de distintos tamaños con ``expandir`` (lo mismo
+que ``GET /productos?expand=categoria,usuario_crea``), serializa cada
+producto con sus relaciones y cuenta las sentencias SQL ejecutadas. Cada
+página debe necesitar una consulta para los productos y una por relación
+expandida, sea cual sea su tamaño.
+
+Uso:
+    python verificar_consultas.py
+
+Devuelve código de salida 1 si alguna página supera el número esperado.
+"""
+
+import os
+import sys
+
+from crud.producto_crud import ProductoCRUD
+from database.config import SessionLocal, engine
+from dotenv import load_dotenv
+from schemas import ProductoExpandido
+from sqlalchemy import event
+
+TAMAÑOS_PAGINA = [1, 10, 100]
+
+# (relaciones expandidas, número máximo de sentencias por página)
+CASOS = [
+    ((), 1),
+    (("categoria",), 2),
+    (("usuario_crea",), 2),
+    (("categoria", "usuario_crea"), 3),
+]
+
+
+def contar_sentencias(expandir: tuple, limit: int) -> tuple:
+    """Listar y serializar una página; devuelve (productos, sentencias)"""
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        productos = ProductoCRUD(db).obtener_productos(limit=limit, expandir=expandir)
+        for producto in productos:
+            ProductoExpandido.desde_producto(producto, expandir)
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+        db.close()
+    return len(productos), len(sentencias)
+
+
+def verificar_consultas() -> bool:
+    """Comprobar el número de sentencias de cada caso y tamaño de página"""
+    correcto = True
+    for expandir, maximo in CASOS:
+        nombre = ",".join(expandir) or "sin expand"
+        for limit in TAMAÑOS_PAGINA:
+            productos, sentencias = contar_sentencias(expandir, limit)
+            if sentencias <= maximo:
+                print(
+                    f"  OK     {nombre}, limit={limit}: "
+                    f"{productos} productos, {sentencias} sentencias"
+                )
+            else:
+                correcto = False
+                print(
+                    f"  FALLO  {nombre}, limit={limit}: {productos} productos, "
+                    f"{sentencias} sentencias (máximo {maximo})"
+                )
+    return correcto
+
+
+def main():
+    """Funcion principal"""
+    load_dotenv()
+
+    if not os.getenv("DATABASE_URL"):
+        print("Error: DATABASE_URL no esta configurada")
+        return False
+
+    print("Contando sentencias SQL por página de productos...")
+    return verificar_consultas()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
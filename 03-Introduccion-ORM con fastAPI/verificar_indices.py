@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Script para verificar que las consultas frecuentes usan sus índices
+
+Ejecuta EXPLAIN sobre las búsquedas por clave foránea, por email y del
+administrador por defecto, y comprueba que el plan usa el índice esperado.
+Los recorridos secuenciales se desactivan durante la comprobación para que
+el resultado no dependa del tamaño de las tablas: si el plan no usa el
+índice es porque la consulta no puede usarlo.
+
+Uso:
+    python verificar_indices.py
+
+Devuelve código de salida 1 si alguna consulta no usa su índice.
+"""
+
+import os
+import sys
+import uuid
+
+from database.config import engine
+from dotenv import load_dotenv
+from entities.categoria import Categoria
+from entities.producto import Producto
+from entities.usuario import Usuario
+from sqlalchemy import func, select
+
+UUID_PRUEBA = uuid.uuid4()
+
+# (descripción, consulta, índice que debe aparecer en el plan)
+CONSULTAS = [
+    (
+        "productos por categoría (orden por defecto)",
+        select(Producto)
+        .where(Producto.categoria_id == UUID_PRUEBA)
+        .order_by(Producto.fecha_creacion, Producto.id_producto)
+        .limit(20),
+        "ix_productos_categoria_fecha",
+    ),
+    (
+        "productos por usuario",
+        select(Producto).where(Producto.usuario_id == UUID_PRUEBA),
+        "ix_productos_usuario_id",
+    ),
+    (
+        "productos por prefijo de nombre",
+        select(Producto).where(func.lower(Producto.nombre).like("caf%", escape="/")),
+        "ix_productos_nombre_prefijo",
+    ),
+    (
+        "productos por categoría ordenados por precio",
+        select(Producto)
+        .where(Producto.categoria_id == UUID_PRUEBA, Producto.precio <= 100)
+        .order_by(Producto.precio, Producto.id_producto)
+        .limit(20),
+        "ix_productos_categoria_precio",
+    ),
+    (
+        "productos ordenados por nombre",
+        select(Producto).order_by(Producto.nombre, Producto.id_producto).limit(20),
+        "ix_productos_nombre_id_producto",
+    ),
+    (
+        "FK productos.id_usuario_crea",
+        select(Producto.id_producto).where(Producto.id_usuario_crea == UUID_PRUEBA),
+        "ix_productos_id_usuario_crea",
+    ),
+    (
+        "FK productos.id_usuario_edita",
+        select(Producto.id_producto).where(Producto.id_usuario_edita == UUID_PRUEBA),
+        "ix_productos_id_usuario_edita",
+    ),
+    (
+        "FK categorias.id_usuario_crea",
+        select(Categoria.id_categoria).where(Categoria.id_usuario_crea == UUID_PRUEBA),
+        "ix_categorias_id_usuario_crea",
+    ),
+    (
+        "FK categorias.id_usuario_edita",
+        select(Categoria.id_categoria).where(Categoria.id_usuario_edita == UUID_PRUEBA),
+        "ix_categorias_id_usuario_edita",
+    ),
+    (
+        "usuario por email",
+        select(Usuario).where(func.lower(Usuario.email) == "admin@system.com"),
+        "ix_tbl_usuarios_email_lower",
+    ),
+    (
+        "administrador por defecto",
+        select(Usuario.id)
+        .where(Usuario.es_admin == True, Usuario.activo == True)
+        .order_by(Usuario.fecha_creacion, Usuario.id)
+        .limit(1),
+        "ix_tbl_usuarios_admin_activo",
+    ),
+]
+
+
+def indices_del_plan(nodo: dict) -> set:
+    """Nombres de los índices usados en un nodo del plan y sus hijos"""
+    indices = {nodo["Index Name"]} if "Index Name" in nodo else set()
+    for hijo in nodo.get("Plans", []):
+        indices |= indices_del_plan(hijo)
+    return indices
+
+
+def verificar_indices() -> bool:
+    """Ejecutar EXPLAIN de cada consulta y comprobar el índice usado"""
+    correcto = True
+    with engine.connect() as conn:
+        with conn.begin():
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            for descripcion, consulta, indice in CONSULTAS:
+                compilada = consulta.compile(dialect=engine.dialect)
+                plan = conn.exec_driver_sql(
+                    "EXPLAIN (FORMAT JSON) " + compilada.string, compilada.params
+                ).scalar()
+                usados = indices_del_plan(plan[0]["Plan"])
+                if indice in usados:
+                    print(f"  OK     {descripcion}: {indice}")
+                else:
+                    correcto = False
+                    print(
+                        f"  FALLO  {descripcion}: se esperaba {indice}, "
+                        f"el plan usa {sorted(usados) or 'recorrido secuencial'}"
+                    )
+    return correcto
+
+
+def main():
+    """Funcion principal"""
+    load_dotenv()
+
+    if not os.getenv("DATABASE_URL"):
+        print("Error: DATABASE_URL no esta configurada")
+        return False
+
+    print("Verificando planes de consulta...")
+    return verificar_indices()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)